@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     CityZone, WeatherLog, Hospital, TrafficStats, RealTimeTraffic,
-    HealthStats, AgriSupply, CitizenReport
+    HealthStats, AgriSupply, CitizenReport, ZoneSnapshot, StationIngestState,
+    RollupWatermark, TrafficProfile, ReadingRollup, PollutantReading
 )
 
 @admin.register(CityZone)
@@ -16,6 +17,13 @@ class WeatherLogAdmin(admin.ModelAdmin):
     list_filter = ['zone', 'timestamp']
     date_hierarchy = 'timestamp'
 
+@admin.register(PollutantReading)
+class PollutantReadingAdmin(admin.ModelAdmin):
+    list_display = ['pollutant', 'zone', 'timestamp', 'avg', 'sub_index']
+    list_filter = ['pollutant']
+    raw_id_fields = ['weather_log', 'zone']
+    date_hierarchy = 'timestamp'
+
 @admin.register(Hospital)
 class HospitalAdmin(admin.ModelAdmin):
     list_display = ['name', 'zone', 'total_beds_icu', 'occupied_beds_icu', 'is_live_data']
@@ -41,6 +49,36 @@ class HealthStatsAdmin(admin.ModelAdmin):
     list_filter = ['zone', 'timestamp']
     date_hierarchy = 'timestamp'
 
+@admin.register(ZoneSnapshot)
+class ZoneSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['zone', 'updated_at', 'air_quality_index', 'congestion_level', 'respiratory_cases_active', 'occupied_beds_icu', 'total_beds_icu']
+    search_fields = ['zone__name']
+    readonly_fields = ['updated_at']
+
+@admin.register(StationIngestState)
+class StationIngestStateAdmin(admin.ModelAdmin):
+    list_display = ['station_name', 'zone', 'last_update', 'updated_at']
+    search_fields = ['station_name']
+    readonly_fields = ['updated_at']
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_id', 'updated_at']
+    readonly_fields = ['updated_at']
+
+@admin.register(TrafficProfile)
+class TrafficProfileAdmin(admin.ModelAdmin):
+    list_display = ['cell_row', 'cell_col', 'hour_of_week', 'sample_count', 'updated_at']
+    list_filter = ['hour_of_week']
+    readonly_fields = ['updated_at']
+
+@admin.register(ReadingRollup)
+class ReadingRollupAdmin(admin.ModelAdmin):
+    list_display = ['source', 'metric', 'location_key', 'resolution', 'bucket_start', 'count', 'minimum', 'maximum']
+    list_filter = ['source', 'metric', 'resolution']
+    search_fields = ['location_key']
+    date_hierarchy = 'bucket_start'
+
 @admin.register(AgriSupply)
 class AgriSupplyAdmin(admin.ModelAdmin):
     list_display = ['crop_type', 'quantity_kg', 'farmer_name', 'origin_zone', 'harvest_date']
@@ -1,163 +1,187 @@
-import urllib.request
+import hashlib
 import json
-import ssl
 from django.core.management.base import BaseCommand
-from core.models import CityZone, WeatherLog
-from core.utils import haversine
+from django.db import transaction
+from django.utils import timezone
+from core.models import CityZone, WeatherLog, StationIngestState
+from core.services.change_feed import ChangeFeed
+from core.services.cpcb_feed import CPCB_FEED_URL, FEED_CHUNK_SIZE, iter_stations
+from core.services.data_versions import DataVersions
+from core.services.pollutant_service import PollutantService
+from core.services.snapshot_service import SnapshotService
+from core.services.spatial_index import HospitalIndex
+from core.services.upstream import upstream
 
 class Command(BaseCommand):
     help = 'Fetches real-time AQI data from CPCB JSON feed'
+    AREA_TYPE = 'Monitoring Station'
 
     def handle(self, *args, **kwargs):
-        url = "https://airquality.cpcb.gov.in/caaqms/iit_rss_feed_with_coordinates"
+        self.verbosity = kwargs.get('verbosity', 1)
+        url = CPCB_FEED_URL
         self.stdout.write(f"Fetching CPCB Data (JSON) from {url}...")
         
         try:
-            # Setup SSL Context (Unverified) and Headers
-            ctx = ssl.create_default_context()
-            ctx.check_hostname = False
-            ctx.verify_mode = ssl.CERT_NONE
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, context=ctx) as response:
-                raw_data = response.read().decode('utf-8')
-                # The data might be a dictionary with keys like 'rss' or a list. 
-                # From debug output: {"siteId":"site_5... suggests a Dictionary or List of Obj.
-                # Let's handle both.
-                try:
-                    data = json.loads(raw_data)
-                except json.JSONDecodeError:
-                    # Sometimes APIs wrap JSON in XML or HTML.
-                    # If valid JSON, we proceed.
-                    self.stdout.write(self.style.ERROR("Failed to decode JSON"))
-                    return
-
-            # CPCB JSON Structure Assumption (based on typical CPCB feeds & debug output)
-            # Usually strict key names. Let's iterate safely.
-            # If it's a dict with one key 'stations', use that. 
-            # If it's a raw list, use that.
-            
-                # Recursive finder for "stationsInCity" or lists with "siteId"
-                items = []
-                def find_stations(obj):
-                    if isinstance(obj, dict):
-                        # Pattern 1: stationsInCity key (Standard CPCB structure)
-                        if 'stationsInCity' in obj and isinstance(obj['stationsInCity'], list):
-                            items.extend(obj['stationsInCity'])
-                        
-                        # Pattern 2: Single station dict (has siteId and latitude)
-                        # We must be careful not to add the parent container if it just *contains* stations
-                        elif 'siteId' in obj and ('latitude' in obj or 'lat' in obj):
-                            items.append(obj)
-                        
-                        # Recurse values
-                        for k, v in obj.items():
-                            if isinstance(v, (dict, list)):
-                                find_stations(v)
-                    
-                    elif isinstance(obj, list):
-                        for i in obj:
-                            find_stations(i)
-
-                find_stations(data)
-                
-                # Deduplicate by siteId or Name
-                unique_stations = {}
-                for i in items:
-                    # Prefer siteId, fallback to name, fallback to lat/lon string
-                    key = i.get('siteId') or i.get('stationName') or i.get('name') or f"{i.get('latitude')}_{i.get('longitude')}"
-                    if key not in unique_stations:
-                        unique_stations[key] = i
-                
-                items = list(unique_stations.values())
-
-                self.stdout.write(f"Found {len(items)} unique stations after deep recursive search.")
-                # Debug: Print first 3 names
-                if len(items) > 0:
-                     names = [i.get('stationName') or i.get('name') or 'Unnamed' for i in items[:3]]
-                     self.stdout.write(f"Sample Stations: {names}")
-            
-            zones = list(CityZone.objects.all())
-            count = 0
-            
-            for item in items:
-                try:
-                    # Extract Data
-                    # Keys from CPCB are usually PascalCase or camelCase. 
-                    # We look for lat/lon/aqi variants.
-                    
-                    # 1. Coordinates
-                    lat = item.get('latitude') or item.get('lat')
-                    lon = item.get('longitude') or item.get('lng') or item.get('lon')
-                    
-                    if not lat or not lon: continue
-                    lat, lon = float(lat), float(lon)
-                    
-                    
-                    # 2. Location Name
-                    name = item.get('siteName') or item.get('station') or item.get('stationName') or item.get('id')
-                    
-                    # 3. AQI / PM2.5
-                    # Keys: airQualityIndexValue (User snippet), aqi, or pollutants list
-                    aqi = item.get('airQualityIndexValue') or item.get('aqi')
-                    
-                    if aqi is None:
-                        # try nested pollutant
-                        pollutants = item.get('pollutants', [])
-                        for p in pollutants:
-                            if p.get('indexId') == 'PM2.5' or p.get('id') == 'PM2.5': # indexId from user snippet
-                                aqi = p.get('aqi') or p.get('avg')
-                                break
-                    
-                    # Fallback or sanitization
-                    if aqi is None or aqi == 'NA' or aqi == '-': 
-                        continue
-                    try:
-                        aqi = int(float(aqi))
-                    except:
-                        continue
-                    
-                    # 4. Create or Update Specific Zone for this Station
-                    # We want ALL stations, so we create a zone if it doesn't exist by name/location
-                    
-                    # Check for existing zone by unique Name or very close proximity (<50m)
-                    # Ideally use name as unique identifier
-                    zone, created = CityZone.objects.get_or_create(
-                        name=name,
-                        defaults={
-                            'latitude': lat,
-                            'longitude': lon,
-                            'area_type': 'Monitoring Station'
-                        }
-                    )
-                    
-                    if not created:
-                         # Ensure coords are precise if it was originally an imprecise mapped zone?
-                         # Or just trust the name match. Let's update type effectively.
-                         zone.area_type = 'Monitoring Station'
-                         zone.latitude = lat # Update potential shift
-                         zone.longitude = lon
-                         zone.save()
-
-                    # 5. Update WeatherLog
-                    WeatherLog.objects.create(
-                        zone=zone,
-                        temperature_c=item.get('temp', 30.0), # Use temp if available
-                        precipitation_mm=0,
-                        wind_speed_kmh=10,
-                        visibility_km=5,
-                        air_quality_index=aqi,
-                        pollutant_details=json.dumps(item.get('pollutants', []))
-                    )
-                    count += 1
-                    self.stdout.write(f"{'Created' if created else 'Updated'} Station Zone: {name} | AQI: {aqi}")
-                    
-                except Exception as e:
-                    # print(e)
-                    continue
+            seen = 0
+            readings = []
+            # CPCB's certificate chain doesn't verify, so this feed is fetched unverified
+            with upstream.get(url, headers={'User-Agent': 'Mozilla/5.0'}, verify=False, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                # Stations are parsed as bytes arrive, so only the compact readings are held,
+                # never the feed. They're written in one transaction once the download has
+                # completed: a feed that breaks off mid-way ingests nothing.
+                for record in iter_stations(response.iter_content(FEED_CHUNK_SIZE)):
+                    seen += 1
+                    reading = self.parse_station(record)
+                    if reading is not None:
+                        readings.append(reading)
+            stats = self.ingest(readings)
 
-            self.stdout.write(self.style.SUCCESS(f"Successfully updated AQI for {count} zones from CPCB."))
+            self.stdout.write(f"Found {seen} stations in feed.")
+            self.stdout.write(self.style.SUCCESS(
+                f"CPCB readings: {stats['inserted']} inserted, {stats['changed']} changed, {stats['skipped']} skipped "
+                f"(zones: {stats['created']} new, {stats['moved']} relocated)."
+            ))
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error: {e}"))
+
+    @staticmethod
+    def parse_station(record):
+        """Ingestion fields for one normalized CPCB record; None if it has no name or usable AQI."""
+        name = record['name']
+        if not name:
+            return None
+
+        # Keys: airQualityIndexValue (User snippet), aqi, or pollutants list
+        aqi = record['aqi']
+        if aqi is None:
+            # try nested pollutant
+            for p in record['pollutants']:
+                if p.get('indexId') == 'PM2.5' or p.get('id') == 'PM2.5': # indexId from user snippet
+                    aqi = p.get('aqi') or p.get('avg')
+                    break
+
+        # Fallback or sanitization
+        if aqi is None or aqi == 'NA' or aqi == '-':
+            return None
+        try:
+            aqi = int(float(aqi))
+        except (TypeError, ValueError):
+            return None
+
+        temperature = record['temp'] if record['temp'] is not None else 30.0 # Use temp if available
+        pollutant_details = json.dumps(record['pollutants'])
+        content_hash = hashlib.sha1(json.dumps([aqi, temperature, pollutant_details]).encode()).hexdigest()
+
+        return {
+            'name': name,
+            'latitude': record['lat'],
+            'longitude': record['lon'],
+            'air_quality_index': aqi,
+            'temperature_c': temperature,
+            'pollutant_details': pollutant_details,
+            'pollutants': PollutantService.parse(record['pollutants']),
+            'last_update': str(record['last_update'] or ''),
+            'content_hash': content_hash,
+        }
+
+    def ingest(self, readings):
+        """
+        Writes new CPCB readings in a single transaction and a fixed number of queries.
+        Zones are looked up by name once, new ones bulk-created, moved ones bulk-updated.
+        A reading is compared with the station's StationIngestState:
+          - same lastUpdate and content  -> skipped
+          - same lastUpdate, new content -> changed (CPCB revised it; the existing log is updated)
+          - otherwise                    -> inserted as a new WeatherLog
+        Bulk writes skip model signals, so snapshots and the hospital index are refreshed here.
+        """
+        # Last reading wins if the feed lists a station twice
+        readings = list({r['name']: r for r in readings}.values())
+        stats = {'created': 0, 'moved': 0, 'inserted': 0, 'changed': 0, 'skipped': 0}
+        if not readings:
+            return stats
+        names = [r['name'] for r in readings]
+
+        with transaction.atomic():
+            zones = {}
+            for zone in CityZone.objects.filter(name__in=names).order_by('-pk'):
+                zones[zone.name] = zone # lowest pk wins for duplicated names, as get_or_create would have
+
+            new_zones, moved = [], []
+            for r in readings:
+                zone = zones.get(r['name'])
+                if zone is None:
+                    new_zones.append(CityZone(name=r['name'], latitude=r['latitude'], longitude=r['longitude'],
+                                              area_type=self.AREA_TYPE))
+                elif (zone.latitude, zone.longitude, zone.area_type) != (r['latitude'], r['longitude'], self.AREA_TYPE):
+                    zone.latitude, zone.longitude, zone.area_type = r['latitude'], r['longitude'], self.AREA_TYPE
+                    moved.append(zone)
+
+            for zone in CityZone.objects.bulk_create(new_zones, batch_size=500):
+                zones[zone.name] = zone
+            CityZone.objects.bulk_update(moved, ['latitude', 'longitude', 'area_type'], batch_size=500)
+            # bulk_update skips bump_zone_data_version; simulations memoized on the old location must go stale
+            SnapshotService.touch([zone.pk for zone in moved])
+
+            states = StationIngestState.objects.in_bulk(names, field_name='station_name')
+            now = timezone.now()
+            inserted, revised, new_states, touched_states, pollutants = [], [], [], [], []
+            for r in readings:
+                zone = zones[r['name']]
+                state = states.get(r['name'])
+                if state is not None and (state.last_update, state.content_hash) == (r['last_update'], r['content_hash']):
+                    stats['skipped'] += 1
+                    continue
+
+                log = WeatherLog(
+                    zone=zone,
+                    temperature_c=r['temperature_c'],
+                    precipitation_mm=0,
+                    wind_speed_kmh=10,
+                    visibility_km=5,
+                    air_quality_index=r['air_quality_index'],
+                    pollutant_details=r['pollutant_details'],
+                )
+                if state is None:
+                    state = StationIngestState(station_name=r['name'])
+                    new_states.append(state)
+                else:
+                    touched_states.append(state)
+
+                if r['last_update'] and state.last_update == r['last_update'] and state.weather_log_id:
+                    log.pk = state.weather_log_id
+                    revised.append(log)
+                else:
+                    inserted.append(log)
+                pollutants.append((log, r['pollutants']))
+                state.zone, state.last_update, state.content_hash, state.weather_log = zone, r['last_update'], r['content_hash'], log
+                state.updated_at = now
+
+            WeatherLog.objects.bulk_create(inserted, batch_size=500)
+            WeatherLog.objects.bulk_update(revised, ['temperature_c', 'air_quality_index', 'pollutant_details'], batch_size=500)
+            PollutantService.write({log.pk: rows for log, rows in pollutants})
+            StationIngestState.objects.bulk_create(new_states, batch_size=500)
+            StationIngestState.objects.bulk_update(
+                touched_states, ['zone', 'last_update', 'content_hash', 'weather_log', 'updated_at'], batch_size=500
+            )
+
+            written = {log.zone_id for log in inserted + revised}
+            if written:
+                SnapshotService.rebuild(written)
+            # Bulk writes skip the signals that bump these
+            DataVersions.bump(*([WeatherLog] if written else []), *([CityZone] if new_zones or moved else []))
+            ChangeFeed.publish('zones', [
+                {'zone_id': log.zone_id, 'name': log.zone.name, 'aqi': log.air_quality_index} for log in inserted + revised
+            ])
+
+        if new_zones or moved:
+            HospitalIndex.invalidate()
+
+        if self.verbosity >= 2:
+            for label, logs in (('Logged', inserted), ('Revised', revised)):
+                for log in logs:
+                    self.stdout.write(f"{label} Station Zone: {log.zone.name} | AQI: {log.air_quality_index}")
+
+        stats.update(created=len(new_zones), moved=len(moved), inserted=len(inserted), changed=len(revised))
+        return stats
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.services.snapshot_service import SnapshotService
+
+class Command(BaseCommand):
+    help = 'Rebuilds ZoneSnapshot rows (latest weather/traffic/health and ICU totals) from the log tables'
+
+    def handle(self, *args, **kwargs):
+        count = SnapshotService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt snapshots for {count} zones."))
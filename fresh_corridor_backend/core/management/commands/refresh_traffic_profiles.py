@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.services.traffic_profiles import TrafficProfileService
+
+class Command(BaseCommand):
+    help = 'Folds new RealTimeTraffic readings into the hour-of-week traffic profiles'
+
+    def handle(self, *args, **kwargs):
+        count = TrafficProfileService.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Folded {count} traffic readings into the profiles."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from core.services.rollup_service import RollupService
+from core.services.traffic_profiles import TrafficProfileService
+
+class Command(BaseCommand):
+    help = 'Rolls WeatherLog and RealTimeTraffic up into 5m/1h/1d buckets, then prunes raw rows past retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=sorted(RollupService.SOURCES), help='Only roll up this source')
+        parser.add_argument('--no-prune', action='store_true', help='Roll up without applying the retention policy')
+
+    def handle(self, *args, **options):
+        sources = [options['source']] if options['source'] else list(RollupService.SOURCES)
+        for source in sources:
+            count = RollupService.rollup(source)
+            self.stdout.write(f"{source}: rolled up {count} rows.")
+        # Traffic retention waits on the profile watermark too, so bring it up to date first
+        TrafficProfileService.refresh()
+
+        if options['no_prune']:
+            return
+        for table, count in RollupService.prune().items():
+            self.stdout.write(f"Pruned {count} from {table}.")
+        self.stdout.write(self.style.SUCCESS("Rollups up to date."))
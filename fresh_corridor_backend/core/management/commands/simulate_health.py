@@ -1,104 +1,219 @@
 import time
 import random
-import json
+
+import numpy as np
 from django.core.management.base import BaseCommand
-from core.models import Hospital, WeatherLog, HealthStats, CityZone
+from django.db import transaction
+from core.models import Hospital, WeatherLog, HealthStats, CityZone, ZoneSnapshot
+from core.services import health_drift
+from core.services.city_engine import CitySimulation
+from core.services.bulk_writes import update_columns
+from core.services.change_feed import ChangeFeed
+from core.services.pollutant_service import PollutantService
+from core.services.snapshot_service import SnapshotService
 
 class Command(BaseCommand):
     help = 'Simulates real-time fluctuations in hospital capacity and health/weather stats'
 
-    def handle(self, *args, **kwargs):
+    HOSPITAL_FIELDS = ('total_beds_icu', 'occupied_beds_icu', 'total_beds_general', 'occupied_beds_general', 'oxygen_supply_level')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between ticks (default 5)')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible drift')
+        parser.add_argument('--ticks', type=int, default=0, help='Stop after this many ticks (default: run forever)')
+        parser.add_argument('--replay', type=float, metavar='HOURS',
+                            help='Run the discrete-event engine for this many simulated hours as fast as possible, then exit')
+        parser.add_argument('--start-hour', type=float, default=0.0, help='With --replay: clock hour the replay starts at (AQI diurnal cycle)')
+        parser.add_argument('--dry-run', action='store_true', help='With --replay: report results without writing them')
+
+    def handle(self, *args, **options):
+        if options['replay'] is not None:
+            self.stdout.write(self.style.SUCCESS(
+                f"Replaying {options['replay']:g} simulated hours of health dynamics"
+                f"{' (dry run)' if options['dry_run'] else ''}..."
+            ))
+            self.ensure_hospitals()
+            return self.replay(options['replay'], seed=options['seed'] or 0, start_hour=options['start_hour'],
+                               dry_run=options['dry_run'])
+
         self.stdout.write(self.style.SUCCESS('Starting Health Monitor Simulation... (Press Ctrl+C to stop)'))
-        
-        while True:
+        self.ensure_hospitals()
+        rng = np.random.default_rng(options['seed'])
+        interval, ticks = options['interval'], options['ticks']
+        done = 0
+        while not ticks or done < ticks:
             try:
-                # 1. Update Hospitals
-                hospitals = Hospital.objects.all()
-                if not hospitals.exists():
-                    self.stdout.write(self.style.WARNING("No hospitals found! Generating synthetic data..."))
-                    hospital_names = [
-                        "Delhi City General Hospital", "Capital Care Medical Center", "North Delhi Trauma Center",
-                        "South Extension Speciality Hospital", "Yamuna Bank Trust Hospital", "Red Fort Memorial Hospital",
-                        "Dwarka Community Health Center", "Rohini Super Speciality", "Okhla Industrial Medical Bay",
-                        "Connaught Place Emergency Center", "Lajpat Nagar Maternity Home", "Karol Bagh Chest Clinic"
-                    ]
-                    zones = list(CityZone.objects.all())
-                    if not zones: # Last resort fallback if zones missing
-                         z = CityZone.objects.create(name="Zone A (Downtown)", latitude=28.6304, longitude=77.2177, area_type="Commercial")
-                         zones = [z]
-
-                    for name in hospital_names:
-                        is_big = "General" in name or "Speciality" in name
-                        Hospital.objects.create(
-                            name=name,
-                            zone=random.choice(zones),
-                            total_beds_icu=random.randint(50, 150) if is_big else random.randint(20, 60),
-                            occupied_beds_icu=random.randint(10, 40),
-                            total_beds_general=random.randint(300, 800) if is_big else random.randint(100, 250),
-                            occupied_beds_general=random.randint(50, 200),
-                            oxygen_supply_level=random.randint(80, 100),
-                            is_live_data=False
-                        )
-                    self.stdout.write(self.style.SUCCESS(f"Created {len(hospital_names)} simulated hospitals."))
-                    hospitals = Hospital.objects.all()
-
-                for h in hospitals:
-                    # Randomly discharge or admit patient
-                    fluctuation = random.choice([-1, 0, 1, 2])
-                    h.occupied_beds_icu = max(0, min(h.total_beds_icu, h.occupied_beds_icu + fluctuation))
-                    
-                    gen_flux = random.choice([-2, -1, 0, 1, 2, 3])
-                    h.occupied_beds_general = max(0, min(h.total_beds_general, h.occupied_beds_general + gen_flux))
-                    
-                    # AUTO-SCALE: If data is legacy (too small), boost it
-                    if h.total_beds_icu < 20: 
-                        h.total_beds_icu = random.randint(30, 80)
-                        h.occupied_beds_icu = int(h.total_beds_icu * 0.7)
-                    if h.total_beds_general < 100:
-                        h.total_beds_general = random.randint(150, 400)
-                        h.occupied_beds_general = int(h.total_beds_general * 0.8)
-
-                    # Oxygen supply slight fluctuation
-                    h.oxygen_supply_level = max(0, min(100, h.oxygen_supply_level + random.uniform(-2, 2)))
-                    h.save()
-                    
-                # 2. Update Environmental Factors (AQI, Temp causes Health changes)
-                zones = CityZone.objects.all()
-                for zone in zones:
-                    weather = WeatherLog.objects.filter(zone=zone).last()
-                    health = HealthStats.objects.filter(zone=zone).last()
-                    
-                    if weather:
-                        # AQI drift
-                        weather.air_quality_index = max(0, weather.air_quality_index + random.randint(-5, 8))
-                        
-                        # Simulate Pollutant Details
-                        pm25 = int(weather.air_quality_index * random.uniform(0.7, 0.9))
-                        pm10 = int(weather.air_quality_index * random.uniform(0.8, 1.1))
-                        no2 = random.randint(20, 80)
-                        so2 = random.randint(10, 40)
-                        dummy_pollutants = [
-                            {"indexId": "PM2.5", "avg": pm25, "Hourly_sub_index": pm25},
-                            {"indexId": "PM10", "avg": pm10, "Hourly_sub_index": pm10},
-                            {"indexId": "NO2", "avg": no2, "Hourly_sub_index": no2},
-                            {"indexId": "SO2", "avg": so2, "Hourly_sub_index": so2}
-                        ]
-                        weather.pollutant_details = json.dumps(dummy_pollutants)
-                        weather.save()
-                    
-                    if health and weather:
-                         # 5% chance of case spike if AQI is bad
-                        if weather.air_quality_index > 200 and random.random() > 0.95:
-                            health.respiratory_cases_active += random.randint(1, 5)
-                        elif random.random() > 0.8: # Random recovery
-                            health.respiratory_cases_active = max(0, health.respiratory_cases_active - 1)
-                        health.save()
-                
-                self.stdout.write(f"Updated live stats at {time.strftime('%H:%M:%S')}")
-                time.sleep(5) # Update every 5 seconds
-                
+                started = time.monotonic()
+                self.tick(rng)
+                done += 1
+                self.stdout.write(f"Updated live stats at {time.strftime('%H:%M:%S')} ({(time.monotonic() - started) * 1000:.0f} ms)")
+                if not ticks or done < ticks:
+                    time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Error: {e}"))
-                time.sleep(5)
+                time.sleep(interval)
+
+    def ensure_hospitals(self):
+        if Hospital.objects.exists():
+            return
+        self.stdout.write(self.style.WARNING("No hospitals found! Generating synthetic data..."))
+        hospital_names = [
+            "Delhi City General Hospital", "Capital Care Medical Center", "North Delhi Trauma Center",
+            "South Extension Speciality Hospital", "Yamuna Bank Trust Hospital", "Red Fort Memorial Hospital",
+            "Dwarka Community Health Center", "Rohini Super Speciality", "Okhla Industrial Medical Bay",
+            "Connaught Place Emergency Center", "Lajpat Nagar Maternity Home", "Karol Bagh Chest Clinic"
+        ]
+        zones = list(CityZone.objects.all())
+        if not zones: # Last resort fallback if zones missing
+             z = CityZone.objects.create(name="Zone A (Downtown)", latitude=28.6304, longitude=77.2177, area_type="Commercial")
+             zones = [z]
+
+        for name in hospital_names:
+            is_big = "General" in name or "Speciality" in name
+            Hospital.objects.create(
+                name=name,
+                zone=random.choice(zones),
+                total_beds_icu=random.randint(50, 150) if is_big else random.randint(20, 60),
+                occupied_beds_icu=random.randint(10, 40),
+                total_beds_general=random.randint(300, 800) if is_big else random.randint(100, 250),
+                occupied_beds_general=random.randint(50, 200),
+                oxygen_supply_level=random.randint(80, 100),
+                is_live_data=False
+            )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(hospital_names)} simulated hospitals."))
+
+    def tick(self, rng):
+        """
+        One vectorized update of every hospital and zone. State is read in a few queries,
+        drifted with NumPy and written back in bulk, restricted to the drifting columns,
+        so concurrent edits to other fields (names, zones, flags) are never overwritten.
+        """
+        with transaction.atomic():
+            self.tick_hospitals(rng)
+            self.tick_zones(rng)
+
+    def load_hospitals(self):
+        rows = list(Hospital.objects.order_by('pk').values_list('pk', 'zone_id', *self.HOSPITAL_FIELDS))
+        cols = np.array(rows, dtype=np.int64).reshape(len(rows), 2 + len(self.HOSPITAL_FIELDS)).T
+        return cols[0], cols[1], cols[2:]
+
+    def load_zones(self):
+        # Latest readings per zone come straight off the zone snapshots (one query)
+        rows = list(
+            ZoneSnapshot.objects.filter(weather_log__isnull=False).order_by('pk')
+            .values_list('zone_id', 'weather_log_id', 'air_quality_index', 'health_stats_id', 'respiratory_cases_active')
+        )
+        zone_ids = [r[0] for r in rows]
+        weather_ids = [r[1] for r in rows]
+        health_ids = [r[3] for r in rows]
+        aqi = np.array([r[2] or 0 for r in rows], dtype=np.int64)
+        cases = np.array([(r[4] or 0) if r[3] else -1 for r in rows], dtype=np.int64)
+        return zone_ids, weather_ids, health_ids, aqi, cases
+
+    def save_hospitals(self, pks, zone_ids, before, after):
+        # Capacity is rewritten only for the legacy rows that were rescaled
+        changed_totals = (after[0] != before[0]) | (after[2] != before[2])
+        fields = list(self.HOSPITAL_FIELDS)
+        drift_fields = [f for f in fields if f.startswith('occupied') or f == 'oxygen_supply_level']
+        values = dict(zip(fields, after.tolist()))
+
+        update_columns(Hospital, pks.tolist(), {f: values[f] for f in drift_fields})
+        rescaled = np.flatnonzero(changed_totals)
+        if len(rescaled):
+            update_columns(Hospital, pks[rescaled].tolist(), {f: [values[f][i] for i in rescaled] for f in fields})
+
+        # Only hospitals whose numbers moved go out to the live dashboards
+        changed = np.flatnonzero((after != before).any(axis=0)).tolist()
+        ids = pks.tolist()
+        ChangeFeed.publish('hospitals', [dict(id=ids[i], **{f: values[f][i] for f in fields}) for i in changed])
+
+        # Per-zone ICU totals for the snapshots (signals don't fire on bulk writes)
+        zones, inverse = np.unique(zone_ids, return_inverse=True)
+        SnapshotService.bulk_apply(
+            zones.tolist(),
+            hospital_count=np.bincount(inverse).tolist(),
+            total_beds_icu=np.bincount(inverse, weights=after[0]).astype(int).tolist(),
+            occupied_beds_icu=np.bincount(inverse, weights=after[1]).astype(int).tolist(),
+        )
+
+    def save_zones(self, zone_ids, weather_ids, health_ids, aqi, cases, new_aqi, new_cases, pollutants):
+        rows = pollutants.tolist()
+        details = [health_drift.pollutant_json(row) for row in rows]
+        aqi_list, cases_list = new_aqi.tolist(), new_cases.tolist()
+
+        update_columns(WeatherLog, weather_ids, {'air_quality_index': aqi_list, 'pollutant_details': details})
+        PollutantService.write({wid: health_drift.pollutant_rows(row) for wid, row in zip(weather_ids, rows)})
+        moved = np.flatnonzero(new_cases != cases).tolist()
+        update_columns(HealthStats, [health_ids[i] for i in moved],
+                       {'respiratory_cases_active': [cases_list[i] for i in moved]})
+
+        changed = np.flatnonzero((new_aqi != aqi) | (new_cases != cases)).tolist()
+        ChangeFeed.publish('zones', [
+            {'zone_id': zone_ids[i], 'aqi': aqi_list[i], 'cases': cases_list[i] if cases_list[i] >= 0 else None}
+            for i in changed
+        ])
+
+        SnapshotService.bulk_apply(
+            zone_ids,
+            air_quality_index=aqi_list,
+            pollutant_details=details,
+            respiratory_cases_active=[c if c >= 0 else None for c in cases_list],
+        )
+
+    def tick_hospitals(self, rng):
+        pks, zone_ids, before = self.load_hospitals()
+        if not len(pks):
+            return
+        after = np.array(health_drift.hospital_step(rng, *before))
+        self.save_hospitals(pks, zone_ids, before, after)
+
+    def tick_zones(self, rng):
+        # 2. Update Environmental Factors (AQI, Temp causes Health changes)
+        zone_ids, weather_ids, health_ids, aqi, cases = self.load_zones()
+        if not zone_ids:
+            return
+        new_aqi, new_cases, pollutants = health_drift.zone_step(rng, aqi, cases)
+        self.save_zones(zone_ids, weather_ids, health_ids, aqi, cases, new_aqi, new_cases, pollutants)
+
+    def replay(self, hours, seed=0, start_hour=0.0, dry_run=False):
+        """Runs the discrete-event engine over the current city state and (unless dry_run) saves the end state."""
+        with transaction.atomic():
+            pks, hospital_zone_ids, before = self.load_hospitals()
+            zone_ids, weather_ids, health_ids, aqi, cases = self.load_zones()
+            position = {z: i for i, z in enumerate(zone_ids)}
+            icu_total, icu_occupied, general_total, general_occupied, oxygen = before
+
+            sim = CitySimulation(
+                [position.get(z, -1) for z in hospital_zone_ids.tolist()],
+                icu_total, icu_occupied, general_total, general_occupied,
+                aqi, cases, seed=seed, start_hour=start_hour,
+            )
+            started = time.perf_counter()
+            stats = sim.run(hours)
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"Replayed {hours:g} h over {len(pks)} hospitals / {len(zone_ids)} zones: "
+                f"{stats['events']} events in {elapsed:.2f} s ({hours * 3600 / max(elapsed, 1e-9):,.0f}x real time)"
+            )
+            for key, value in stats.items():
+                if key != 'events':
+                    self.stdout.write(f"  {key}: {value}")
+            if sim.timeline:
+                peak = max(sim.timeline, key=lambda s: s['icu_occupied'])
+                self.stdout.write(f"  peak ICU occupancy: {peak['icu_occupied']} at hour {peak['hour']:g} ({peak['icu_utilization']})")
+
+            if dry_run:
+                return
+            end = sim.state()
+            if len(pks):
+                after = np.array([icu_total, end['icu_occupied'], general_total, end['general_occupied'], oxygen])
+                self.save_hospitals(pks, hospital_zone_ids, before, after)
+            if zone_ids:
+                rng = np.random.default_rng(seed)
+                self.save_zones(zone_ids, weather_ids, health_ids, aqi, cases, end['aqi'], end['cases'],
+                                health_drift.pollutants_for(rng, end['aqi']))
+            self.stdout.write(self.style.SUCCESS("Saved end state."))
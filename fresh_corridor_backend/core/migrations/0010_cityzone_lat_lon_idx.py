@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_citizenreport_image_url_citizenreport_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cityzone',
+            index=models.Index(fields=['latitude', 'longitude'], name='cityzone_lat_lon_idx'),
+        ),
+    ]
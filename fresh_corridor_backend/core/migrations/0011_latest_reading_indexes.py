@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cityzone_lat_lon_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthstats',
+            index=models.Index(fields=['zone', 'timestamp'], name='healthstats_zone_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficstats',
+            index=models.Index(fields=['zone', 'timestamp'], name='trafficstats_zone_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherlog',
+            index=models.Index(fields=['zone', 'timestamp'], name='weatherlog_zone_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+SOURCES = [
+    # (model, snapshot FK, timestamp field, copied fields)
+    ('WeatherLog', 'weather_log', 'weather_timestamp',
+     ['temperature_c', 'precipitation_mm', 'wind_speed_kmh', 'visibility_km', 'air_quality_index', 'pollutant_details']),
+    ('TrafficStats', 'traffic_stats', 'traffic_timestamp', ['congestion_level', 'is_road_closed']),
+    ('HealthStats', 'health_stats', 'health_timestamp', ['respiratory_cases_active']),
+]
+
+
+def backfill_snapshots(apps, schema_editor):
+    ZoneSnapshot = apps.get_model('core', 'ZoneSnapshot')
+    Hospital = apps.get_model('core', 'Hospital')
+    snapshots = {}
+
+    for model_name, fk, ts_field, fields in SOURCES:
+        Model = apps.get_model('core', model_name)
+        # Streamed in (zone, timestamp, pk) order: the last row seen per zone is its latest
+        rows = Model.objects.order_by('zone_id', 'timestamp', 'pk').values_list('zone_id', 'pk', 'timestamp', *fields)
+        for zone_id, pk, ts, *values in rows.iterator(chunk_size=2000):
+            snap = snapshots.setdefault(zone_id, {})
+            snap[f'{fk}_id'] = pk
+            snap[ts_field] = ts
+            snap.update(zip(fields, values))
+
+    totals = Hospital.objects.values('zone_id').annotate(
+        hospital_count=Count('pk'), total_beds_icu=Sum('total_beds_icu'), occupied_beds_icu=Sum('occupied_beds_icu'),
+    )
+    for row in totals:
+        snapshots.setdefault(row.pop('zone_id'), {}).update(row)
+
+    ZoneSnapshot.objects.bulk_create(
+        [ZoneSnapshot(zone_id=zone_id, **values) for zone_id, values in snapshots.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_latest_reading_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoneSnapshot',
+            fields=[
+                ('zone', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='core.cityzone')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('weather_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('temperature_c', models.FloatField(blank=True, null=True)),
+                ('precipitation_mm', models.FloatField(blank=True, null=True)),
+                ('wind_speed_kmh', models.FloatField(blank=True, null=True)),
+                ('visibility_km', models.FloatField(blank=True, null=True)),
+                ('air_quality_index', models.IntegerField(blank=True, null=True)),
+                ('pollutant_details', models.TextField(default='{}')),
+                ('traffic_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('congestion_level', models.FloatField(blank=True, null=True)),
+                ('is_road_closed', models.BooleanField(default=False)),
+                ('health_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('respiratory_cases_active', models.IntegerField(blank=True, null=True)),
+                ('hospital_count', models.IntegerField(default=0)),
+                ('total_beds_icu', models.IntegerField(default=0)),
+                ('occupied_beds_icu', models.IntegerField(default=0)),
+                ('health_stats', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.healthstats')),
+                ('traffic_stats', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.trafficstats')),
+                ('weather_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.weatherlog')),
+            ],
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
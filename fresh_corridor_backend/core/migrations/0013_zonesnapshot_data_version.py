@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_zonesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zonesnapshot',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
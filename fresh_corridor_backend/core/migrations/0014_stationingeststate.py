@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_zonesnapshot_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationIngestState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station_name', models.CharField(max_length=100, unique=True)),
+                ('last_update', models.CharField(blank=True, default='', max_length=40)),
+                ('content_hash', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('weather_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.weatherlog')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.cityzone')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_stationingeststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrafficProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell_row', models.IntegerField()),
+                ('cell_col', models.IntegerField()),
+                ('hour_of_week', models.PositiveSmallIntegerField()),
+                ('sample_count', models.IntegerField(default=0)),
+                ('current_speed_sum', models.FloatField(default=0)),
+                ('free_flow_speed_sum', models.FloatField(default=0)),
+                ('current_travel_time_sum', models.FloatField(default=0)),
+                ('free_flow_travel_time_sum', models.FloatField(default=0)),
+                ('congestion_score_sum', models.FloatField(default=0)),
+                ('closure_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cell_row', 'cell_col', 'hour_of_week'), name='trafficprofile_cell_hour_uniq')],
+            },
+        ),
+    ]
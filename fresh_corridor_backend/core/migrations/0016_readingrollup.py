@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_trafficprofile_rollupwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('metric', models.CharField(max_length=40)),
+                ('resolution', models.CharField(choices=[('5m', '5m'), ('1h', '1h'), ('1d', '1d')], max_length=3)),
+                ('location_key', models.CharField(max_length=40)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField()),
+                ('maximum', models.FloatField()),
+                ('zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.cityzone')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'metric', 'location_key', 'resolution', 'bucket_start'), name='readingrollup_series_bucket_uniq')],
+            },
+        ),
+    ]
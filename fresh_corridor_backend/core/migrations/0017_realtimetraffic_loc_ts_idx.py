@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_readingrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='realtimetraffic',
+            index=models.Index(fields=['latitude', 'longitude', 'timestamp'], name='realtimetraffic_loc_ts_idx'),
+        ),
+    ]
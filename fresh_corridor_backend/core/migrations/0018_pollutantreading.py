@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_realtimetraffic_loc_ts_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollutantReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('pollutant', models.CharField(max_length=20)),
+                ('avg', models.FloatField(blank=True, null=True)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('sub_index', models.FloatField(blank=True, null=True)),
+                ('weather_log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pollutant_readings', to='core.weatherlog')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.cityzone')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pollutant', 'timestamp'], name='pollutantreading_ts_idx')],
+                'constraints': [models.UniqueConstraint(fields=('weather_log', 'pollutant'), name='pollutantreading_log_pollutant_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+import json
+
+from django.db import migrations, transaction
+
+BATCH = 2000 # weather logs per transaction
+
+
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def backfill(apps, schema_editor):
+    """
+    Parses every WeatherLog.pollutant_details into PollutantReading rows, in pk-ordered
+    batches that commit separately, so a large table is never held in one transaction
+    or in memory. Re-running picks up after the last log that already has readings.
+    """
+    WeatherLog = apps.get_model('core', 'WeatherLog')
+    PollutantReading = apps.get_model('core', 'PollutantReading')
+    db = schema_editor.connection.alias
+
+    last = PollutantReading.objects.using(db).order_by('-weather_log_id').values_list('weather_log_id', flat=True).first() or 0
+    while True:
+        with transaction.atomic(using=db):
+            logs = list(
+                WeatherLog.objects.using(db).filter(pk__gt=last).order_by('pk')
+                .values_list('pk', 'zone_id', 'timestamp', 'pollutant_details')[:BATCH]
+            )
+            if not logs:
+                return
+            readings = []
+            for pk, zone_id, timestamp, details in logs:
+                try:
+                    details = json.loads(details or '[]')
+                except ValueError:
+                    continue
+                if not isinstance(details, list):
+                    continue
+                rows = {} # last entry wins for a repeated pollutant, as in PollutantService.parse
+                for p in details:
+                    pollutant = str(p.get('indexId') or p.get('id') or '').strip().upper() if isinstance(p, dict) else ''
+                    if pollutant:
+                        rows[pollutant] = PollutantReading(
+                            weather_log_id=pk, zone_id=zone_id, timestamp=timestamp, pollutant=pollutant,
+                            avg=_num(p.get('avg')), minimum=_num(p.get('min')), maximum=_num(p.get('max')),
+                            sub_index=_num(p.get('Hourly_sub_index', p.get('sub_index'))),
+                        )
+                readings.extend(rows.values())
+            PollutantReading.objects.using(db).bulk_create(readings, batch_size=500)
+            last = logs[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('core', '0018_pollutantreading'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
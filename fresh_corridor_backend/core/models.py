@@ -25,6 +25,12 @@ class CityZone(models.Model):
     average_income_tier = models.CharField(max_length=20, default='Medium') # Low, Medium, High
     area_type = models.CharField(max_length=50, default='Mixed') # Residential, Industrial, Commercial
 
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for radius queries (see core.utils.bounding_box)
+            models.Index(fields=['latitude', 'longitude'], name='cityzone_lat_lon_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -38,9 +44,36 @@ class WeatherLog(models.Model):
     air_quality_index = models.IntegerField(default=50) # lower is better
     pollutant_details = models.TextField(default="{}") # JSON string of detailed pollutants (PM2.5, SO2, etc.)
 
+    class Meta:
+        indexes = [models.Index(fields=['zone', 'timestamp'], name='weatherlog_zone_ts_idx')]
+
     def __str__(self):
         return f"{self.zone.name} - {self.timestamp}"
 
+class PollutantReading(models.Model):
+    """
+    One pollutant of a WeatherLog as typed columns, so pollutant filters and aggregates
+    run in the database. Mirrors the log's pollutant_details JSON, which is kept for the
+    API; the zone and timestamp are copied from the log for the indexes.
+    """
+    weather_log = models.ForeignKey(WeatherLog, on_delete=models.CASCADE, related_name='pollutant_readings')
+    zone = models.ForeignKey(CityZone, on_delete=models.CASCADE, related_name='+')
+    timestamp = models.DateTimeField() # the log's timestamp
+    pollutant = models.CharField(max_length=20) # CPCB indexId, upper-case, e.g. PM2.5, NO2, OZONE
+    avg = models.FloatField(null=True, blank=True)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+    sub_index = models.FloatField(null=True, blank=True) # CPCB Hourly_sub_index
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['weather_log', 'pollutant'], name='pollutantreading_log_pollutant_uniq'),
+        ]
+        indexes = [models.Index(fields=['pollutant', 'timestamp'], name='pollutantreading_ts_idx')]
+
+    def __str__(self):
+        return f"{self.pollutant} {self.avg} @ {self.timestamp}"
+
 class Hospital(models.Model):
     name = models.CharField(max_length=100)
     zone = models.ForeignKey(CityZone, on_delete=models.CASCADE)
@@ -64,6 +97,9 @@ class TrafficStats(models.Model):
     congestion_level = models.FloatField(default=0.0) # 0.0 to 1.0 (1.0 = heavy traffic)
     is_road_closed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=['zone', 'timestamp'], name='trafficstats_zone_ts_idx')]
+
     def __str__(self):
         return f"Traffic in {self.zone.name}"
 
@@ -94,6 +130,7 @@ class RealTimeTraffic(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['latitude', 'longitude', 'timestamp'], name='realtimetraffic_loc_ts_idx')]
         
     def __str__(self):
         return f"Traffic at ({self.latitude}, {self.longitude}) - {self.congestion_score}% congestion"
@@ -102,10 +139,164 @@ class HealthStats(models.Model):
     zone = models.ForeignKey(CityZone, on_delete=models.CASCADE)
     timestamp = models.DateTimeField(auto_now_add=True)
     respiratory_cases_active = models.IntegerField(default=0)
-    
+
+    class Meta:
+        indexes = [models.Index(fields=['zone', 'timestamp'], name='healthstats_zone_ts_idx')]
+
     def __str__(self):
         return f"Health Stats {self.zone.name}"
 
+class ZoneSnapshot(models.Model):
+    """
+    Denormalized latest state of a zone, kept current on write by SnapshotService
+    so "latest weather/traffic/health" reads are a single primary-key lookup.
+    """
+    zone = models.OneToOneField(CityZone, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    updated_at = models.DateTimeField(auto_now=True)
+    data_version = models.PositiveIntegerField(default=0) # Bumped on every write; keys memoized simulations
+
+    # Latest WeatherLog
+    weather_log = models.ForeignKey(WeatherLog, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    weather_timestamp = models.DateTimeField(null=True, blank=True)
+    temperature_c = models.FloatField(null=True, blank=True)
+    precipitation_mm = models.FloatField(null=True, blank=True)
+    wind_speed_kmh = models.FloatField(null=True, blank=True)
+    visibility_km = models.FloatField(null=True, blank=True)
+    air_quality_index = models.IntegerField(null=True, blank=True)
+    pollutant_details = models.TextField(default="{}")
+
+    # Latest TrafficStats
+    traffic_stats = models.ForeignKey(TrafficStats, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    traffic_timestamp = models.DateTimeField(null=True, blank=True)
+    congestion_level = models.FloatField(null=True, blank=True)
+    is_road_closed = models.BooleanField(default=False)
+
+    # Latest HealthStats
+    health_stats = models.ForeignKey(HealthStats, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    health_timestamp = models.DateTimeField(null=True, blank=True)
+    respiratory_cases_active = models.IntegerField(null=True, blank=True)
+
+    # Hospital totals
+    hospital_count = models.IntegerField(default=0)
+    total_beds_icu = models.IntegerField(default=0)
+    occupied_beds_icu = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Snapshot {self.zone.name}"
+
+class StationIngestState(models.Model):
+    """
+    Last CPCB reading ingested per monitoring station, so fetch_real_aqi only
+    writes a WeatherLog when the station has actually published something new.
+    """
+    station_name = models.CharField(max_length=100, unique=True)
+    zone = models.ForeignKey(CityZone, on_delete=models.CASCADE, related_name='+')
+    last_update = models.CharField(max_length=40, blank=True, default='') # CPCB lastUpdate, verbatim
+    content_hash = models.CharField(max_length=40)
+    weather_log = models.ForeignKey(WeatherLog, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.station_name} @ {self.last_update}"
+
+class RollupWatermark(models.Model):
+    """
+    How far an incremental rollup has read its source table: every source row with
+    pk <= last_id has been folded in. One row per rollup.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+class TrafficProfile(models.Model):
+    """
+    Typical traffic per location and hour of week, rolled up from RealTimeTraffic by
+    TrafficProfileService. Locations are CELL_DEG grid cells; sums rather than means
+    are stored so new readings merge in exactly.
+    """
+    CELL_DEG = 0.005 # ~500 m
+
+    cell_row = models.IntegerField() # floor(latitude / CELL_DEG)
+    cell_col = models.IntegerField() # floor(longitude / CELL_DEG)
+    hour_of_week = models.PositiveSmallIntegerField() # 0 = Monday 00:00-01:00, local time
+    sample_count = models.IntegerField(default=0)
+    current_speed_sum = models.FloatField(default=0)
+    free_flow_speed_sum = models.FloatField(default=0)
+    current_travel_time_sum = models.FloatField(default=0)
+    free_flow_travel_time_sum = models.FloatField(default=0)
+    congestion_score_sum = models.FloatField(default=0)
+    closure_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cell_row', 'cell_col', 'hour_of_week'], name='trafficprofile_cell_hour_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Traffic profile ({self.cell_row}, {self.cell_col}) h{self.hour_of_week}"
+
+class ReadingRollup(models.Model):
+    """
+    count/min/mean/max of one metric of a raw log table (WeatherLog, RealTimeTraffic)
+    over a fixed UTC time bucket, per zone or per location cell. Built incrementally by
+    RollupService so history reads don't scan the raw tables, which are pruned.
+    """
+    RESOLUTIONS = {'5m': 300, '1h': 3600, '1d': 86400} # bucket width in seconds
+
+    source = models.CharField(max_length=20) # 'weather' or 'traffic'
+    metric = models.CharField(max_length=40) # raw field name, e.g. air_quality_index
+    resolution = models.CharField(max_length=3, choices=[(r, r) for r in RESOLUTIONS])
+    location_key = models.CharField(max_length=40) # 'zone:<id>' or 'cell:<row>:<col>' (TrafficProfile grid)
+    zone = models.ForeignKey(CityZone, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    bucket_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    total = models.FloatField(default=0)
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'metric', 'location_key', 'resolution', 'bucket_start'],
+                                    name='readingrollup_series_bucket_uniq'),
+        ]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.source}.{self.metric} {self.location_key} {self.resolution} @ {self.bucket_start}"
+
+class ChangeEvent(models.Model):
+    """
+    Append-only feed of live-data changes (hospital occupancy, zone AQI and case counts),
+    one row per write batch, read by the SSE health stream. The pk is the stream's event
+    id. Rows are short-lived; ChangeFeed prunes them after CHANGE_FEED_RETENTION seconds.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    kind = models.CharField(max_length=20) # 'hospitals' or 'zones'
+    data = models.TextField() # JSON list of changed items
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} @ {self.created_at}"
+
+class DataVersion(models.Model):
+    """
+    Change counter per model (by label, e.g. core.Hospital), bumped on every write by
+    signals and the bulk write paths. Read APIs derive their ETags from it, so an
+    unchanged poll is answered with 304 before anything is queried or serialized.
+    """
+    name = models.CharField(max_length=60, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
 class AgriSupply(models.Model):
     crop_type = models.CharField(max_length=50)
     quantity_kg = models.FloatField()
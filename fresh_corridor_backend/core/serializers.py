@@ -24,12 +24,36 @@ class HospitalSerializer(serializers.ModelSerializer):
         model = Hospital
         fields = '__all__'
 
+class HospitalDistanceSerializer(HospitalSerializer):
+    distance_km = serializers.FloatField(read_only=True)
+
 class TrafficStatsSerializer(serializers.ModelSerializer):
     zone_name = serializers.ReadOnlyField(source='zone.name')
     class Meta:
         model = TrafficStats
         fields = '__all__'
 
+# Latest readings served from ZoneSnapshot, shaped like the log serializers above
+class SnapshotWeatherSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='weather_log_id')
+    zone_name = serializers.ReadOnlyField(source='zone.name')
+    timestamp = serializers.DateTimeField(source='weather_timestamp')
+    temperature_c = serializers.FloatField()
+    precipitation_mm = serializers.FloatField()
+    wind_speed_kmh = serializers.FloatField()
+    visibility_km = serializers.FloatField()
+    air_quality_index = serializers.IntegerField()
+    pollutant_details = serializers.CharField()
+    zone = serializers.IntegerField(source='zone_id')
+
+class SnapshotTrafficSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='traffic_stats_id')
+    zone_name = serializers.ReadOnlyField(source='zone.name')
+    timestamp = serializers.DateTimeField(source='traffic_timestamp')
+    congestion_level = serializers.FloatField()
+    is_road_closed = serializers.BooleanField()
+    zone = serializers.IntegerField(source='zone_id')
+
 class AgriSupplySerializer(serializers.ModelSerializer):
     origin_zone_name = serializers.ReadOnlyField(source='origin_zone.name')
     class Meta:
@@ -1,12 +1,30 @@
-import requests
 from datetime import datetime, timezone
 import math
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from core.services.cpcb_feed import CPCB_FEED_URL, FEED_CHUNK_SIZE, iter_stations
+from core.services.station_store import StationStore
+from core.services.upstream import upstream
 
 class AQIService:
     _instance = None
-    CPCB_FEED_URL = "https://airquality.cpcb.gov.in/caaqms/iit_rss_feed_with_coordinates"
-    STATION_POLLUTANTS_LIVE = {}
-    STATIONS = [] # In-memory cache of stations with AQI
+    CPCB_FEED_URL = CPCB_FEED_URL
+    STORE = StationStore() # Last good snapshot, swapped whole on each refresh
+    MAX_NEAREST = 100 # cap for ?k= on /api/get_stations
+
+    # Background refresh (stale-while-revalidate): requests never wait on CPCB
+    REFRESH_INTERVAL = getattr(settings, 'AQI_REFRESH_INTERVAL', 600) # seconds
+    REFRESH_JITTER = getattr(settings, 'AQI_REFRESH_JITTER', 0.1) # +/- fraction of the interval
+    RETRY_BASE = getattr(settings, 'AQI_RETRY_BASE', 15) # first retry delay after a failure
+    MAX_BACKOFF = getattr(settings, 'AQI_MAX_BACKOFF', 1800)
+
+    _refresh_lock = threading.Lock() # single-flight: at most one upstream fetch at a time
+    _refresher = None
+    _refresher_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -32,101 +50,120 @@ class AQIService:
         est_raw = 400 + (factor / 20.0)
         return round(cls._sanitize_co2(est_raw), 2)
 
+    @classmethod
+    def _station_record(cls, rec):
+        """API shape for one normalized CPCB record (see core.services.cpcb_feed)."""
+        pollutants_detail = []
+        pm25 = pm10 = no2 = co = None
+
+        for p in rec['pollutants']:
+            idx = str(p.get("indexId")).lower()
+            avg = p.get("avg")
+
+            pollutants_detail.append({
+                "id": p.get("indexId"),
+                "min": p.get("min"),
+                "max": p.get("max"),
+                "avg": avg,
+                "sub_index": p.get("Hourly_sub_index")
+            })
+
+            try: avg_f = float(avg)
+            except: avg_f = None
+
+            if "pm2" in idx: pm25 = pm25 or avg_f
+            elif "pm10" in idx: pm10 = pm10 or avg_f
+            elif "no2" in idx: no2 = no2 or avg_f
+            elif "co" in idx: co = co or avg_f
+
+        return {
+            "name": rec['name'],
+            "city": rec['city'],
+            "state": rec['state'],
+            "lat": rec['lat'],
+            "lon": rec['lon'],
+            "aqi": rec['aqi'],
+            "predominant_parameter": rec['predominant_parameter'],
+            "pollutants": pollutants_detail,
+            "co2_estimated": cls.estimate_co2_from_pollutants(pm25, pm10, no2, co),
+            "live_ts": rec['last_update'] or datetime.now(timezone.utc).isoformat()
+        }
+
     @classmethod
     def fetch_live_data(cls):
-        """Fetch and parse CPCB data."""
+        """Fetch CPCB data, parsing stations as the response streams in."""
         try:
-            resp = requests.get(cls.CPCB_FEED_URL, timeout=15)
-            resp.raise_for_status()
-            payload = resp.json()
+            with upstream.get(cls.CPCB_FEED_URL, timeout=15, stream=True) as resp:
+                resp.raise_for_status()
+                new_stations = [cls._station_record(rec) for rec in iter_stations(resp.iter_content(FEED_CHUNK_SIZE))]
         except Exception as e:
             print(f"[AQI Service] Fetch failed: {e}")
             return False
 
-        # Normalize payload
-        if isinstance(payload, list): state_objs = payload
-        elif isinstance(payload, dict):
-            # Try to find list in common keys
-            for k in ["data", "results", "stations", "feeds"]:
-                if isinstance(payload.get(k), list):
-                    state_objs = payload[k]
-                    break
-            else:
-                 # heuristic
-                 for v in payload.values():
-                    if isinstance(v, list) and v:
-                         if isinstance(v[0], dict) and ("stateId" in v[0] or "citiesInState" in v[0]):
-                             state_objs = v
-                             break
-                 else:
-                     state_objs = []
-        else: state_objs = []
-
-        new_stations = []
-
-        for state in state_objs:
-             cities = state.get("citiesInState") or state.get("cities") or state.get("stations") or []
-             # Flatten if needed
-             if not isinstance(cities, list) and isinstance(state.get("stations"), list):
-                 cities = [{"cityId": state.get("cityId"), "stationsInCity": state.get("stations")}]
-             
-             for city in cities:
-                 stations_list = city.get("stationsInCity") or city.get("stations") or []
-                 for st in stations_list:
-                     if not isinstance(st, dict): continue
-                     
-                     st_name = st.get("stationName") or st.get("Station")
-                     try:
-                         lat = float(st.get("latitude") or st.get("lat"))
-                         lon = float(st.get("longitude") or st.get("lon"))
-                     except: continue
-
-                     # Pollutants
-                     pollutants_detail = []
-                     pm25 = pm10 = no2 = co = None
-                     
-                     raw_p = st.get("pollutants") or []
-                     for p in raw_p:
-                         idx = str(p.get("indexId")).lower()
-                         avg = p.get("avg")
-                         
-                         pollutants_detail.append({
-                             "id": p.get("indexId"),
-                             "min": p.get("min"),
-                             "max": p.get("max"),
-                             "avg": avg,
-                             "sub_index": p.get("Hourly_sub_index")
-                         })
-
-                         try: avg_f = float(avg)
-                         except: avg_f = None
-                         
-                         if "pm2" in idx: pm25 = pm25 or avg_f
-                         elif "pm10" in idx: pm10 = pm10 or avg_f
-                         elif "no2" in idx: no2 = no2 or avg_f
-                         elif "co" in idx: co = co or avg_f
-                     
-                     est_co2 = cls.estimate_co2_from_pollutants(pm25, pm10, no2, co)
-                     
-                     new_stations.append({
-                         "name": st_name,
-                         "city": city.get("cityId") or st.get("city"),
-                         "state": state.get("stateId"),
-                         "lat": lat,
-                         "lon": lon,
-                         "aqi": st.get("airQualityIndexValue"),
-                         "predominant_parameter": st.get("predominantParameter"),
-                         "pollutants": pollutants_detail,
-                         "co2_estimated": est_co2,
-                         "live_ts": st.get("lastUpdate") or datetime.now(timezone.utc).isoformat()
-                     })
-        
-        cls.STATIONS = new_stations
+        cls.STORE = StationStore.build(new_stations)
         print(f"[AQI Service] Updated {len(new_stations)} stations.")
         return True
 
+    @classmethod
+    def refresh_async(cls):
+        """
+        Starts a background fetch unless one is already running, in which case this
+        call is collapsed into it. Returns True if a new fetch was started.
+        """
+        if not cls._refresh_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                cls.fetch_live_data()
+            finally:
+                cls._refresh_lock.release()
+
+        threading.Thread(target=run, name='aqi-refresh', daemon=True).start()
+        return True
+
+    @classmethod
+    def _next_delay(cls, failures):
+        if failures:
+            delay = min(cls.MAX_BACKOFF, cls.RETRY_BASE * 2 ** (failures - 1))
+        else:
+            delay = cls.REFRESH_INTERVAL
+        return delay * (1 + random.uniform(-cls.REFRESH_JITTER, cls.REFRESH_JITTER))
+
+    @classmethod
+    def _refresh_loop(cls):
+        failures = 0
+        while True:
+            with cls._refresh_lock:
+                ok = cls.fetch_live_data()
+            failures = 0 if ok else failures + 1
+            time.sleep(cls._next_delay(failures))
+
+    @classmethod
+    def ensure_background_refresh(cls):
+        """Starts the per-process refresher thread on first use."""
+        if cls._refresher is not None and cls._refresher.is_alive():
+            return
+        with cls._refresher_lock:
+            if cls._refresher is None or not cls._refresher.is_alive():
+                cls._refresher = threading.Thread(target=cls._refresh_loop, name='aqi-refresher', daemon=True)
+                cls._refresher.start()
+
+    @classmethod
+    def snapshot_age(cls):
+        """Seconds since the last good snapshot, or None if there hasn't been one yet."""
+        fetched_at = cls.STORE.fetched_at
+        return None if fetched_at is None else time.time() - fetched_at
+
+    @classmethod
+    def get_store(cls):
+        """
+        Last good StationStore. Never blocks on CPCB: until the first fetch lands the store
+        is empty with fetched_at None, which callers must not present as "no stations".
+        """
+        cls.ensure_background_refresh()
+        return cls.STORE
+
     @classmethod
     def get_stations(cls):
-        if not cls.STATIONS:
-            cls.fetch_live_data()
-        return cls.STATIONS
+        return cls.get_store().records()
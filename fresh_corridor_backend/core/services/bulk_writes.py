@@ -0,0 +1,93 @@
+from django.db import connections, router
+
+from core.services.data_versions import DataVersions
+
+# Column types whose Python values the database adapter takes as-is
+PASSTHROUGH_TYPES = frozenset({
+    'AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveSmallIntegerField', 'PositiveBigIntegerField', 'FloatField',
+    'CharField', 'TextField', 'ForeignKey',
+})
+
+
+def update_columns(model, pks, columns, set_all=None, increment=()):
+    """
+    Per-row UPDATE of the given columns for many rows, sent as one executemany.
+
+    `columns` maps field name -> sequence of values aligned with `pks`; `set_all` maps
+    field name -> one value for every row; `increment` names integer fields bumped by one.
+    Only the named columns are written, like save(update_fields=...). Unlike
+    QuerySet.bulk_update this doesn't build a CASE/WHEN expression per row, which
+    dominates the cost at thousands of rows. Model signals are not sent; the model's
+    DataVersion is bumped instead, as in the other helpers here.
+    """
+    pks = list(pks)
+    if not pks:
+        return 0
+    set_all = set_all or {}
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    meta = model._meta
+
+    fields = [meta.get_field(name) for name in columns]
+    const_fields = [meta.get_field(name) for name in set_all]
+    assignments = [f'{qn(f.column)} = %s' for f in fields + const_fields]
+    assignments += [f'{qn(meta.get_field(name).column)} = {qn(meta.get_field(name).column)} + 1' for name in increment]
+    sql = f'UPDATE {qn(meta.db_table)} SET {", ".join(assignments)} WHERE {qn(meta.pk.column)} = %s'
+
+    consts = [f.get_db_prep_save(set_all[f.name], connection) for f in const_fields]
+    prepared = [[f.get_db_prep_save(v, connection) for v in columns[f.name]] for f in fields]
+    params = [(*row, *consts, pk) for row, pk in zip(zip(*prepared), pks)] if fields else [(*consts, pk) for pk in pks]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    DataVersions.bump(model)
+    return len(pks)
+
+
+def insert_rows(model, columns):
+    """
+    INSERT of many rows from column lists, sent as one executemany. `columns` maps field
+    name (attname for foreign keys, e.g. zone_id) -> equal-length sequences. Skips model
+    instantiation and per-value preparation of plain numeric/text columns, which dominate
+    bulk_create at hundreds of thousands of rows. No signals, defaults or returned pks.
+    """
+    names = list(columns)
+    if not names or not len(columns[names[0]]):
+        return 0
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    meta = model._meta
+
+    fields = [meta.get_field(name) for name in names]
+    prepared = [
+        columns[name] if f.get_internal_type() in PASSTHROUGH_TYPES
+        else [f.get_db_prep_save(v, connection) for v in columns[name]]
+        for name, f in zip(names, fields)
+    ]
+    sql = (f'INSERT INTO {qn(meta.db_table)} ({", ".join(qn(f.column) for f in fields)}) '
+           f'VALUES ({", ".join(["%s"] * len(fields))})')
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, list(zip(*prepared)))
+    DataVersions.bump(model)
+    return len(prepared[0])
+
+
+def delete_rows(model, pks):
+    """
+    DELETE of many rows by primary key in one statement. No signals and no cascade
+    collection: only for rows nothing else references (or whose dependents the caller
+    has already removed).
+    """
+    pks = list(pks)
+    if not pks:
+        return 0
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    meta = model._meta
+    sql = f'DELETE FROM {qn(meta.db_table)} WHERE {qn(meta.pk.column)} IN ({", ".join(["%s"] * len(pks))})'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, pks)
+        deleted = cursor.rowcount
+    DataVersions.bump(model)
+    return deleted
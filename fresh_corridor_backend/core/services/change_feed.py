@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from core.models import ChangeEvent
+
+
+class ChangeFeed:
+    """
+    Live-data change feed behind the SSE health stream.
+
+    Writers (simulate_health, CPCB ingestion) publish() one ChangeEvent per batch with just
+    the items that changed. Each process runs a single poller thread that reads new events
+    every POLL_INTERVAL and wakes every open stream, so database load is one indexed
+    query per interval whatever the number of connected dashboards. Recent events stay in
+    memory so reconnecting clients can resume from their Last-Event-ID.
+    """
+    POLL_INTERVAL = getattr(settings, 'CHANGE_FEED_POLL_INTERVAL', 1.0) # seconds
+    RETENTION = getattr(settings, 'CHANGE_FEED_RETENTION', 600) # seconds events stay in the table
+    BUFFER = 1000 # events kept in memory per process for resuming clients
+    POLL_BATCH = 500
+    STREAM_SECONDS = getattr(settings, 'HEALTH_STREAM_MAX_SECONDS', 300) # then the client reconnects, freeing the worker
+    HEARTBEAT = 15 # seconds between keep-alive comments
+    RETRY_MS = 3000 # EventSource reconnect delay
+    PRUNE_KEY = 'change_feed_pruned'
+
+    _cond = threading.Condition()
+    _events = deque(maxlen=BUFFER) # (id, kind, data)
+    _start = 0 # last event id that existed when the poller started
+    _cursor = 0 # last event id the poller has read
+    _thread = None
+
+    # --- Writing ---
+    @classmethod
+    def publish(cls, kind, items):
+        """Appends one event; a no-op without items. Runs inside the writer's transaction."""
+        if not items:
+            return None
+        event = ChangeEvent.objects.create(kind=kind, data=json.dumps(items, separators=(',', ':')))
+        if cache.add(cls.PRUNE_KEY, True, max(1, cls.RETENTION // 10)):
+            ChangeEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=cls.RETENTION)).delete()
+        return event.pk
+
+    # --- Polling ---
+    @classmethod
+    def ensure_started(cls):
+        with cls._cond:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._start = cls._cursor = max(cls._cursor, ChangeEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0)
+            cls._thread = threading.Thread(target=cls._run, name='change-feed-poller', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            try:
+                rows = list(
+                    ChangeEvent.objects.filter(pk__gt=cls._cursor).order_by('pk')
+                    .values_list('pk', 'kind', 'data')[:cls.POLL_BATCH]
+                )
+            except Exception as e:
+                print(f"Change feed poll error: {e}")
+                connection.close() # reconnect on the next poll
+                rows = []
+            if rows:
+                with cls._cond:
+                    cls._events.extend(rows)
+                    cls._cursor = rows[-1][0]
+                    cls._cond.notify_all()
+            if len(rows) < cls.POLL_BATCH:
+                time.sleep(cls.POLL_INTERVAL)
+
+    @classmethod
+    def _since(cls, last_id):
+        """(events after last_id, missed); missed when some are no longer buffered. Call under the lock."""
+        floor = cls._events[0][0] - 1 if len(cls._events) == cls._events.maxlen else cls._start
+        if last_id < floor or last_id > cls._cursor:
+            return [], True
+        return [e for e in cls._events if e[0] > last_id], False
+
+    @classmethod
+    def wait(cls, last_id, timeout):
+        with cls._cond:
+            cls._cond.wait_for(lambda: cls._cursor != last_id, timeout)
+            return cls._since(last_id)
+
+    # --- Streaming ---
+    @classmethod
+    def stream(cls, last_id=None):
+        """
+        SSE body: events after last_id (or from now on), a 'reset' event when the client
+        fell too far behind to resume (it should reload in full), and heartbeats. Ends after
+        STREAM_SECONDS; EventSource reconnects on its own with Last-Event-ID.
+        """
+        cls.ensure_started()
+        deadline = time.monotonic() + cls.STREAM_SECONDS
+        yield f'retry: {cls.RETRY_MS}\n\n'
+        if last_id is None:
+            last_id = cls._cursor
+            yield f'id: {last_id}\nevent: hello\ndata: {{"cursor": {last_id}}}\n\n'
+
+        while time.monotonic() < deadline:
+            events, missed = cls.wait(last_id, min(cls.HEARTBEAT, deadline - time.monotonic()))
+            if missed:
+                last_id = cls._cursor
+                yield f'id: {last_id}\nevent: reset\ndata: {{"cursor": {last_id}}}\n\n'
+            elif events:
+                yield ''.join(f'id: {pk}\nevent: {kind}\ndata: {data}\n\n' for pk, kind, data in events)
+                last_id = events[-1][0]
+            else:
+                yield ': ping\n\n'
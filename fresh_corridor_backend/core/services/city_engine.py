@@ -0,0 +1,200 @@
+"""
+Discrete-event simulation of city health dynamics, used by `simulate_health --replay`.
+Pure Python/NumPy (no Django imports). Time is in hours.
+
+Each hospital is a small birth-death process driven by four competing exponential
+clocks (general/ICU admissions and discharges). With exponential lengths of stay the
+discharge clock of a ward is occupied/LOS, so the engine schedules only one pending
+event per hospital rather than one per patient. Admission rates follow the hospital's
+zone (respiratory cases, AQI) and are refreshed whenever the hospital's next event is
+drawn, i.e. they are piecewise constant between events. Zones update on their own
+hourly clocks: AQI mean-reverts towards its starting level with a diurnal cycle and
+noise, and respiratory cases gain Poisson onsets (more above AQI 100) and recover.
+
+Runs are deterministic for a given seed and input state.
+"""
+import heapq
+import itertools
+import math
+import random
+
+import numpy as np
+
+# Hospitals
+BASE_OCCUPANCY = 0.7 # admission rates are set so a quiet city settles around this occupancy
+LOS_GENERAL_H = 48.0
+LOS_ICU_H = 96.0
+CASES_PER_SURGE = 100.0 # active respiratory cases in the zone that double admissions
+AQI_ICU_SURGE = 300.0 # every this many AQI points above 100 doubles ICU admissions again
+
+# Zones
+ZONE_STEP_H = 1.0
+AQI_REVERSION = 0.1 # per hour, towards the zone's starting AQI
+AQI_DIURNAL = 0.2 # +/- fraction around the baseline; peaks at AQI_PEAK_HOUR
+AQI_PEAK_HOUR = 8.0
+AQI_NOISE = 6.0 # AQI points per sqrt(hour)
+CASE_ONSET_BASE = 0.05 # new cases per hour in clean air
+CASE_ONSET_PER_AQI = 0.01 # extra new cases per hour per AQI point above 100
+RECOVERY_H = 72.0
+
+SAMPLE_STEP_H = 1.0
+
+# Event kinds
+HOSPITAL, ZONE, SAMPLE = 0, 1, 2
+
+
+class EventQueue:
+    """Priority queue of (time, kind, target) events; ties run in scheduling order."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, time, kind, target):
+        heapq.heappush(self._heap, (time, next(self._seq), kind, target))
+
+    def peek_time(self):
+        return self._heap[0][0]
+
+    def pop(self):
+        time, _, kind, target = heapq.heappop(self._heap)
+        return time, kind, target
+
+
+class CitySimulation:
+    """
+    hospital_zone: position of each hospital's zone in the zone arrays (-1 if unknown).
+    cases: active respiratory cases per zone, -1 for zones without health stats.
+    """
+
+    def __init__(self, hospital_zone, icu_total, icu_occupied, general_total, general_occupied,
+                 aqi, cases, seed=0, start_hour=0.0):
+        seeds = np.random.SeedSequence(seed).spawn(2)
+        self.random = random.Random(int(seeds[0].generate_state(1)[0]))
+        self.np_rng = np.random.default_rng(seeds[1])
+        self.start_hour = start_hour
+        self.now = 0.0
+
+        self.hospital_zone = [int(z) for z in hospital_zone]
+        self.icu_total = [int(v) for v in icu_total]
+        self.icu_occupied = [int(v) for v in icu_occupied]
+        self.general_total = [int(v) for v in general_total]
+        self.general_occupied = [int(v) for v in general_occupied]
+
+        self.aqi = [float(v) for v in aqi]
+        self.aqi_baseline = list(self.aqi)
+        self.cases = [int(v) for v in cases]
+
+        self.stats = {
+            'events': 0, 'admissions_general': 0, 'admissions_icu': 0,
+            'discharges_general': 0, 'discharges_icu': 0,
+            'diverted_general': 0, 'diverted_icu': 0, 'new_cases': 0, 'recoveries': 0,
+        }
+        self.timeline = []
+
+        self.queue = EventQueue()
+        for h in range(len(self.icu_total)):
+            self._schedule_hospital(h)
+        for z in range(len(self.aqi)):
+            # Stagger zone clocks so stations don't all update on the same instant
+            self.queue.push(self.random.uniform(0, ZONE_STEP_H), ZONE, z)
+        self.queue.push(0.0, SAMPLE, None)
+
+    # --- Hospitals ---
+    def _rates(self, h):
+        z = self.hospital_zone[h]
+        surge = icu_surge = 1.0
+        if z >= 0:
+            if self.cases[z] > 0:
+                surge += self.cases[z] / CASES_PER_SURGE
+            icu_surge = surge * (1.0 + max(0.0, self.aqi[z] - 100.0) / AQI_ICU_SURGE)
+        return (
+            BASE_OCCUPANCY * self.general_total[h] / LOS_GENERAL_H * surge,
+            BASE_OCCUPANCY * self.icu_total[h] / LOS_ICU_H * icu_surge,
+            self.general_occupied[h] / LOS_GENERAL_H,
+            self.icu_occupied[h] / LOS_ICU_H,
+        )
+
+    def _schedule_hospital(self, h):
+        total = sum(self._rates(h))
+        if total > 0:
+            self.queue.push(self.now + self.random.expovariate(total), HOSPITAL, h)
+
+    def _hospital_event(self, h):
+        rates = self._rates(h)
+        pick = self.random.random() * sum(rates)
+        stats = self.stats
+        if pick < rates[0]:
+            if self.general_occupied[h] < self.general_total[h]:
+                self.general_occupied[h] += 1
+                stats['admissions_general'] += 1
+            else:
+                stats['diverted_general'] += 1
+        elif pick < rates[0] + rates[1]:
+            if self.icu_occupied[h] < self.icu_total[h]:
+                self.icu_occupied[h] += 1
+                stats['admissions_icu'] += 1
+            else:
+                stats['diverted_icu'] += 1
+        elif pick < rates[0] + rates[1] + rates[2]:
+            self.general_occupied[h] -= 1
+            stats['discharges_general'] += 1
+        else:
+            self.icu_occupied[h] -= 1
+            stats['discharges_icu'] += 1
+        self._schedule_hospital(h)
+
+    # --- Zones ---
+    def _zone_event(self, z):
+        hour = (self.start_hour + self.now) % 24
+        target = self.aqi_baseline[z] * (1 + AQI_DIURNAL * math.cos(2 * math.pi * (hour - AQI_PEAK_HOUR) / 24))
+        aqi = self.aqi[z] + AQI_REVERSION * ZONE_STEP_H * (target - self.aqi[z])
+        self.aqi[z] = max(0.0, aqi + AQI_NOISE * math.sqrt(ZONE_STEP_H) * self.random.gauss(0, 1))
+
+        if self.cases[z] >= 0:
+            onset = ZONE_STEP_H * (CASE_ONSET_BASE + CASE_ONSET_PER_AQI * max(0.0, self.aqi[z] - 100.0))
+            new = int(self.np_rng.poisson(onset))
+            recovered = int(self.np_rng.binomial(self.cases[z], 1 - math.exp(-ZONE_STEP_H / RECOVERY_H)))
+            self.cases[z] += new - recovered
+            self.stats['new_cases'] += new
+            self.stats['recoveries'] += recovered
+
+        self.queue.push(self.now + ZONE_STEP_H, ZONE, z)
+
+    def _sample(self):
+        icu_total = sum(self.icu_total)
+        self.timeline.append({
+            'hour': round(self.now, 3),
+            'icu_occupied': sum(self.icu_occupied),
+            'icu_utilization': round(sum(self.icu_occupied) / icu_total, 4) if icu_total else None,
+            'general_occupied': sum(self.general_occupied),
+            'mean_aqi': round(sum(self.aqi) / len(self.aqi), 1) if self.aqi else None,
+            'active_cases': sum(c for c in self.cases if c > 0),
+        })
+        self.queue.push(self.now + SAMPLE_STEP_H, SAMPLE, None)
+
+    def run(self, hours):
+        """Advances the simulation by `hours` of simulated time; returns self.stats."""
+        end = self.now + hours
+        queue, handlers = self.queue, {HOSPITAL: self._hospital_event, ZONE: self._zone_event}
+        while queue and queue.peek_time() <= end:
+            self.now, kind, target = queue.pop()
+            if kind == SAMPLE:
+                self._sample()
+                continue
+            handlers[kind](target)
+            self.stats['events'] += 1
+        self.now = end
+        return self.stats
+
+    def state(self):
+        """Final per-hospital and per-zone state as NumPy arrays."""
+        return {
+            'icu_occupied': np.array(self.icu_occupied, dtype=np.int64),
+            'general_occupied': np.array(self.general_occupied, dtype=np.int64),
+            'aqi': np.rint(self.aqi).astype(np.int64),
+            'cases': np.array(self.cases, dtype=np.int64),
+        }
@@ -0,0 +1,223 @@
+import codecs
+import json
+import re
+
+CPCB_FEED_URL = "https://airquality.cpcb.gov.in/caaqms/iit_rss_feed_with_coordinates"
+FEED_CHUNK_SIZE = 64 * 1024
+
+# Arrays under these keys hold station objects; each element is decoded whole.
+STATION_LIST_KEYS = {'stationsInCity', 'stations'}
+# Scalars on enclosing objects that are carried down to the stations below them.
+CONTEXT_KEYS = {'stateId': 'state', 'cityId': 'city'}
+PENDING_LIMIT = 2000 # stations held back waiting for context before they're released without it
+MAX_STATION_CHARS = 1 << 20 # an open object larger than this is a container, not a stand-alone station
+
+_WS = re.compile(r'[ \t\n\r]*')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_LITERAL = re.compile(r'-?[0-9][0-9.eE+\-]*|true|false|null')
+_decoder = json.JSONDecoder()
+
+
+class _Frame:
+    __slots__ = ('is_obj', 'key', 'expect_key', 'stations', 'scalars', 'start', 'candidate', 'pending')
+
+    def __init__(self, is_obj, start, stations=False):
+        self.is_obj = is_obj
+        self.key = None
+        self.expect_key = is_obj
+        self.stations = stations
+        self.scalars = {}
+        self.start = start # absolute offset of the opening bracket in the feed
+        self.candidate = is_obj and not stations # may turn out to be a stand-alone station
+        self.pending = [] # (station, context) waiting for context keys that follow them
+
+
+def iter_raw_stations(chunks):
+    """
+    Incrementally scans a CPCB JSON feed delivered as an iterable of byte chunks and
+    yields (station_dict, context) as soon as each station object has arrived.
+
+    Only the container levels (states, cities) are walked token by token; each station
+    object is handed to the C JSON decoder whole, so memory stays bounded by the chunk
+    size plus one station rather than the size of the feed. `context` holds the
+    stateId/cityId of the enclosing objects. A station whose container only names its
+    state or city after the station list is held back until that key arrives or the
+    container closes (at most PENDING_LIMIT stations are held).
+    """
+    decode = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf, pos, base, eof = '', 0, 0, False # base: feed offset of buf[0]
+    stack = []
+    pending = 0
+
+    def more():
+        """Appends the next chunk to the buffer; False once the stream is exhausted."""
+        nonlocal buf, eof
+        if eof:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buf += decode.decode(b'', final=True)
+        else:
+            buf += decode.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def found(station, context):
+        """Stations ready to yield now that `station` has been decoded inside the open stack."""
+        nonlocal pending
+        for frame in stack:
+            frame.candidate = False # containers of stations aren't stations themselves
+        full = _resolve(stack, context)
+        if full is not None or not stack:
+            return [(station, full or context)]
+        stack[-1].pending.append((station, context))
+        pending += 1
+        if pending <= PENDING_LIMIT:
+            return []
+        # Context never arrived for a long run of stations: release them with what is known
+        ready = []
+        for frame in stack:
+            ready += [(s, _fill(stack, c)) for s, c in frame.pending]
+            frame.pending = []
+        pending = 0
+        return ready
+
+    def closing(closed):
+        """Pending stations of a closed container that its context now resolves."""
+        nonlocal pending
+        ready = []
+        for station, context in closed.pending:
+            for key, name in CONTEXT_KEYS.items():
+                if key in closed.scalars:
+                    context.setdefault(name, closed.scalars[key])
+            full = _resolve(stack, context)
+            if full is not None or not stack:
+                ready.append((station, full or context))
+                pending -= 1
+            else:
+                stack[-1].pending.append((station, context))
+        return ready
+
+    while True:
+        if pos > 65536:
+            # Keep the text of open objects that may still turn out to be stations
+            keep = pos
+            for frame in stack:
+                if frame.candidate:
+                    if base + pos - frame.start > MAX_STATION_CHARS:
+                        frame.candidate = False
+                    else:
+                        keep = min(keep, frame.start - base)
+            if keep >= 65536:
+                buf, pos, base = buf[keep:], pos - keep, base + keep
+        pos = _WS.match(buf, pos).end()
+        if pos >= len(buf):
+            if more():
+                continue
+            break
+
+        char = buf[pos]
+        frame = stack[-1] if stack else None
+
+        if frame is not None and frame.stations and char == '{':
+            try:
+                station, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if more():
+                    continue # station straddles a chunk boundary
+                raise
+            pos = end
+            yield from found(station, {})
+        elif char in '{[':
+            parent_key = frame.key if frame is not None and frame.is_obj else None
+            stack.append(_Frame(char == '{', base + pos, stations=char == '[' and parent_key in STATION_LIST_KEYS))
+            pos += 1
+        elif char in '}]':
+            closed = stack.pop()
+            pos += 1
+            yield from closing(closed)
+            if closed.candidate and _looks_like_station(closed.scalars):
+                # Stand-alone station outside a known station list: decoded whole, nested fields included
+                station, _ = _decoder.raw_decode(buf, closed.start - base)
+                yield from found(station, {})
+        elif char == ':':
+            frame.expect_key = False
+            pos += 1
+        elif char == ',':
+            if frame.is_obj:
+                frame.expect_key = True
+            pos += 1
+        else:
+            match = (_STRING if char == '"' else _LITERAL).match(buf, pos)
+            # A literal touching the end of the buffer may continue in the next chunk
+            if match is None or (char != '"' and match.end() == len(buf)):
+                if more():
+                    continue
+                if match is None:
+                    raise ValueError(f"Unexpected character {char!r} in CPCB feed")
+            value = json.loads(match.group())
+            pos = match.end()
+            if frame is not None and frame.is_obj:
+                if frame.expect_key:
+                    frame.key = value
+                else:
+                    frame.scalars[frame.key] = value
+
+
+def _fill(stack, context):
+    """context completed from the open containers, innermost first."""
+    context = dict(context)
+    for frame in reversed(stack):
+        for key, name in CONTEXT_KEYS.items():
+            if key in frame.scalars:
+                context.setdefault(name, frame.scalars[key])
+    return context
+
+
+def _resolve(stack, context):
+    """_fill(), or None while some context key hasn't been seen yet."""
+    context = _fill(stack, context)
+    return context if len(context) == len(CONTEXT_KEYS) else None
+
+
+def _looks_like_station(scalars):
+    return ('siteId' in scalars or 'stationName' in scalars) and ('latitude' in scalars or 'lat' in scalars)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize(station, context):
+    """One CPCB station dict (plus its state/city context) as a flat record; None without usable coordinates."""
+    lat = _to_float(station.get('latitude') or station.get('lat'))
+    lon = _to_float(station.get('longitude') or station.get('lng') or station.get('lon'))
+    if lat is None or lon is None:
+        return None
+
+    return {
+        'site_id': station.get('siteId') or station.get('stationId'),
+        'name': (station.get('siteName') or station.get('stationName') or station.get('station')
+                 or station.get('Station') or station.get('name') or station.get('id')),
+        'city': context.get('city') or station.get('city'),
+        'state': context.get('state') or station.get('state'),
+        'lat': lat,
+        'lon': lon,
+        'aqi': station.get('airQualityIndexValue') or station.get('aqi'),
+        'predominant_parameter': station.get('predominantParameter'),
+        'pollutants': station.get('pollutants') or [],
+        'temp': station.get('temp'),
+        'last_update': station.get('lastUpdate'),
+    }
+
+
+def iter_stations(chunks):
+    """Normalized station records from a CPCB feed byte stream, yielded as they arrive."""
+    for station, context in iter_raw_stations(chunks):
+        record = normalize(station, context)
+        if record is not None:
+            yield record
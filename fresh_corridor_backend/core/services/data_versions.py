@@ -0,0 +1,69 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+from core.models import DataVersion
+
+TRACKED = frozenset({
+    'core.CityZone', 'core.Hospital', 'core.WeatherLog', 'core.TrafficStats', 'core.HealthStats',
+    'core.AgriSupply', 'core.CitizenReport',
+})
+
+
+class DataVersions:
+    """
+    Per-model change counters for conditional GETs. bump() runs on every write (model
+    signals, bulk_writes helpers, CPCB ingestion); current() is cached for CACHE_TTL so
+    polls mostly don't reach the database. A write invalidates this process's copy on
+    commit; other processes pick it up within CACHE_TTL.
+    """
+    CACHE_KEY = 'data_versions'
+    CACHE_TTL = getattr(settings, 'DATA_VERSION_CACHE_TTL', 1) # seconds
+
+    @classmethod
+    def bump(cls, *models):
+        labels = sorted({m._meta.label for m in models} & TRACKED)
+        if not labels:
+            return
+        updated = DataVersion.objects.filter(name__in=labels).update(version=F('version') + 1, updated_at=timezone.now())
+        if updated < len(labels):
+            existing = set(DataVersion.objects.filter(name__in=labels).values_list('name', flat=True))
+            DataVersion.objects.bulk_create(
+                [DataVersion(name=label, version=1) for label in labels if label not in existing],
+                ignore_conflicts=True,
+            )
+        transaction.on_commit(lambda: cache.delete(cls.CACHE_KEY))
+
+    @classmethod
+    def current(cls):
+        versions = cache.get(cls.CACHE_KEY)
+        if versions is None:
+            versions = dict(DataVersion.objects.values_list('name', 'version'))
+            cache.set(cls.CACHE_KEY, versions, cls.CACHE_TTL)
+        return versions
+
+    @classmethod
+    def etag(cls, request, models=(), *extra):
+        """
+        Strong ETag for a GET: the full path and Accept header (the same view renders JSON
+        or the browsable API), the versions of `models`, and any extra tokens.
+        """
+        versions = cls.current() if models else {}
+        parts = [request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+        parts += [f'{m._meta.label}={versions.get(m._meta.label, 0)}' for m in models]
+        parts += [str(e) for e in extra]
+        return '"%s"' % hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+    @staticmethod
+    def matches(request, etag):
+        """If-None-Match check (weak comparison, as RFC 9110 specifies for it)."""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        tags = parse_etags(header)
+        return '*' in tags or etag in (t.removeprefix('W/') for t in tags)
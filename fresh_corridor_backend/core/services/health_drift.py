@@ -0,0 +1,82 @@
+"""
+Vectorized random drift for the live health monitor (simulate_health).
+Pure NumPy: each step takes current state arrays and a Generator and returns new arrays.
+"""
+import numpy as np
+
+ICU_FLUX = np.array([-1, 0, 1, 2])
+GENERAL_FLUX = np.array([-2, -1, 0, 1, 2, 3])
+OXYGEN_DRIFT = 2 # +/- percentage points per tick
+
+# Legacy rows with tiny capacities are scaled up to realistic sizes
+MIN_ICU_BEDS, ICU_RESCALE, ICU_RESCALE_OCCUPANCY = 20, (30, 80), 0.7
+MIN_GENERAL_BEDS, GENERAL_RESCALE, GENERAL_RESCALE_OCCUPANCY = 100, (150, 400), 0.8
+
+AQI_DRIFT = (-5, 8)
+SPIKE_AQI, SPIKE_PROBABILITY, SPIKE_CASES = 200, 0.05, (1, 5)
+RECOVERY_PROBABILITY = 0.2
+
+POLLUTANT_IDS = ('PM2.5', 'PM10', 'NO2', 'SO2')
+
+
+def hospital_step(rng, icu_total, icu_occupied, general_total, general_occupied, oxygen):
+    """One tick of admissions/discharges and oxygen drift over all hospitals."""
+    n = len(icu_total)
+    icu_total, general_total = icu_total.copy(), general_total.copy()
+
+    icu_occupied = np.clip(icu_occupied + rng.choice(ICU_FLUX, n), 0, icu_total)
+    general_occupied = np.clip(general_occupied + rng.choice(GENERAL_FLUX, n), 0, general_total)
+
+    small = icu_total < MIN_ICU_BEDS
+    if small.any():
+        icu_total[small] = rng.integers(ICU_RESCALE[0], ICU_RESCALE[1] + 1, small.sum())
+        icu_occupied[small] = (icu_total[small] * ICU_RESCALE_OCCUPANCY).astype(int)
+    small = general_total < MIN_GENERAL_BEDS
+    if small.any():
+        general_total[small] = rng.integers(GENERAL_RESCALE[0], GENERAL_RESCALE[1] + 1, small.sum())
+        general_occupied[small] = (general_total[small] * GENERAL_RESCALE_OCCUPANCY).astype(int)
+
+    oxygen = np.clip(np.rint(oxygen + rng.uniform(-OXYGEN_DRIFT, OXYGEN_DRIFT, n)), 0, 100).astype(int)
+    return icu_total, icu_occupied, general_total, general_occupied, oxygen
+
+
+def zone_step(rng, aqi, cases):
+    """
+    One tick of AQI drift and respiratory case dynamics over all zones.
+    `cases` may contain -1 for zones without HealthStats; those stay untouched.
+    Returns (aqi, cases, pollutants) with pollutants shaped (zones, len(POLLUTANT_IDS)).
+    """
+    n = len(aqi)
+    aqi = np.maximum(0, aqi + rng.integers(AQI_DRIFT[0], AQI_DRIFT[1] + 1, n))
+    pollutants = pollutants_for(rng, aqi)
+
+    has_health = cases >= 0
+    spike = has_health & (aqi > SPIKE_AQI) & (rng.random(n) < SPIKE_PROBABILITY)
+    recover = has_health & ~spike & (rng.random(n) < RECOVERY_PROBABILITY)
+    cases = cases.copy()
+    cases[spike] += rng.integers(SPIKE_CASES[0], SPIKE_CASES[1] + 1, spike.sum())
+    cases[recover] = np.maximum(0, cases[recover] - 1)
+    return aqi, cases, pollutants
+
+
+def pollutants_for(rng, aqi):
+    """Plausible pollutant readings for each zone's AQI, shaped (zones, len(POLLUTANT_IDS))."""
+    n = len(aqi)
+    return np.column_stack([
+        (aqi * rng.uniform(0.7, 0.9, n)).astype(int), # PM2.5
+        (aqi * rng.uniform(0.8, 1.1, n)).astype(int), # PM10
+        rng.integers(20, 81, n),                      # NO2
+        rng.integers(10, 41, n),                      # SO2
+    ])
+
+
+def pollutant_json(row):
+    """pollutant_details payload for one zone's pollutant row."""
+    return '[' + ', '.join(
+        f'{{"indexId": "{pid}", "avg": {int(v)}, "Hourly_sub_index": {int(v)}}}' for pid, v in zip(POLLUTANT_IDS, row)
+    ) + ']'
+
+
+def pollutant_rows(row):
+    """The same readings as pollutant_json, as PollutantService.write tuples."""
+    return [(pid, float(v), None, None, float(v)) for pid, v in zip(POLLUTANT_IDS, row)]
@@ -0,0 +1,111 @@
+import json
+
+from django.db.models import Count, Max
+
+from core.models import WeatherLog, PollutantReading
+from core.services.bulk_writes import insert_rows, update_columns
+
+CHUNK = 2000 # ids per IN (...) query
+
+
+class PollutantService:
+    """
+    Keeps PollutantReading rows in step with WeatherLog.pollutant_details and answers
+    pollutant queries from them. Writers that bypass model signals (bulk ingestion,
+    the health simulator) call write() themselves.
+    """
+    VALUES = ('avg', 'minimum', 'maximum', 'sub_index')
+
+    @staticmethod
+    def _num(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None # CPCB reports missing values as 'NA'
+
+    @classmethod
+    def parse(cls, details):
+        """
+        (pollutant, avg, minimum, maximum, sub_index) tuples from pollutant_details, given
+        as the JSON text or the decoded CPCB list. Unreadable details yield none.
+        """
+        if isinstance(details, str):
+            try:
+                details = json.loads(details or '[]')
+            except ValueError:
+                return []
+        if not isinstance(details, list):
+            return [] # legacy "{}" default
+        readings = {}
+        for p in details:
+            if not isinstance(p, dict):
+                continue
+            pollutant = str(p.get('indexId') or p.get('id') or '').strip().upper()
+            if pollutant:
+                readings[pollutant] = (
+                    pollutant, cls._num(p.get('avg')), cls._num(p.get('min')), cls._num(p.get('max')),
+                    cls._num(p.get('Hourly_sub_index', p.get('sub_index'))),
+                )
+        return list(readings.values())
+
+    @classmethod
+    def write(cls, readings):
+        """
+        Replaces the pollutant rows of each log in {weather_log_id: parse()-style tuples}:
+        existing (log, pollutant) rows are updated in place, new ones inserted and ones
+        no longer reported deleted, in a fixed number of queries.
+        """
+        ids = list(readings)
+        logs, existing = {}, {}
+        for i in range(0, len(ids), CHUNK):
+            chunk = ids[i:i + CHUNK]
+            logs.update((pk, (zone_id, ts)) for pk, zone_id, ts in
+                        WeatherLog.objects.filter(pk__in=chunk).values_list('pk', 'zone_id', 'timestamp'))
+            existing.update(((log_id, pollutant), pk) for pk, log_id, pollutant in
+                            PollutantReading.objects.filter(weather_log_id__in=chunk).values_list('pk', 'weather_log_id', 'pollutant'))
+
+        updated, inserted = {}, []
+        for log_id, rows in readings.items():
+            if log_id not in logs:
+                continue
+            for row in rows:
+                pk = existing.pop((log_id, row[0]), None)
+                if pk is None:
+                    inserted.append((log_id, *logs[log_id], *row))
+                else:
+                    updated[pk] = row[1:]
+
+        update_columns(PollutantReading, list(updated), {
+            name: [values[j] for values in updated.values()] for j, name in enumerate(cls.VALUES)
+        })
+        columns = ('weather_log_id', 'zone_id', 'timestamp', 'pollutant') + cls.VALUES
+        insert_rows(PollutantReading, dict(zip(columns, map(list, zip(*inserted)))) if inserted else {})
+        stale = list(existing.values())
+        for i in range(0, len(stale), CHUNK):
+            PollutantReading.objects.filter(pk__in=stale[i:i + CHUNK]).delete()
+
+    @staticmethod
+    def by_log(log_ids):
+        """{weather_log_id: {pollutant: avg}} for the given logs."""
+        log_ids = list(log_ids)
+        result = {}
+        for i in range(0, len(log_ids), CHUNK):
+            for log_id, pollutant, avg in PollutantReading.objects.filter(
+                weather_log_id__in=log_ids[i:i + CHUNK]
+            ).values_list('weather_log_id', 'pollutant', 'avg'):
+                result.setdefault(log_id, {})[pollutant] = avg
+        return result
+
+    @staticmethod
+    def hotspots(pollutant, threshold, since):
+        """
+        Zones with a `pollutant` average above `threshold` since `since`, worst first:
+        one grouped query over the (pollutant, timestamp) index.
+        """
+        return (
+            PollutantReading.objects
+            .filter(pollutant=pollutant.strip().upper(), timestamp__gte=since, avg__gt=threshold)
+            .values('zone_id', 'zone__name', 'zone__latitude', 'zone__longitude')
+            .annotate(peak=Max('avg'), readings=Count('pk'), last_seen=Max('timestamp'))
+            .order_by('-peak', 'zone_id')
+        )
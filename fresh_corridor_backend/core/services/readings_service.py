@@ -0,0 +1,37 @@
+from django.db.models import OuterRef, Subquery
+
+from core.models import CityZone, WeatherLog, HealthStats, TrafficStats
+
+
+class ReadingsService:
+    """
+    "Latest reading per zone" as correlated subqueries, so any number of zones
+    costs one query. Each subquery is an index seek on (zone, timestamp).
+    """
+    SOURCES = {
+        'weather': WeatherLog,
+        'health': HealthStats,
+        'traffic': TrafficStats,
+    }
+
+    @staticmethod
+    def latest(model, field):
+        """Subquery yielding `field` of the newest `model` row for the outer zone."""
+        newest = model.objects.filter(zone=OuterRef('pk')).order_by('-timestamp', '-pk')
+        return Subquery(newest.values(field)[:1])
+
+    @classmethod
+    def zones_with_latest(cls, queryset=None, **fields):
+        """
+        Annotates zones with their latest readings, e.g.
+        zones_with_latest(weather=['air_quality_index'], health=['respiratory_cases_active'])
+        adds `weather_air_quality_index` and `health_respiratory_cases_active`
+        (None when the zone has no reading of that kind).
+        """
+        queryset = queryset if queryset is not None else CityZone.objects.all()
+        annotations = {}
+        for source, names in fields.items():
+            model = cls.SOURCES[source]
+            for name in names:
+                annotations[f'{source}_{name}'] = cls.latest(model, name)
+        return queryset.annotate(**annotations)
@@ -0,0 +1,246 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    WeatherLog, RealTimeTraffic, ReadingRollup, RollupWatermark, TrafficProfile, ZoneSnapshot, StationIngestState,
+    PollutantReading,
+)
+from core.services.bulk_writes import delete_rows, insert_rows, update_columns
+
+
+def _days(name, default):
+    days = getattr(settings, name, default)
+    return timedelta(days=days) if days else None # 0 keeps rows forever
+
+
+class RollupService:
+    """
+    Compacts the raw log tables into 5-minute, hourly and daily ReadingRollup buckets and
+    prunes raw rows once they are rolled up and past their retention.
+
+    Each source has a pk watermark (RollupWatermark); a run folds in only rows past it,
+    and every batch updates all three resolutions straight from the raw rows (count, sum,
+    min and max of separate batches combine without re-reading earlier rows). Rows younger
+    than SETTLE are left for the next run, which catches most in-place revisions.
+
+    Rollups reflect each row as it was when folded in, and later edits are not
+    re-applied. simulate_health keeps drifting a zone's latest WeatherLog for as long as
+    it stays the latest, which can be well past SETTLE, and late CPCB revisions do the
+    same. So rollup means and extremes can differ from the raw table while those rows
+    still exist.
+    """
+    SOURCES = {
+        'weather': {
+            'model': WeatherLog,
+            'metrics': ('air_quality_index', 'temperature_c', 'precipitation_mm', 'wind_speed_kmh', 'visibility_km'),
+            'retention': _days('WEATHERLOG_RETENTION_DAYS', 30),
+            'children': ((PollutantReading, 'weather_log'),), # deleted first; delete_rows doesn't cascade
+        },
+        'traffic': {
+            'model': RealTimeTraffic,
+            'metrics': ('congestion_score', 'current_speed', 'current_travel_time'),
+            'retention': _days('REALTIMETRAFFIC_RETENTION_DAYS', 14),
+        },
+    }
+    ROLLUP_RETENTION = {
+        '5m': _days('ROLLUP_5M_RETENTION_DAYS', 14),
+        '1h': _days('ROLLUP_1H_RETENTION_DAYS', 400),
+        '1d': None,
+    }
+    SETTLE = timedelta(seconds=getattr(settings, 'ROLLUP_SETTLE_SECONDS', 600))
+    BATCH = 50_000
+    DELETE_CHUNK = 10_000
+
+    @staticmethod
+    def watermark_name(source):
+        return f'rollup_{source}'
+
+    # --- Rolling up ---
+    @classmethod
+    def rollup(cls, source, now=None):
+        """Folds every settled raw row past the watermark into the rollups. Returns rows read."""
+        cutoff = (now or timezone.now()) - cls.SETTLE
+        total = 0
+        while True:
+            read = cls._rollup_batch(source, cutoff)
+            if not read:
+                return total
+            total += read
+
+    @classmethod
+    @transaction.atomic
+    def _rollup_batch(cls, source, cutoff):
+        spec = cls.SOURCES[source]
+        model, metrics = spec['model'], spec['metrics']
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=cls.watermark_name(source))
+
+        # Rows are append-only with auto_now_add timestamps, so pk order is time order
+        location_fields = ('zone_id',) if source == 'weather' else ('latitude', 'longitude')
+        rows = list(
+            model.objects.filter(pk__gt=mark.last_id).order_by('pk')
+            .values_list('pk', 'timestamp', *location_fields, *metrics)[:cls.BATCH]
+        )
+        # Stop at the first unsettled row so the watermark never skips one
+        settled = next((i for i, r in enumerate(rows) if r[1] >= cutoff), len(rows))
+        rows = rows[:settled]
+        if not rows:
+            return 0
+
+        cols = list(zip(*rows))
+        pks, stamps = cols[0], cols[1]
+        epoch = np.array([ts.timestamp() for ts in stamps], dtype=np.int64)
+        if source == 'weather':
+            zone_ids = np.array(cols[2], dtype=np.int64)
+            keys = np.column_stack([zone_ids, np.zeros_like(zone_ids)])
+            values = cols[3:]
+        else:
+            cell = TrafficProfile.CELL_DEG
+            keys = np.column_stack([
+                np.floor(np.array(cols[2], dtype=float) / cell).astype(np.int64),
+                np.floor(np.array(cols[3], dtype=float) / cell).astype(np.int64),
+            ])
+            values = cols[4:]
+        locations, location_of = np.unique(keys, axis=0, return_inverse=True)
+        location_of = location_of.ravel()
+        if source == 'weather':
+            location_keys = [f'zone:{z}' for z in locations[:, 0].tolist()]
+            location_zones = locations[:, 0].tolist()
+        else:
+            location_keys = [f'cell:{r}:{c}' for r, c in locations.tolist()]
+            location_zones = [None] * len(locations)
+
+        for resolution, width in ReadingRollup.RESOLUTIONS.items():
+            buckets = epoch // width * width
+            for metric, column in zip(metrics, values):
+                v = np.array([np.nan if x is None else x for x in column], dtype=float)
+                ok = ~np.isnan(v)
+                if ok.any():
+                    cls._merge(source, metric, resolution, location_keys, location_zones,
+                               location_of[ok], buckets[ok], v[ok])
+
+        mark.last_id = pks[-1]
+        mark.save(update_fields=['last_id', 'updated_at'])
+        return len(rows)
+
+    @staticmethod
+    def _merge(source, metric, resolution, location_keys, location_zones, location_of, buckets, values):
+        """Aggregates one metric by (location, bucket) and merges it into the stored rollups."""
+        groups, group_of = np.unique(np.column_stack([location_of, buckets]), axis=0, return_inverse=True)
+        group_of = group_of.ravel()
+        n = len(groups)
+        counts = np.bincount(group_of, minlength=n)
+        totals = np.bincount(group_of, weights=values, minlength=n)
+        minima = np.full(n, np.inf)
+        maxima = np.full(n, -np.inf)
+        np.minimum.at(minima, group_of, values)
+        np.maximum.at(maxima, group_of, values)
+
+        starts = [datetime.fromtimestamp(b, tz=dt_timezone.utc) for b in groups[:, 1].tolist()]
+        keys = [location_keys[i] for i in groups[:, 0].tolist()]
+        existing = {}
+        distinct = sorted(set(keys))
+        for i in range(0, len(distinct), 2000): # stay well under the database's query parameter limit
+            existing.update(
+                ((r.location_key, r.bucket_start), r)
+                for r in ReadingRollup.objects.filter(
+                    source=source, metric=metric, resolution=resolution,
+                    location_key__in=distinct[i:i + 2000], bucket_start__range=(min(starts), max(starts)),
+                )
+            )
+
+        zone_ids = [location_zones[i] for i in groups[:, 0].tolist()]
+        counts, totals, minima, maxima = counts.tolist(), totals.tolist(), minima.tolist(), maxima.tolist()
+        fresh, updated = [], []
+        for i, (key, start) in enumerate(zip(keys, starts)):
+            row = existing.get((key, start))
+            if row is None:
+                fresh.append(i)
+            else:
+                row.count += counts[i]
+                row.total += totals[i]
+                row.minimum = min(row.minimum, minima[i])
+                row.maximum = max(row.maximum, maxima[i])
+                updated.append(row)
+
+        insert_rows(ReadingRollup, {
+            'source': [source] * len(fresh), 'metric': [metric] * len(fresh), 'resolution': [resolution] * len(fresh),
+            'location_key': [keys[i] for i in fresh], 'zone_id': [zone_ids[i] for i in fresh],
+            'bucket_start': [starts[i] for i in fresh], 'count': [counts[i] for i in fresh],
+            'total': [totals[i] for i in fresh], 'minimum': [minima[i] for i in fresh], 'maximum': [maxima[i] for i in fresh],
+        })
+        update_columns(ReadingRollup, [r.pk for r in updated], {
+            'count': [r.count for r in updated], 'total': [r.total for r in updated],
+            'minimum': [r.minimum for r in updated], 'maximum': [r.maximum for r in updated],
+        })
+
+    # --- Retention ---
+    @classmethod
+    def prunable(cls, source, now=None):
+        """Raw rows that are rolled up, past retention and not referenced as anyone's latest reading."""
+        spec = cls.SOURCES[source]
+        if spec['retention'] is None:
+            return spec['model'].objects.none()
+        rolled = RollupWatermark.objects.filter(name=cls.watermark_name(source)).values_list('last_id', flat=True).first() or 0
+        qs = spec['model'].objects.filter(pk__lte=rolled, timestamp__lt=(now or timezone.now()) - spec['retention'])
+        if source == 'weather':
+            qs = qs.exclude(pk__in=ZoneSnapshot.objects.filter(weather_log__isnull=False).values('weather_log_id'))
+            qs = qs.exclude(pk__in=StationIngestState.objects.filter(weather_log__isnull=False).values('weather_log_id'))
+        else:
+            # Traffic profiles have their own watermark; never drop rows they haven't read yet
+            from core.services.traffic_profiles import TrafficProfileService
+            profiled = RollupWatermark.objects.filter(name=TrafficProfileService.WATERMARK).values_list('last_id', flat=True).first() or 0
+            qs = qs.filter(pk__lte=profiled)
+        return qs
+
+    @classmethod
+    def prune(cls, now=None):
+        """Applies the retention policy. Returns {table: rows deleted}."""
+        now = now or timezone.now()
+        deleted = {}
+        for source, spec in cls.SOURCES.items():
+            qs = cls.prunable(source, now)
+            count = 0
+            # Bounded chunks keep each delete short. Pruned rows are never a zone's latest
+            # reading, so the per-row snapshot signals a queryset delete would send are skipped.
+            while True:
+                chunk = list(qs.values_list('pk', flat=True)[:cls.DELETE_CHUNK])
+                if not chunk:
+                    break
+                for child, field in spec.get('children', ()):
+                    child.objects.filter(**{f'{field}__in': chunk}).delete()
+                count += delete_rows(spec['model'], chunk)
+            deleted[spec['model']._meta.label] = count
+
+        for resolution, keep in cls.ROLLUP_RETENTION.items():
+            if keep is not None:
+                deleted[f'rollup {resolution}'] = ReadingRollup.objects.filter(
+                    resolution=resolution, bucket_start__lt=now - keep,
+                ).delete()[0]
+        return deleted
+
+    # --- Reading ---
+    @classmethod
+    def resolution_for(cls, start, end, max_points, now=None):
+        """
+        Finest resolution that covers [start, end] in at most max_points buckets and is
+        still retained back to `start`.
+        """
+        span = (end - start).total_seconds()
+        age = (now or timezone.now()) - start
+        for resolution, width in ReadingRollup.RESOLUTIONS.items():
+            keep = cls.ROLLUP_RETENTION[resolution]
+            if span / width <= max_points and (keep is None or age <= keep):
+                return resolution
+        return '1d'
+
+    @staticmethod
+    def series(source, metric, location_key, resolution, start, end):
+        """Rollup buckets of one series in [start, end), oldest first."""
+        return ReadingRollup.objects.filter(
+            source=source, metric=metric, location_key=location_key, resolution=resolution,
+            bucket_start__gte=start, bucket_start__lt=end,
+        ).order_by('bucket_start')
@@ -0,0 +1,136 @@
+"""
+Vectorized what-if scenario model shared by the single-zone, city-wide,
+ensemble and sweep simulations. Pure NumPy (no Django imports) so it can
+run inside worker processes.
+"""
+import atexit
+import os
+
+import numpy as np
+
+DEFAULT_BASE_CONGESTION = 0.3
+BASE_RESPONSE_TIME_MIN = 15
+SOUTH_ZONE_LATITUDE = 28.5 # Mock: South zones more prone to flooding
+SOUTH_FLOOD_BUMP = 10.0
+
+FLOOD_ALERT_THRESHOLD = 70
+AMBULANCE_ALERT_THRESHOLD = 20
+
+METRICS = ('traffic_congestion_level', 'ambulance_response_time_min', 'flood_risk_probability')
+
+
+def project(base_congestion, latitude, rain_increase, traffic_increase, flood_bump=SOUTH_FLOOD_BUMP):
+    """
+    Projects scenario metrics. All arguments broadcast against each other, so
+    callers can pass scalars, per-zone arrays, per-trial arrays or grids.
+    """
+    base_congestion = np.asarray(base_congestion, dtype=float)
+    latitude = np.asarray(latitude, dtype=float)
+    rain_increase = np.asarray(rain_increase, dtype=float)
+    traffic_increase = np.asarray(traffic_increase, dtype=float)
+
+    # 1. Traffic Congestion Prediction
+    # Rain adds 0.5% congestion per 1% rain intensity; user input adds directly to load
+    congestion = np.clip(base_congestion + rain_increase * 0.005 + traffic_increase * 0.01, 0.0, 1.0)
+
+    # 2. Ambulance Response Time Delay
+    # Baseline 15 mins. Congestion > 0.5 scales delay up to 2x.
+    delay_factor = np.where(congestion > 0.5, 1 + (congestion - 0.5) * 2, 1.0)
+    response_time = BASE_RESPONSE_TIME_MIN * delay_factor
+
+    # 3. Flood Risk
+    # Simple threshold: If Rain > 80%, high risk.
+    flood_risk = np.minimum(100, rain_increase * 0.8) + np.where(latitude < SOUTH_ZONE_LATITUDE, flood_bump, 0.0)
+
+    return {
+        'traffic_congestion_level': congestion,
+        'ambulance_response_time_min': response_time,
+        'flood_risk_probability': flood_risk,
+    }
+
+
+# --- Monte Carlo ensembles ---
+PERCENTILES = (10, 50, 90)
+ENSEMBLE_CHUNK = 50_000 # trials per chunk; fixed so results don't depend on how chunks are scheduled
+POOL_THRESHOLD = 200_000 # ensembles at least this large are spread over a process pool
+MAX_TRIALS = 2_000_000
+POOL_WORKERS = 2 # per server process; callers pass settings.SCENARIO_POOL_WORKERS, 0 or 1 disables the pool
+
+CONGESTION_NOISE_SD = 0.05
+RAIN_SD_FRACTION = 0.2 # rain sampled around the requested intensity...
+RAIN_SD_MIN = 5.0 # ...with at least this much spread (percentage points)
+FLOOD_BUMP_RANGE = (5.0, 15.0) # uncertain south-zone bump, centred on SOUTH_FLOOD_BUMP
+
+_pool = None
+
+
+def _ensemble_chunk(args):
+    """Runs one chunk of trials. Module-level so it can be pickled into worker processes."""
+    seed_seq, n, base_congestion, latitude, rain_increase, traffic_increase = args
+    rng = np.random.default_rng(seed_seq)
+
+    base = np.clip(base_congestion + rng.normal(0.0, CONGESTION_NOISE_SD, n), 0.0, 1.0)
+    rain_sd = max(RAIN_SD_MIN, rain_increase * RAIN_SD_FRACTION)
+    rain = np.clip(rng.normal(rain_increase, rain_sd, n), 0.0, None)
+    flood_bump = rng.uniform(*FLOOD_BUMP_RANGE, n)
+
+    result = project(base, latitude, rain, traffic_increase, flood_bump=flood_bump)
+    return np.stack([result[m] for m in METRICS])
+
+
+def _get_pool(workers):
+    global _pool
+    if _pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: workers only need NumPy, and must not inherit the server's threads or DB connections
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        atexit.register(_shutdown_pool)
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def run_ensemble(base_congestion, latitude, rain_increase, traffic_increase, trials, seed=0, workers=POOL_WORKERS):
+    """
+    Monte Carlo ensemble over the uncertain inputs of project().
+    Returns {metric: {'p10', 'p50', 'p90', 'mean'}} plus alert probabilities.
+    Deterministic for a given (inputs, trials, seed), whether or not a pool is used.
+    Large ensembles use a process pool of at most `workers` processes (created once
+    per server process, shut down at exit).
+    """
+    trials = int(min(max(trials, 1), MAX_TRIALS))
+    sizes = [ENSEMBLE_CHUNK] * (trials // ENSEMBLE_CHUNK)
+    if trials % ENSEMBLE_CHUNK:
+        sizes.append(trials % ENSEMBLE_CHUNK)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(s, n, float(base_congestion), float(latitude), float(rain_increase), float(traffic_increase))
+            for s, n in zip(seeds, sizes)]
+
+    workers = min(workers, os.cpu_count() or 1)
+    if trials >= POOL_THRESHOLD and len(jobs) > 1 and workers > 1:
+        chunks = list(_get_pool(workers).map(_ensemble_chunk, jobs))
+    else:
+        chunks = [_ensemble_chunk(job) for job in jobs]
+    samples = np.concatenate(chunks, axis=1)
+
+    bands = np.percentile(samples, PERCENTILES, axis=1)
+    summary = {}
+    for i, metric in enumerate(METRICS):
+        summary[metric] = {f'p{p}': float(bands[j, i]) for j, p in enumerate(PERCENTILES)}
+        summary[metric]['mean'] = float(samples[i].mean())
+
+    return {
+        'trials': trials,
+        'seed': seed,
+        'metrics': summary,
+        'probabilities': {
+            'flood_alert': float(np.mean(samples[METRICS.index('flood_risk_probability')] > FLOOD_ALERT_THRESHOLD)),
+            'ambulance_delay': float(np.mean(samples[METRICS.index('ambulance_response_time_min')] > AMBULANCE_ALERT_THRESHOLD)),
+        },
+    }
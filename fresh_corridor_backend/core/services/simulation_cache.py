@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SimulationCache:
+    """
+    In-process LRU memo with TTL for simulation results.
+    Keys embed the zone's ZoneSnapshot.data_version, which SnapshotService bumps on
+    every weather/traffic/health/hospital write, so entries go stale exactly when the
+    underlying data changes; the TTL only bounds memory held by idle entries.
+    Eviction is bounded by entry count and by approximate size, since one sweep surface
+    weighs as much as thousands of single what-if results.
+    """
+    MAX_ENTRIES = 4096
+    MAX_BYTES = 64 * 1024 * 1024 # approximate, per process
+    SCALAR_BYTES = 32 # a boxed float/int plus the list slot pointing at it
+    TTL = 900 # seconds
+    MODIFIER_STEP = 0.1 # modifiers are percentages; 0.1pp is below slider resolution
+
+    _entries = OrderedDict() # key -> (expires, value, size)
+    _bytes = 0
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def quantize(cls, value, step=None):
+        step = step or cls.MODIFIER_STEP
+        return round(round(float(value) / step) * step, 6)
+
+    @classmethod
+    def approx_size(cls, value):
+        """Rough in-memory footprint of a JSON-like result, in bytes."""
+        if isinstance(value, dict):
+            return 64 + sum(cls.approx_size(k) + cls.approx_size(v) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return 56 + sum(cls.approx_size(v) for v in value)
+        if isinstance(value, str):
+            return 49 + len(value)
+        return cls.SCALAR_BYTES
+
+    @classmethod
+    def get_or_compute(cls, key, compute):
+        """Returns the cached value for key, or compute() it. Only successful results are stored."""
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and entry[0] > now:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return entry[1]
+            cls.misses += 1
+
+        value = compute()
+        if isinstance(value, dict) and value.get('status') == 'error':
+            return value
+
+        size = cls.approx_size(value)
+        if size > cls.MAX_BYTES:
+            return value
+        with cls._lock:
+            old = cls._entries.pop(key, None)
+            if old is not None:
+                cls._bytes -= old[2]
+            cls._entries[key] = (now + cls.TTL, value, size)
+            cls._bytes += size
+            while len(cls._entries) > cls.MAX_ENTRIES or cls._bytes > cls.MAX_BYTES:
+                cls._bytes -= cls._entries.popitem(last=False)[1][2]
+        return value
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._bytes = 0
+            cls.hits = cls.misses = 0
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {'entries': len(cls._entries), 'bytes': cls._bytes, 'hits': cls.hits, 'misses': cls.misses}
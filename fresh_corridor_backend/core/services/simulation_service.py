@@ -1,47 +1,58 @@
-from core.models import CityZone, WeatherLog, TrafficStats, HealthStats, Hospital
+import numpy as np
+from django.conf import settings
+
+from core.models import CityZone
+from core.services import scenario_model, seir_model
+from core.services.scenario_model import DEFAULT_BASE_CONGESTION
+from core.services.simulation_cache import SimulationCache
+from core.services.snapshot_service import SnapshotService
 
 class SimulationService:
+    MAX_SWEEP_STEPS = 101
+
     @staticmethod
     def calculate_resilience_metrics(zone_id):
-        try:
-            zone = CityZone.objects.get(pk=zone_id)
-            weather = WeatherLog.objects.filter(zone=zone).last()
-            health = HealthStats.objects.filter(zone=zone).last()
-            hospitals = Hospital.objects.filter(zone=zone)
-            
-            # 1. AQI Score (0-100, higher is better)
-            # AQI > 300 is 0 score, AQI < 50 is 100 score.
-            aqi_val = weather.air_quality_index if weather else 150
-            aqi_score = max(0, min(100, 100 - ((aqi_val - 50) * 0.4)))
-            
-            # 2. Medical Capacity Score
-            # Based on ICU bed availability
-            total_beds = sum(h.total_beds_icu for h in hospitals)
-            occupied_beds = sum(h.occupied_beds_icu for h in hospitals)
-            if total_beds > 0:
-                occupancy_rate = occupied_beds / total_beds
-                medical_score = max(0, min(100, (1 - occupancy_rate) * 100))
-            else:
-                medical_score = 0
-                
-            # 3. Nutrition/Supply Score (Mocked for now as we don't have deep supply stats yet)
-            # Default to medium-high unless it's a "Low Income" area, then lower.
-            nutrition_score = 40 if zone.average_income_tier == 'Low' else 85
-            
-            # Overall Resilience Metric
-            overall_score = (aqi_score * 0.4) + (medical_score * 0.4) + (nutrition_score * 0.2)
+        snapshot = SnapshotService.for_zone(zone_id)
+        if snapshot is None:
+            return None
+        key = ('resilience', snapshot.zone_id, snapshot.data_version)
+        return SimulationCache.get_or_compute(key, lambda: SimulationService._resilience_metrics(snapshot))
+
+    @staticmethod
+    def _resilience_metrics(snapshot):
+        zone = snapshot.zone
+        
+        # 1. AQI Score (0-100, higher is better)
+        # AQI > 300 is 0 score, AQI < 50 is 100 score.
+        aqi_val = snapshot.air_quality_index if snapshot.air_quality_index is not None else 150
+        aqi_score = max(0, min(100, 100 - ((aqi_val - 50) * 0.4)))
+        
+        # 2. Medical Capacity Score
+        # Based on ICU bed availability
+        total_beds = snapshot.total_beds_icu
+        occupied_beds = snapshot.occupied_beds_icu
+        if total_beds > 0:
+            occupancy_rate = occupied_beds / total_beds
+            medical_score = max(0, min(100, (1 - occupancy_rate) * 100))
+        else:
+            medical_score = 0
             
-            return {
-                "zone_name": zone.name,
-                "overall_resilience_score": round(overall_score, 1),
-                "metrics": {
-                    "aqi_score": round(aqi_score, 1),
-                    "medical_capacity_score": round(medical_score, 1),
-                    "nutrition_access_score": nutrition_score
-                }
+        # 3. Nutrition/Supply Score (Mocked for now as we don't have deep supply stats yet)
+        # Default to medium-high unless it's a "Low Income" area, then lower.
+        nutrition_score = 40 if zone.average_income_tier == 'Low' else 85
+        
+        # Overall Resilience Metric
+        overall_score = (aqi_score * 0.4) + (medical_score * 0.4) + (nutrition_score * 0.2)
+        
+        return {
+            "zone_name": zone.name,
+            "overall_resilience_score": round(overall_score, 1),
+            "metrics": {
+                "aqi_score": round(aqi_score, 1),
+                "medical_capacity_score": round(medical_score, 1),
+                "nutrition_access_score": nutrition_score
             }
-        except CityZone.DoesNotExist:
-            return None
+        }
 
     @staticmethod
     def run_what_if_simulation(zone_id, modifiers):
@@ -49,49 +60,263 @@ class SimulationService:
         modifiers: dict with keys like 'rain_intensity', 'traffic_load' (percentage increases)
         """
         try:
-            zone = CityZone.objects.get(pk=zone_id)
-            current_traffic = TrafficStats.objects.filter(zone=zone).last()
+            snapshot = SnapshotService.for_zone(zone_id)
+            if snapshot is None:
+                raise CityZone.DoesNotExist("CityZone matching query does not exist.")
+            
+            rain_increase = SimulationCache.quantize(modifiers.get('rain_intensity', 0))
+            traffic_increase = SimulationCache.quantize(modifiers.get('traffic_load', 0))
+            key = ('what_if', snapshot.zone_id, snapshot.data_version, rain_increase, traffic_increase)
+            return SimulationCache.get_or_compute(
+                key, lambda: SimulationService._what_if(snapshot, rain_increase, traffic_increase)
+            )
             
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def _what_if(snapshot, rain_increase, traffic_increase):
+        zone = snapshot.zone
+        base_congestion = snapshot.congestion_level if snapshot.congestion_level is not None else DEFAULT_BASE_CONGESTION
+        result = scenario_model.project(base_congestion, zone.latitude, rain_increase, traffic_increase)
+        predicted_congestion = float(result['traffic_congestion_level'])
+        predicted_response_time = float(result['ambulance_response_time_min'])
+        flood_risk_prob = float(result['flood_risk_probability'])
+        
+        return {
+            "status": "success",
+            "scenarios": {
+                "traffic_congestion_level": round(predicted_congestion, 2),
+                "traffic_congestion_display": f"{int(predicted_congestion*100)}%",
+                "ambulance_response_time_min": round(predicted_response_time, 1),
+                "flood_risk_probability": round(flood_risk_prob, 1)
+            },
+            "alerts": [
+                "⚠️ High Flood Risk Detected" if flood_risk_prob > scenario_model.FLOOD_ALERT_THRESHOLD else None,
+                "🚑 Ambulance Delays Likely" if predicted_response_time > scenario_model.AMBULANCE_ALERT_THRESHOLD else None
+            ]
+        }
+
+    @staticmethod
+    def run_ensemble_simulation(zone_id, modifiers):
+        """
+        Monte Carlo version of run_what_if_simulation: samples base congestion noise,
+        rain intensity and the south-zone flood bump, and returns P10/P50/P90 bands.
+        modifiers: 'rain_intensity', 'traffic_load', plus optional 'trials' and 'seed'.
+        """
+        try:
+            snapshot = SnapshotService.for_zone(zone_id)
+            if snapshot is None:
+                raise CityZone.DoesNotExist("CityZone matching query does not exist.")
+
+            rain_increase = SimulationCache.quantize(modifiers.get('rain_intensity', 0))
+            traffic_increase = SimulationCache.quantize(modifiers.get('traffic_load', 0))
+            trials = int(modifiers.get('trials', 5000))
+            seed = int(modifiers.get('seed', 0))
+            key = ('ensemble', snapshot.zone_id, snapshot.data_version, rain_increase, traffic_increase, trials, seed)
+            return SimulationCache.get_or_compute(
+                key, lambda: SimulationService._ensemble(snapshot, rain_increase, traffic_increase, trials, seed)
+            )
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def _ensemble(snapshot, rain_increase, traffic_increase, trials, seed):
+        zone = snapshot.zone
+        base_congestion = snapshot.congestion_level if snapshot.congestion_level is not None else DEFAULT_BASE_CONGESTION
+        ensemble = scenario_model.run_ensemble(
+            base_congestion, zone.latitude, rain_increase, traffic_increase, trials, seed=seed,
+            workers=getattr(settings, 'SCENARIO_POOL_WORKERS', scenario_model.POOL_WORKERS),
+        )
+
+        scenarios = {
+            metric: {band: round(value, 2) for band, value in bands.items()}
+            for metric, bands in ensemble['metrics'].items()
+        }
+        probabilities = ensemble['probabilities']
+        return {
+            "status": "success",
+            "trials": ensemble['trials'],
+            "seed": ensemble['seed'],
+            "scenarios": scenarios,
+            "probabilities": {k: round(v, 3) for k, v in probabilities.items()},
+            "alerts": [
+                "⚠️ High Flood Risk Detected" if probabilities['flood_alert'] > 0.5 else None,
+                "🚑 Ambulance Delays Likely" if probabilities['ambulance_delay'] > 0.5 else None
+            ]
+        }
+
+    @staticmethod
+    def run_parameter_sweep(zone_id, params):
+        """
+        Evaluates the what-if model over a rain_intensity x traffic_load grid in one pass.
+        params: optional rain_min/rain_max/rain_steps and traffic_min/traffic_max/traffic_steps.
+        Each surface is a 2D list indexed [rain][traffic] for client-side interpolation.
+        """
+        try:
+            snapshot = SnapshotService.for_zone(zone_id)
+            if snapshot is None:
+                raise CityZone.DoesNotExist("CityZone matching query does not exist.")
+
+            def axis(name, default_max):
+                lo = SimulationCache.quantize(params.get(f'{name}_min', 0))
+                hi = SimulationCache.quantize(params.get(f'{name}_max', default_max))
+                steps = int(params.get(f'{name}_steps', 21))
+                return lo, hi, min(max(steps, 2), SimulationService.MAX_SWEEP_STEPS)
+
+            rain_axis = axis('rain', 100)
+            traffic_axis = axis('traffic', 100)
+            key = ('sweep', snapshot.zone_id, snapshot.data_version, rain_axis, traffic_axis)
+            return SimulationCache.get_or_compute(
+                key, lambda: SimulationService._sweep(snapshot, rain_axis, traffic_axis)
+            )
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def _sweep(snapshot, rain_axis, traffic_axis):
+        zone = snapshot.zone
+        rain = np.linspace(*rain_axis)
+        traffic = np.linspace(*traffic_axis)
+
+        base_congestion = snapshot.congestion_level if snapshot.congestion_level is not None else DEFAULT_BASE_CONGESTION
+        # Broadcasting (rain, 1) against (traffic,) yields the full grid
+        result = scenario_model.project(base_congestion, zone.latitude, rain[:, None], traffic[None, :])
+
+        return {
+            "status": "success",
+            "rain_intensity": np.round(rain, 3).tolist(),
+            "traffic_load": np.round(traffic, 3).tolist(),
+            "surfaces": {
+                metric: np.round(np.broadcast_to(values, (len(rain), len(traffic))), 3).tolist()
+                for metric, values in result.items()
+            },
+            "thresholds": {
+                "flood_risk_probability": scenario_model.FLOOD_ALERT_THRESHOLD,
+                "ambulance_response_time_min": scenario_model.AMBULANCE_ALERT_THRESHOLD
+            }
+        }
+
+
+    @staticmethod
+    def run_city_simulation(modifiers):
+        """
+        Same model as run_what_if_simulation, applied to every zone at once.
+        Zones are loaded in one query and projected as NumPy arrays; the result
+        is columnar (one list per metric, aligned with `zones.id`).
+        """
+        try:
             rain_increase = float(modifiers.get('rain_intensity', 0))
             traffic_increase = float(modifiers.get('traffic_load', 0))
-            
-            # --- Simulation Logic ---
-            
-            # 1. Traffic Congestion Prediction
-            base_congestion = current_traffic.congestion_level if current_traffic else 0.3
-            # Rain adds 0.5% congestion per 1% rain intensity
-            # User input adds directly to load
-            predicted_congestion = base_congestion + (rain_increase * 0.005) + (traffic_increase * 0.01)
-            predicted_congestion = min(1.0, max(0.0, predicted_congestion))
-            
-            # 2. Ambulance Response Time Delay
-            # Baseline 15 mins. Congestion > 0.7 adds exponential delay.
-            base_time = 15
-            delay_factor = 1.0
-            if predicted_congestion > 0.5:
-                delay_factor = 1 + (predicted_congestion - 0.5) * 2 # up to 2x multiplier
-                
-            predicted_response_time = base_time * delay_factor
-            
-            # 3. Flood Risk
-            # Simple threshold: If Rain > 80%, high risk.
-            flood_risk_prob = min(100, rain_increase * 0.8)
-            if zone.latitude < 28.5: # Mock: South zones more prone
-                flood_risk_prob += 10
-            
+
+            rows = list(CityZone.objects.order_by('pk').values_list('pk', 'name', 'latitude', 'snapshot__congestion_level'))
+            ids = [r[0] for r in rows]
+            names = [r[1] for r in rows]
+            latitude = np.array([r[2] for r in rows], dtype=float)
+            base_congestion = np.array(
+                [DEFAULT_BASE_CONGESTION if r[3] is None else r[3] for r in rows], dtype=float
+            )
+
+            result = scenario_model.project(base_congestion, latitude, rain_increase, traffic_increase)
+            congestion = result['traffic_congestion_level']
+            response_time = result['ambulance_response_time_min']
+            flood_risk = result['flood_risk_probability']
+
+            flood_alerts = int(np.count_nonzero(flood_risk > scenario_model.FLOOD_ALERT_THRESHOLD))
+            delay_alerts = int(np.count_nonzero(response_time > scenario_model.AMBULANCE_ALERT_THRESHOLD))
+
             return {
                 "status": "success",
-                "scenarios": {
-                    "traffic_congestion_level": round(predicted_congestion, 2),
-                    "traffic_congestion_display": f"{int(predicted_congestion*100)}%",
-                    "ambulance_response_time_min": round(predicted_response_time, 1),
-                    "flood_risk_probability": round(flood_risk_prob, 1)
+                "zone_count": len(ids),
+                "zones": {
+                    "id": ids,
+                    "name": names,
+                    "traffic_congestion_level": np.round(congestion, 2).tolist(),
+                    "ambulance_response_time_min": np.round(response_time, 1).tolist(),
+                    "flood_risk_probability": np.round(flood_risk, 1).tolist(),
+                },
+                "summary": {
+                    "mean_traffic_congestion_level": round(float(congestion.mean()), 2) if len(ids) else None,
+                    "max_ambulance_response_time_min": round(float(response_time.max()), 1) if len(ids) else None,
+                    "zones_with_flood_alert": flood_alerts,
+                    "zones_with_ambulance_delay": delay_alerts,
                 },
                 "alerts": [
-                    "⚠️ High Flood Risk Detected" if flood_risk_prob > 70 else None,
-                    "🚑 Ambulance Delays Likely" if predicted_response_time > 20 else None
+                    f"⚠️ High Flood Risk in {flood_alerts} zones" if flood_alerts else None,
+                    f"🚑 Ambulance Delays Likely in {delay_alerts} zones" if delay_alerts else None
                 ]
             }
-            
+
         except Exception as e:
             return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def run_surge_projection(params):
+        """
+        SEIR respiratory surge over every zone (see core.services.seir_model), seeded with each
+        zone's active respiratory cases and projected against its free ICU beds.
+        """
+        try:
+            days = int(params.get('days', 180))
+            if not 1 <= days <= seir_model.MAX_DAYS:
+                raise ValueError(f"days must be between 1 and {seir_model.MAX_DAYS}")
+            r0 = float(params.get('r0', seir_model.DEFAULT_R0))
+            aqi_sensitivity = float(params.get('aqi_sensitivity', seir_model.AQI_SENSITIVITY))
+            if r0 < 0 or aqi_sensitivity < 0:
+                raise ValueError("r0 and aqi_sensitivity must be non-negative")
+
+            rows = list(CityZone.objects.order_by('pk').values_list(
+                'pk', 'name', 'latitude', 'longitude', 'snapshot__air_quality_index',
+                'snapshot__respiratory_cases_active', 'snapshot__total_beds_icu', 'snapshot__occupied_beds_icu',
+            ))
+            ids = [r[0] for r in rows]
+            icu_total = np.array([r[6] or 0 for r in rows], dtype=float)
+            icu_free = np.maximum(0, icu_total - np.array([r[7] or 0 for r in rows], dtype=float))
+
+            result = seir_model.project(
+                np.array([r[2] for r in rows], dtype=float),
+                np.array([r[3] for r in rows], dtype=float),
+                np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=float),
+                np.array([r[5] or 0 for r in rows], dtype=float),
+                icu_free, days=days, r0=r0, aqi_sensitivity=aqi_sensitivity,
+            )
+            peak = result['peak_icu_demand']
+            over = result['days_over_capacity']
+            timeline = result['timeline']
+            city_peak = int(np.argmax(timeline[:, 5])) if len(timeline) else 0
+
+            return {
+                "status": "success",
+                "days": days,
+                "zone_count": len(ids),
+                "zones": {
+                    "id": ids,
+                    "name": [r[1] for r in rows],
+                    "icu_free_beds": icu_free.astype(int).tolist(),
+                    "peak_icu_demand": np.round(peak, 1).tolist(),
+                    "peak_day": result['peak_day'].tolist(),
+                    "days_over_capacity": over.tolist(),
+                    "attack_rate": np.round(result['attack_rate'], 4).tolist(),
+                },
+                "timeline": {
+                    "day": timeline[:, 0].astype(int).tolist(),
+                    "susceptible": np.round(timeline[:, 1]).tolist(),
+                    "exposed": np.round(timeline[:, 2]).tolist(),
+                    "infectious": np.round(timeline[:, 3]).tolist(),
+                    "recovered": np.round(timeline[:, 4]).tolist(),
+                    "icu_demand": np.round(timeline[:, 5], 1).tolist(),
+                },
+                "summary": {
+                    "icu_free_beds": int(icu_free.sum()),
+                    "peak_icu_demand": round(float(timeline[city_peak, 5]), 1) if len(timeline) else 0,
+                    "peak_day": int(timeline[city_peak, 0]) if len(timeline) else 0,
+                    "zones_over_capacity": int(np.count_nonzero(over)),
+                    "mobility_links": int(result['mobility_links']),
+                },
+            }
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
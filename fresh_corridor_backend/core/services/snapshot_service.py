@@ -0,0 +1,173 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from core.models import CityZone, Hospital, ZoneSnapshot, WeatherLog, TrafficStats, HealthStats
+from core.services.bulk_writes import update_columns
+from core.services.readings_service import ReadingsService
+
+
+class SnapshotService:
+    """
+    Maintains ZoneSnapshot rows. Writers call the record_* / refresh_* hooks
+    (wired to model signals in core.signals); readers use for_zone().
+    Every write bumps the snapshot's data_version.
+    """
+    WEATHER_FIELDS = ('temperature_c', 'precipitation_mm', 'wind_speed_kmh',
+                      'visibility_km', 'air_quality_index', 'pollutant_details')
+    TRAFFIC_FIELDS = ('congestion_level', 'is_road_closed')
+    HEALTH_FIELDS = ('respiratory_cases_active',)
+
+    # source -> (FK on snapshot, copied fields)
+    SOURCES = {
+        'weather': ('weather_log', WEATHER_FIELDS),
+        'traffic': ('traffic_stats', TRAFFIC_FIELDS),
+        'health': ('health_stats', HEALTH_FIELDS),
+    }
+
+    @classmethod
+    def _values_for(cls, source, reading):
+        fk, fields = cls.SOURCES[source]
+        values = {f: getattr(reading, f) for f in fields}
+        values[f'{fk}_id'] = reading.pk
+        values[f'{source}_timestamp'] = reading.timestamp
+        return values
+
+    @classmethod
+    def _empty_values(cls, source):
+        fk, fields = cls.SOURCES[source]
+        values = {f: ZoneSnapshot._meta.get_field(f).get_default() for f in fields}
+        values[f'{fk}_id'] = None
+        values[f'{source}_timestamp'] = None
+        return values
+
+    @classmethod
+    def _record(cls, source, reading):
+        """Copies `reading` into its zone's snapshot unless the snapshot already holds a newer one."""
+        values = cls._values_for(source, reading)
+        fk = cls.SOURCES[source][0]
+        ts_field = f'{source}_timestamp'
+        newer_or_same = (
+            Q(**{f'{ts_field}__isnull': True})
+            | Q(**{f'{ts_field}__lte': reading.timestamp})
+            | Q(**{f'{fk}_id': reading.pk})
+        )
+        updated = ZoneSnapshot.objects.filter(newer_or_same, zone_id=reading.zone_id).update(
+            updated_at=timezone.now(), data_version=F('data_version') + 1, **values
+        )
+        if not updated and not ZoneSnapshot.objects.filter(zone_id=reading.zone_id).exists():
+            try:
+                with transaction.atomic():
+                    ZoneSnapshot.objects.create(zone_id=reading.zone_id, **values)
+            except IntegrityError:
+                # Created concurrently by another writer; apply ours on top
+                cls._record(source, reading)
+
+    @classmethod
+    def record_weather(cls, log):
+        cls._record('weather', log)
+
+    @classmethod
+    def record_traffic(cls, stats):
+        cls._record('traffic', stats)
+
+    @classmethod
+    def record_health(cls, stats):
+        cls._record('health', stats)
+
+    @staticmethod
+    def _hospital_totals(zone_ids=None):
+        qs = Hospital.objects.all()
+        if zone_ids is not None:
+            qs = qs.filter(zone_id__in=zone_ids)
+        rows = qs.values('zone_id').annotate(
+            hospital_count=Count('pk'),
+            total_beds_icu=Sum('total_beds_icu'),
+            occupied_beds_icu=Sum('occupied_beds_icu'),
+        )
+        return {r.pop('zone_id'): r for r in rows}
+
+    @classmethod
+    def refresh_hospitals(cls, zone_ids):
+        """Recomputes hospital/ICU totals for the given zones."""
+        zone_ids = list(zone_ids)
+        totals = cls._hospital_totals(zone_ids)
+        empty = {'hospital_count': 0, 'total_beds_icu': 0, 'occupied_beds_icu': 0}
+        for zone_id in zone_ids:
+            values = totals.get(zone_id, empty)
+            updated = ZoneSnapshot.objects.filter(zone_id=zone_id).update(
+                updated_at=timezone.now(), data_version=F('data_version') + 1, **values
+            )
+            if not updated:
+                ZoneSnapshot.objects.get_or_create(zone_id=zone_id, defaults=values)
+
+    @classmethod
+    def touch(cls, zone_ids):
+        """Bumps data_version for zones whose own attributes changed (e.g. location, income tier)."""
+        ZoneSnapshot.objects.filter(zone_id__in=list(zone_ids)).update(
+            updated_at=timezone.now(), data_version=F('data_version') + 1
+        )
+
+    @staticmethod
+    def bulk_apply(zone_ids, **columns):
+        """
+        Writes precomputed snapshot columns (one sequence per field, aligned with zone_ids)
+        for many zones at once. For bulk writers that bypass model signals.
+        """
+        update_columns(ZoneSnapshot, zone_ids, columns, set_all={'updated_at': timezone.now()}, increment=('data_version',))
+
+    @classmethod
+    def rebuild(cls, zone_ids=None):
+        """
+        Recomputes snapshots from the log tables in a constant number of queries.
+        Used for backfills and after bulk writes that bypass model signals.
+        """
+        zones = CityZone.objects.all()
+        if zone_ids is not None:
+            zones = zones.filter(pk__in=zone_ids)
+        latest = ReadingsService.zones_with_latest(zones, weather=['pk'], traffic=['pk'], health=['pk'])
+        latest = list(latest.values('pk', 'weather_pk', 'traffic_pk', 'health_pk'))
+        if not latest:
+            return 0
+
+        readings = {
+            'weather': WeatherLog.objects.in_bulk([z['weather_pk'] for z in latest if z['weather_pk']]),
+            'traffic': TrafficStats.objects.in_bulk([z['traffic_pk'] for z in latest if z['traffic_pk']]),
+            'health': HealthStats.objects.in_bulk([z['health_pk'] for z in latest if z['health_pk']]),
+        }
+        totals = cls._hospital_totals([z['pk'] for z in latest])
+        existing = ZoneSnapshot.objects.in_bulk([z['pk'] for z in latest])
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for z in latest:
+            snapshot = existing.get(z['pk']) or ZoneSnapshot(zone_id=z['pk'])
+            snapshot.updated_at = now
+            snapshot.data_version = F('data_version') + 1 if z['pk'] in existing else 0
+            for source in cls.SOURCES:
+                reading = readings[source].get(z[f'{source}_pk'])
+                values = cls._values_for(source, reading) if reading is not None else cls._empty_values(source)
+                for field, value in values.items():
+                    setattr(snapshot, field, value)
+            for field, value in totals.get(z['pk'], {'hospital_count': 0, 'total_beds_icu': 0, 'occupied_beds_icu': 0}).items():
+                setattr(snapshot, field, value)
+            (to_update if z['pk'] in existing else to_create).append(snapshot)
+
+        fields = ['updated_at', 'data_version', 'hospital_count', 'total_beds_icu', 'occupied_beds_icu']
+        for source, (fk, copied) in cls.SOURCES.items():
+            fields += [f'{fk}_id', f'{source}_timestamp', *copied]
+        # bulk_update wants field names, not attnames
+        fields = [f[:-3] if f.endswith('_id') else f for f in fields]
+
+        with transaction.atomic():
+            ZoneSnapshot.objects.bulk_create(to_create, batch_size=500)
+            ZoneSnapshot.objects.bulk_update(to_update, fields, batch_size=500)
+        return len(latest)
+
+    @classmethod
+    def for_zone(cls, zone_id):
+        """Snapshot (with its zone) for one zone, built on first access. None if the zone doesn't exist."""
+        snapshot = ZoneSnapshot.objects.select_related('zone').filter(zone_id=zone_id).first()
+        if snapshot is None and cls.rebuild([zone_id]):
+            snapshot = ZoneSnapshot.objects.select_related('zone').filter(zone_id=zone_id).first()
+        return snapshot
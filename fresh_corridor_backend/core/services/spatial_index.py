@@ -0,0 +1,175 @@
+import math
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+from core.utils import haversine_np, bounding_box
+
+KM_PER_DEG_LAT = 111.195
+
+
+class GeoGridIndex:
+    """
+    Immutable uniform lat/lon grid over a set of points.
+    Radius and k-nearest queries only touch the cells around the query point,
+    so lookup cost depends on local density rather than on the table size.
+    """
+
+    def __init__(self, ids, lats, lons, cell_deg=0.05):
+        self.ids = np.asarray(ids)
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.cell_deg = cell_deg
+        self._cells = {}
+
+        if len(self.ids):
+            rows = np.floor(self.lats / cell_deg).astype(np.int64)
+            cols = np.floor(self.lons / cell_deg).astype(np.int64)
+            order = np.lexsort((cols, rows))
+            r_sorted, c_sorted = rows[order], cols[order]
+            breaks = np.flatnonzero((np.diff(r_sorted) != 0) | (np.diff(c_sorted) != 0)) + 1
+            for chunk in np.split(order, breaks):
+                self._cells[(int(rows[chunk[0]]), int(cols[chunk[0]]))] = chunk
+            self._row_span = (int(rows.min()), int(rows.max()))
+            self._col_span = (int(cols.min()), int(cols.max()))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell_of(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _gather(self, cells):
+        chunks = [self._cells[c] for c in cells if c in self._cells]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(chunks)
+
+    def _cells_in_box(self, min_lat, max_lat, min_lon, max_lon):
+        r0, c0 = self._cell_of(min_lat, min_lon)
+        r1, c1 = self._cell_of(max_lat, max_lon)
+        # Cheaper to filter the occupied cells than to probe a huge empty box
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self._cells):
+            return [c for c in self._cells if r0 <= c[0] <= r1 and c0 <= c[1] <= c1]
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    def within_radius(self, lat, lon, radius_km):
+        """Returns (ids, distances_km) of points within radius_km, nearest first."""
+        if not len(self.ids):
+            return self.ids, np.empty(0)
+
+        candidates = self._gather(self._cells_in_box(*bounding_box(lat, lon, radius_km)))
+        dists = haversine_np(lat, lon, self.lats[candidates], self.lons[candidates])
+        keep = dists <= radius_km
+        candidates, dists = candidates[keep], dists[keep]
+        order = np.argsort(dists, kind='stable')
+        return self.ids[candidates[order]], dists[order]
+
+    def within_bbox(self, min_lat, max_lat, min_lon, max_lon):
+        """Returns the ids of points inside the box, in their original order."""
+        if not len(self.ids) or min_lat > max_lat or min_lon > max_lon:
+            return self.ids[:0]
+
+        candidates = self._gather(self._cells_in_box(min_lat, max_lat, min_lon, max_lon))
+        lats, lons = self.lats[candidates], self.lons[candidates]
+        keep = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        return self.ids[np.sort(candidates[keep])]
+
+    def nearest(self, lat, lon, k, max_km=None):
+        """Returns (ids, distances_km) of the k nearest points, optionally capped at max_km."""
+        if not len(self.ids) or k <= 0:
+            return self.ids[:0], np.empty(0)
+
+        k = min(k, len(self.ids))
+        r0, c0 = self._cell_of(lat, lon)
+        max_ring = max(
+            abs(r0 - self._row_span[0]), abs(r0 - self._row_span[1]),
+            abs(c0 - self._col_span[0]), abs(c0 - self._col_span[1]),
+        )
+
+        found = []
+        ring = 0
+        while ring <= max_ring:
+            if (2 * ring + 1) ** 2 > 4 * len(self._cells):
+                # Sparse grid: probing rings costs more than scanning every point
+                found = [np.arange(len(self.ids))]
+                break
+            if ring == 0:
+                cells = [(r0, c0)]
+            else:
+                cells = [(r0 + dr, c0 + dc)
+                         for dr in range(-ring, ring + 1)
+                         for dc in (-ring, ring)]
+                cells += [(r0 + dr, c0 + dc)
+                          for dr in (-ring, ring)
+                          for dc in range(-ring + 1, ring)]
+            found.append(self._gather(cells))
+
+            # Any point outside the scanned rings is at least `ring` whole cells away
+            lat_edge = min(89.9, abs(lat) + (ring + 1) * self.cell_deg)
+            guaranteed_km = ring * self.cell_deg * KM_PER_DEG_LAT * math.cos(math.radians(lat_edge))
+            if max_km is not None and guaranteed_km > max_km:
+                break
+            count = sum(len(f) for f in found)
+            if count >= k:
+                candidates = np.concatenate(found)
+                dists = haversine_np(lat, lon, self.lats[candidates], self.lons[candidates])
+                if np.partition(dists, k - 1)[k - 1] <= guaranteed_km:
+                    break
+            ring += 1
+
+        candidates = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        dists = haversine_np(lat, lon, self.lats[candidates], self.lons[candidates])
+        if max_km is not None:
+            keep = dists <= max_km
+            candidates, dists = candidates[keep], dists[keep]
+        order = np.argsort(dists, kind='stable')[:k]
+        return self.ids[candidates[order]], dists[order]
+
+
+class HospitalIndex:
+    """
+    Process-wide GeoGridIndex over hospital locations (hospitals sit at their zone's coordinates).
+    Rebuilt lazily after a hospital or zone changes. The version counter lives in the Django
+    cache so a shared cache backend propagates invalidations across workers; MAX_AGE bounds
+    staleness when it does not (e.g. the default per-process LocMemCache).
+    """
+    VERSION_KEY = 'hospital_index_version'
+    MAX_AGE = 300 # seconds
+
+    _index = None
+    _built_version = None
+    _built_at = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def invalidate(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, None)
+        cls._index = None
+
+    @classmethod
+    def get(cls):
+        version = cache.get(cls.VERSION_KEY, 0)
+        index = cls._index
+        if index is not None and cls._built_version == version and time.monotonic() - cls._built_at < cls.MAX_AGE:
+            return index
+
+        with cls._lock:
+            if cls._index is not None and cls._built_version == version and time.monotonic() - cls._built_at < cls.MAX_AGE:
+                return cls._index
+
+            from core.models import Hospital
+            rows = list(Hospital.objects.values_list('pk', 'zone__latitude', 'zone__longitude'))
+            ids = np.array([r[0] for r in rows], dtype=np.int64)
+            lats = np.array([r[1] for r in rows], dtype=float)
+            lons = np.array([r[2] for r in rows], dtype=float)
+
+            cls._index = GeoGridIndex(ids, lats, lons)
+            cls._built_version = version
+            cls._built_at = time.monotonic()
+            return cls._index
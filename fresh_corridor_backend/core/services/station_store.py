@@ -0,0 +1,136 @@
+import json
+import sys
+import time
+
+import numpy as np
+
+from core.services.spatial_index import GeoGridIndex
+
+
+class StationStore:
+    """
+    Immutable columnar snapshot of the CPCB station list.
+
+    Numeric fields live in NumPy arrays, repeated strings (city, state, predominant
+    parameter, timestamps) are stored once as categories plus small integer codes,
+    and pollutant readings sit in a fixed-width (station, pollutant, stat) matrix.
+    The JSON body is rendered once at build time, so serving the list is a bytes
+    copy; subsets are spliced from the same buffer by offset.
+    """
+    POLLUTANT_STATS = ('min', 'max', 'avg', 'sub_index')
+    INDEX_CELL_DEG = 0.25 # stations are sparse nationally; ~28 km cells
+
+    def __init__(self, records=(), fetched_at=None):
+        records = list(records)
+        n = len(records)
+        self.fetched_at = fetched_at
+
+        self.names = [sys.intern(str(r.get('name') or '')) for r in records]
+        self.lat = np.array([r['lat'] for r in records], dtype=np.float64)
+        self.lon = np.array([r['lon'] for r in records], dtype=np.float64)
+        self.aqi = np.array([self._to_float(r.get('aqi')) for r in records], dtype=np.float32)
+        self.co2 = np.array([self._to_float(r.get('co2_estimated')) for r in records], dtype=np.float32)
+
+        self.city_codes, self.cities = self._categorical(r.get('city') for r in records)
+        self.state_codes, self.states = self._categorical(r.get('state') for r in records)
+        self.param_codes, self.params = self._categorical(r.get('predominant_parameter') for r in records)
+        self.ts_codes, self.timestamps = self._categorical(r.get('live_ts') for r in records)
+
+        # Pollutant columns in first-seen order; NaN marks "not reported" / non-numeric
+        columns = {}
+        for r in records:
+            for p in r.get('pollutants') or ():
+                columns.setdefault(sys.intern(str(p.get('id'))), len(columns))
+        self.pollutant_ids = list(columns)
+        self.pollutants = np.full((n, len(columns), len(self.POLLUTANT_STATS)), np.nan, dtype=np.float32)
+        self.pollutant_mask = np.zeros((n, len(columns)), dtype=bool)
+        for i, r in enumerate(records):
+            for p in r.get('pollutants') or ():
+                j = columns[str(p.get('id'))]
+                self.pollutant_mask[i, j] = True
+                self.pollutants[i, j] = [self._to_float(p.get(s)) for s in self.POLLUTANT_STATS]
+
+        # One JSON body; per-station fragments are (start, end) offsets into it
+        fragments = [json.dumps(self.record(i), separators=(',', ':')).encode() for i in range(n)]
+        lengths = np.array([len(f) for f in fragments], dtype=np.int64)
+        self.offsets = np.empty((n, 2), dtype=np.int64)
+        self.offsets[:, 0] = 1 + np.concatenate(([0], np.cumsum(lengths + 1)[:-1])) if n else 0
+        self.offsets[:, 1] = self.offsets[:, 0] + lengths
+        self.json_bytes = b'[' + b','.join(fragments) + b']'
+
+        # Spatial index over row positions; built with the store so a refresh swaps both at once
+        self.index = GeoGridIndex(np.arange(n), self.lat, self.lon, cell_deg=self.INDEX_CELL_DEG)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
+    @staticmethod
+    def _categorical(values):
+        categories, lookup, codes = [], {}, []
+        for v in values:
+            if v not in lookup:
+                lookup[v] = len(categories)
+                categories.append(sys.intern(v) if isinstance(v, str) else v)
+            codes.append(lookup[v])
+        dtype = np.uint16 if len(categories) < 2 ** 16 else np.uint32
+        return np.array(codes, dtype=dtype), categories
+
+    @staticmethod
+    def _num(value):
+        if np.isnan(value):
+            return None
+        value = float(value)
+        return int(value) if value.is_integer() else round(value, 2)
+
+    def record(self, i):
+        """Station i as the dict shape the API has always returned."""
+        pollutants = []
+        for j in np.flatnonzero(self.pollutant_mask[i]):
+            stats = dict(zip(self.POLLUTANT_STATS, (self._num(v) for v in self.pollutants[i, j])))
+            pollutants.append({'id': self.pollutant_ids[j], **stats})
+        return {
+            'name': self.names[i],
+            'city': self.cities[self.city_codes[i]],
+            'state': self.states[self.state_codes[i]],
+            'lat': float(self.lat[i]),
+            'lon': float(self.lon[i]),
+            'aqi': self._num(self.aqi[i]),
+            'predominant_parameter': self.params[self.param_codes[i]],
+            'pollutants': pollutants,
+            'co2_estimated': self._num(self.co2[i]),
+            'live_ts': self.timestamps[self.ts_codes[i]],
+        }
+
+    def records(self):
+        return [self.record(i) for i in range(len(self))]
+
+    def json_for(self, positions, distances=None):
+        """
+        JSON array bytes for a subset of stations, in the given order.
+        With `distances`, each object is prefixed with a "distance_km" key.
+        """
+        body = memoryview(self.json_bytes)
+        if distances is None:
+            parts = [body[self.offsets[i, 0]:self.offsets[i, 1]] for i in positions]
+        else:
+            parts = [b'{"distance_km":%s,' % repr(round(float(d), 2)).encode() + body[self.offsets[i, 0] + 1:self.offsets[i, 1]]
+                     for i, d in zip(positions, distances)]
+        return b'[' + b','.join(parts) + b']'
+
+    def nearest(self, lat, lon, k, max_km=None):
+        """(positions, distances_km) of the k stations nearest to (lat, lon)."""
+        return self.index.nearest(lat, lon, k, max_km=max_km)
+
+    def within_bbox(self, min_lat, max_lat, min_lon, max_lon):
+        return self.index.within_bbox(min_lat, max_lat, min_lon, max_lon)
+
+    @classmethod
+    def build(cls, records):
+        return cls(records, fetched_at=time.time())
@@ -0,0 +1,140 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Avg
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from core.models import WeatherLog, HealthStats, TrafficStats, RealTimeTraffic, ReadingRollup, RollupWatermark, TrafficProfile
+from core.services.rollup_service import RollupService
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points of (x, y) that keep
+    the visual shape of the series. x must be ascending. The first and last points are
+    always kept; every bucket in between contributes the point forming the largest
+    triangle with the previously kept point and the next bucket's average.
+    """
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+class TimeSeriesService:
+    """
+    History of one metric at one location, downsampled server-side to at most `points`
+    points with LTTB. Short ranges read the raw rows; once a range holds more than
+    RAW_LIMIT rows it is read pre-aggregated instead (ReadingRollup buckets for the rolled-up
+    tables, hourly or daily database averages for the rest), so the work per request
+    stays bounded however long the range is. Rollups hold values as first folded in;
+    see RollupService.
+    """
+    SOURCES = {
+        'weather': {'model': WeatherLog, 'rollup': 'weather'},
+        'health': {'model': HealthStats, 'metrics': ('respiratory_cases_active',)},
+        'traffic': {'model': TrafficStats, 'metrics': ('congestion_level',)},
+        'realtime_traffic': {'model': RealTimeTraffic, 'rollup': 'traffic'},
+    }
+    RAW_LIMIT = getattr(settings, 'TIMESERIES_RAW_LIMIT', 10_000) # rows read before switching to aggregates
+    MAX_POINTS = getattr(settings, 'TIMESERIES_MAX_POINTS', 2_000)
+
+    @classmethod
+    def metrics(cls, source):
+        spec = cls.SOURCES[source]
+        return RollupService.SOURCES[spec['rollup']]['metrics'] if 'rollup' in spec else spec['metrics']
+
+    @staticmethod
+    def cell(lat, lon):
+        return math.floor(lat / TrafficProfile.CELL_DEG), math.floor(lon / TrafficProfile.CELL_DEG)
+
+    @classmethod
+    def _raw(cls, source, metric, zone_id=None, cell=None):
+        """Raw rows of the series with a value, as a queryset."""
+        qs = cls.SOURCES[source]['model'].objects.filter(**{f'{metric}__isnull': False})
+        if cell is None:
+            return qs.filter(zone_id=zone_id)
+        size = TrafficProfile.CELL_DEG
+        return qs.filter(latitude__gte=cell[0] * size, latitude__lt=(cell[0] + 1) * size,
+                         longitude__gte=cell[1] * size, longitude__lt=(cell[1] + 1) * size)
+
+    @classmethod
+    def series(cls, source, metric, start, end, points, zone_id=None, cell=None, now=None):
+        """
+        {"resolution", "samples", "points": [(timestamp, value), ...]} for [start, end).
+        resolution is 'raw' or the bucket size of the aggregates; samples is the number
+        of points before downsampling.
+        """
+        spec = cls.SOURCES[source]
+        now = now or timezone.now()
+        raw = cls._raw(source, metric, zone_id, cell).filter(timestamp__gte=start, timestamp__lt=end)
+
+        rows = None
+        retention = RollupService.SOURCES[spec['rollup']]['retention'] if 'rollup' in spec else None
+        # Rows older than the retention window survive only as rollups
+        if retention is None or start >= now - retention:
+            rows = list(raw.order_by('timestamp', 'pk').values_list('timestamp', metric)[:cls.RAW_LIMIT + 1])
+            resolution = 'raw'
+            if len(rows) > cls.RAW_LIMIT:
+                rows = None
+
+        if rows is None:
+            if 'rollup' in spec:
+                resolution = RollupService.resolution_for(start, end, cls.RAW_LIMIT, now)
+                location_key = f'zone:{zone_id}' if cell is None else f'cell:{cell[0]}:{cell[1]}'
+                rows = cls._from_rollups(spec['rollup'], metric, location_key, resolution, start, end, raw)
+            else:
+                resolution, trunc = ('1h', TruncHour) if (end - start).total_seconds() / 3600 <= cls.RAW_LIMIT else ('1d', TruncDay)
+                rows = list(
+                    raw.annotate(bucket=trunc('timestamp')).values('bucket')
+                    .annotate(value=Avg(metric)).order_by('bucket').values_list('bucket', 'value')
+                )
+
+        if not rows:
+            return {'resolution': resolution, 'samples': 0, 'points': []}
+        x = np.array([ts.timestamp() for ts, _ in rows])
+        y = np.array([value for _, value in rows], dtype=float)
+        kept = lttb(x, y, points)
+        return {
+            'resolution': resolution,
+            'samples': len(rows),
+            'points': [(rows[i][0], rows[i][1]) for i in kept.tolist()],
+        }
+
+    @staticmethod
+    def _from_rollups(source, metric, location_key, resolution, start, end, raw):
+        """Rollup bucket means, with raw rows not yet rolled up folded into their buckets."""
+        width = ReadingRollup.RESOLUTIONS[resolution]
+        first = datetime.fromtimestamp(start.timestamp() // width * width, tz=dt_timezone.utc)
+        buckets = {
+            r.bucket_start.timestamp(): [r.count, r.total]
+            for r in RollupService.series(source, metric, location_key, resolution, first, end)
+        }
+        rolled = RollupWatermark.objects.filter(name=RollupService.watermark_name(source)).values_list('last_id', flat=True).first() or 0
+        # Only the settle window (one rollup run) is past the watermark; the slice guards a stalled rollup job
+        for ts, value in raw.filter(pk__gt=rolled).order_by('pk').values_list('timestamp', metric)[:TimeSeriesService.RAW_LIMIT]:
+            bucket = buckets.setdefault(ts.timestamp() // width * width, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += value
+        return [
+            (datetime.fromtimestamp(epoch, tz=dt_timezone.utc), total / count)
+            for epoch, (count, total) in sorted(buckets.items()) if count
+        ]
@@ -0,0 +1,195 @@
+import math
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractWeekDay, Floor
+from django.utils import timezone
+
+from core.models import RealTimeTraffic, RollupWatermark, TrafficProfile
+from core.services.bulk_writes import update_columns
+
+HOURS_PER_WEEK = 168
+
+
+class TrafficProfileService:
+    """
+    Hour-of-week traffic profiles per ~500 m cell, built incrementally from
+    RealTimeTraffic. Each refresh folds in only rows past the watermark, so the cost
+    follows new readings rather than table size. Profiles are the fallback when
+    TomTom is unavailable and back the "typical conditions" endpoint.
+    """
+    WATERMARK = 'traffic_profile'
+    BATCH = 50_000 # source rows folded in per refresh step
+    TZ = ZoneInfo(getattr(settings, 'TRAFFIC_PROFILE_TZ', 'Asia/Kolkata'))
+    STALE_AFTER = getattr(settings, 'TRAFFIC_PROFILE_REFRESH', 300) # seconds between lazy refreshes
+    REFRESH_KEY = 'traffic_profile_refreshed'
+
+    # --- Building ---
+    @classmethod
+    def refresh(cls, max_batches=None):
+        """Folds new RealTimeTraffic rows into the profiles. Returns the number of rows read."""
+        total, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            read = cls._refresh_batch()
+            if not read:
+                break
+            total += read
+            batches += 1
+        return total
+
+    @classmethod
+    def refresh_if_stale(cls):
+        """Cheap enough for request paths: at most one bounded refresh per STALE_AFTER, per cache."""
+        if cache.add(cls.REFRESH_KEY, True, cls.STALE_AFTER):
+            cls.refresh(max_batches=1)
+
+    @classmethod
+    @transaction.atomic
+    def _refresh_batch(cls):
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=cls.WATERMARK)
+        new = RealTimeTraffic.objects.filter(pk__gt=mark.last_id)
+        upper = new.order_by('pk').values_list('pk', flat=True)[cls.BATCH - 1:cls.BATCH].first()
+        if upper is None:
+            upper = new.order_by('-pk').values_list('pk', flat=True).first()
+            if upper is None:
+                return 0
+
+        cell = TrafficProfile.CELL_DEG
+        groups = list(
+            RealTimeTraffic.objects.filter(pk__gt=mark.last_id, pk__lte=upper)
+            .annotate(
+                row=Floor(F('latitude') / cell), col=Floor(F('longitude') / cell),
+                weekday=ExtractWeekDay('timestamp', tzinfo=cls.TZ), hour=ExtractHour('timestamp', tzinfo=cls.TZ),
+            )
+            .values('row', 'col', 'weekday', 'hour')
+            .annotate(
+                n=Count('pk'),
+                speed=Sum('current_speed'), free_speed=Sum('free_flow_speed'),
+                travel=Sum('current_travel_time'), free_travel=Sum('free_flow_travel_time'),
+                congestion=Sum('congestion_score'), closures=Count('pk', filter=Q(road_closure=True)),
+            )
+        )
+
+        # ExtractWeekDay is 1 = Sunday ... 7 = Saturday; hour 0 of the week is Monday 00:00
+        deltas = {
+            (int(g['row']), int(g['col']), ((g['weekday'] + 5) % 7) * 24 + g['hour']): g for g in groups
+        }
+        existing = {
+            (p.cell_row, p.cell_col, p.hour_of_week): p
+            for p in TrafficProfile.objects.filter(
+                cell_row__in={k[0] for k in deltas}, cell_col__in={k[1] for k in deltas},
+                hour_of_week__in={k[2] for k in deltas},
+            )
+        }
+        sums = ('sample_count', 'current_speed_sum', 'free_flow_speed_sum', 'current_travel_time_sum',
+                'free_flow_travel_time_sum', 'congestion_score_sum', 'closure_count')
+        created, updated = [], []
+        for key, g in deltas.items():
+            profile = existing.get(key)
+            if profile is None:
+                profile = TrafficProfile(cell_row=key[0], cell_col=key[1], hour_of_week=key[2])
+                created.append(profile)
+            else:
+                updated.append(profile)
+            profile.sample_count += g['n']
+            profile.current_speed_sum += g['speed']
+            profile.free_flow_speed_sum += g['free_speed']
+            profile.current_travel_time_sum += g['travel']
+            profile.free_flow_travel_time_sum += g['free_travel']
+            profile.congestion_score_sum += g['congestion']
+            profile.closure_count += g['closures']
+
+        # The watermark row lock makes this the only writer, so absolute values are safe
+        TrafficProfile.objects.bulk_create(created)
+        update_columns(TrafficProfile, [p.pk for p in updated],
+                       {f: [getattr(p, f) for p in updated] for f in sums}, set_all={'updated_at': timezone.now()})
+        mark.last_id = upper
+        mark.save(update_fields=['last_id', 'updated_at'])
+        return sum(g['n'] for g in groups)
+
+    # --- Reading ---
+    @classmethod
+    def hour_of_week(cls, when=None):
+        local = timezone.localtime(when or timezone.now(), cls.TZ)
+        return local.weekday() * 24 + local.hour
+
+    @staticmethod
+    def _cell(lat, lon):
+        return math.floor(lat / TrafficProfile.CELL_DEG), math.floor(lon / TrafficProfile.CELL_DEG)
+
+    @classmethod
+    def _profiles_near(cls, lat, lon, hours=None):
+        """Profiles of the point's cell, or of its 8 neighbours if the cell has none."""
+        row, col = cls._cell(lat, lon)
+        qs = TrafficProfile.objects.filter(cell_row__range=(row - 1, row + 1), cell_col__range=(col - 1, col + 1))
+        if hours is not None:
+            qs = qs.filter(hour_of_week__in=hours)
+        profiles = list(qs)
+        own = [p for p in profiles if p.cell_row == row and p.cell_col == col]
+        return own or profiles
+
+    @staticmethod
+    def _merge(profiles):
+        """Sample-weighted means over profiles, as our traffic payload."""
+        n = sum(p.sample_count for p in profiles)
+        if not n:
+            return None
+
+        def mean(field):
+            return sum(getattr(p, field) for p in profiles) / n
+
+        return {
+            "currentSpeed": round(mean('current_speed_sum')),
+            "freeFlowSpeed": round(mean('free_flow_speed_sum')),
+            "currentTravelTime": round(mean('current_travel_time_sum')),
+            "freeFlowTravelTime": round(mean('free_flow_travel_time_sum')),
+            "congestionScore": round(mean('congestion_score_sum'), 2),
+            "closureRate": round(sum(p.closure_count for p in profiles) / n, 3),
+            "samples": n,
+        }
+
+    @classmethod
+    def typical(cls, lat, lon, when=None):
+        """
+        Typical conditions at a point for the hour of week of `when` (default now), widening
+        to the neighbouring hours if that hour has no samples. None if there is no history.
+        """
+        hour = cls.hour_of_week(when)
+        for spread in (0, 1, 2):
+            hours = [(hour + d) % HOURS_PER_WEEK for d in range(-spread, spread + 1)]
+            traffic = cls._merge(cls._profiles_near(lat, lon, hours))
+            if traffic is not None:
+                return dict(traffic, hourOfWeek=hour)
+        return None
+
+    @classmethod
+    def week(cls, lat, lon):
+        """Typical conditions for every hour of week that has samples, in hour order."""
+        by_hour = {}
+        for p in cls._profiles_near(lat, lon):
+            by_hour.setdefault(p.hour_of_week, []).append(p)
+        return [dict(cls._merge(by_hour[h]), hourOfWeek=h) for h in sorted(by_hour)]
+
+    @classmethod
+    def fallback_payload(cls, lat, lon):
+        """Traffic payload shaped like a live TomTom answer, from history; None if there is none."""
+        typical = cls.typical(lat, lon)
+        if typical is None:
+            return None
+        return {
+            "traffic": {
+                "currentSpeed": typical["currentSpeed"],
+                "freeFlowSpeed": typical["freeFlowSpeed"],
+                "currentTravelTime": typical["currentTravelTime"],
+                "freeFlowTravelTime": typical["freeFlowTravelTime"],
+                "confidence": None,
+                "roadClosure": typical["closureRate"] >= 0.5,
+                "roadClass": None,
+                "congestionScore": typical["congestionScore"],
+            },
+            "coordinates": [],
+            "typical": typical,
+        }
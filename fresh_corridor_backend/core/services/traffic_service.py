@@ -0,0 +1,326 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+
+from core.services.upstream import upstream
+from core.utils import haversine_np
+
+M_PER_DEG_LAT = 111_195.0
+
+
+class SegmentCache:
+    """
+    TomTom flow segments keyed by their road geometry rather than by the query point.
+    A point is a hit if it lies within `tolerance_m` of a live segment's polyline (or of
+    a point that was already answered by it), so every point sampled along the same
+    road shares one upstream call until the segment's TTL runs out.
+
+    Segments are bucketed in a lat/lon grid by the cells their edges cross, so a lookup
+    only measures the few segments near the point. Per process, like HospitalIndex.
+    """
+
+    def __init__(self, ttl, tolerance_m, max_segments=5000, cell_deg=0.005):
+        self.ttl = ttl
+        self.tolerance_m = tolerance_m
+        self.max_segments = max_segments
+        self.cell_deg = cell_deg
+        self._segments = {} # id -> (expires_at, lats, lons, payload, cells)
+        self._cells = {} # (row, col) -> set of ids
+        self._expiry = deque() # ids in insertion (hence expiry) order
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._segments)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _cells_for(self, lats, lons):
+        # Each edge's bounding box, padded by the tolerance, covers every cell a hit can come from
+        pad_lat = self.tolerance_m / M_PER_DEG_LAT
+        pad_lon = pad_lat / max(math.cos(math.radians(float(np.max(np.abs(lats))))), 1e-6)
+        cells = set()
+        ends = range(len(lats) - 1) if len(lats) > 1 else range(1)
+        for i in ends:
+            j = min(i + 1, len(lats) - 1)
+            r0, c0 = self._cell(min(lats[i], lats[j]) - pad_lat, min(lons[i], lons[j]) - pad_lon)
+            r1, c1 = self._cell(max(lats[i], lats[j]) + pad_lat, max(lons[i], lons[j]) + pad_lon)
+            cells.update((r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1))
+        return cells
+
+    @staticmethod
+    def distance_m(lat, lon, lats, lons):
+        """Distance in metres from a point to a polyline (a single vertex counts as a point)."""
+        kx = M_PER_DEG_LAT * math.cos(math.radians(lat))
+        x, y = (lons - lon) * kx, (lats - lat) * M_PER_DEG_LAT # local metres, query point at the origin
+        if len(x) == 1:
+            return float(math.hypot(x[0], y[0]))
+        ax, ay, dx, dy = x[:-1], y[:-1], np.diff(x), np.diff(y)
+        length2 = dx * dx + dy * dy
+        t = np.clip(-(ax * dx + ay * dy) / np.where(length2 > 0, length2, 1), 0, 1)
+        return float(np.min(np.hypot(ax + t * dx, ay + t * dy)))
+
+    def _drop(self, sid):
+        entry = self._segments.pop(sid, None)
+        if entry is None:
+            return
+        for cell in entry[4]:
+            ids = self._cells.get(cell)
+            if ids is not None:
+                ids.discard(sid)
+                if not ids:
+                    del self._cells[cell]
+
+    def _prune(self, now):
+        # Fixed TTL means insertion order is expiry order; oldest go first when over capacity too
+        while self._expiry:
+            sid = self._expiry[0]
+            if self._segments[sid][0] > now and len(self._segments) <= self.max_segments:
+                break
+            self._expiry.popleft()
+            self._drop(sid)
+
+    def lookup(self, lat, lon):
+        """Returns the cached payload of the freshest segment covering the point, or None."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            best = None
+            for sid in self._cells.get(self._cell(lat, lon), ()):
+                expires_at, lats, lons, payload, _ = self._segments[sid]
+                if (best is None or expires_at > best[0]) and self.distance_m(lat, lon, lats, lons) <= self.tolerance_m:
+                    best = (expires_at, payload)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best[1]
+
+    def store(self, lat, lon, coordinates, payload):
+        """
+        Caches payload under its segment polyline (list of (lat, lon)). If the query point
+        itself is off the polyline (TomTom snapped it to the road), it is cached as a
+        one-point anchor too, so repeating the same point also hits.
+        """
+        now = time.monotonic()
+        lats = np.array([c[0] for c in coordinates], dtype=float)
+        lons = np.array([c[1] for c in coordinates], dtype=float)
+        with self._lock:
+            self._prune(now)
+            if len(lats):
+                self._insert(now, lats, lons, payload)
+            if not len(lats) or self.distance_m(lat, lon, lats, lons) > self.tolerance_m:
+                self._insert(now, np.array([lat]), np.array([lon]), payload)
+
+    def _insert(self, now, lats, lons, payload):
+        sid = self._next_id
+        self._next_id += 1
+        cells = self._cells_for(lats, lons)
+        self._segments[sid] = (now + self.ttl, lats, lons, payload, cells)
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(sid)
+        self._expiry.append(sid)
+
+    def clear(self):
+        with self._lock:
+            self._segments.clear()
+            self._cells.clear()
+            self._expiry.clear()
+
+
+class TrafficService:
+    """TomTom flowSegmentData lookups, answered from the segment cache where possible."""
+    FLOW_URL = "https://api.tomtom.com/traffic/services/4/flowSegmentData/absolute/10/json"
+    TIMEOUT = 5 # seconds
+
+    SEGMENT_TTL = getattr(settings, 'TRAFFIC_SEGMENT_TTL', 60) # seconds; TomTom refreshes flow about once a minute
+    SNAP_TOLERANCE_M = getattr(settings, 'TRAFFIC_SNAP_TOLERANCE_M', 15)
+    CACHE = SegmentCache(SEGMENT_TTL, SNAP_TOLERANCE_M)
+
+    # Corridor fan-out: one pool per process bounds concurrent TomTom calls across requests
+    FANOUT_WORKERS = getattr(settings, 'TRAFFIC_FANOUT_WORKERS', 6)
+    MAX_CORRIDOR_POINTS = 50
+    _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='tomtom')
+
+    @staticmethod
+    def parse_flow(data):
+        """Our traffic payload from a TomTom flowSegmentData response."""
+        flow = data["flowSegmentData"]
+        current_speed = flow["currentSpeed"]
+        free_flow_speed = flow["freeFlowSpeed"]
+        return {
+            "traffic": {
+                "currentSpeed": current_speed,
+                "freeFlowSpeed": free_flow_speed,
+                "currentTravelTime": flow["currentTravelTime"],
+                "freeFlowTravelTime": flow["freeFlowTravelTime"],
+                "confidence": round(flow["confidence"] * 100, 2),
+                "roadClosure": flow["roadClosure"],
+                "roadClass": flow["frc"],
+                "congestionScore": round((1 - current_speed / free_flow_speed) * 100, 2),
+            },
+            "coordinates": flow["coordinates"]["coordinate"],
+        }
+
+    @classmethod
+    def request_flow(cls, lat, lon, api_key):
+        """Always asks TomTom (no cache lookup) and caches the answer by segment geometry."""
+        r = upstream.get(cls.FLOW_URL, params={"point": f"{lat},{lon}", "unit": "KMPH", "key": api_key}, timeout=cls.TIMEOUT)
+        r.raise_for_status()
+        payload = cls.parse_flow(r.json())
+        cls.CACHE.store(lat, lon, [(c["latitude"], c["longitude"]) for c in payload["coordinates"]], payload)
+        return payload
+
+    @classmethod
+    def fetch_flow(cls, lat, lon, api_key):
+        """
+        Returns (payload, cached). Misses hit TomTom and are cached by segment geometry.
+        Raises requests.RequestException (incl. HTTPError) if TomTom can't answer.
+        """
+        payload = cls.CACHE.lookup(lat, lon)
+        if payload is not None:
+            return payload, True
+        return cls.request_flow(lat, lon, api_key), False
+
+    # --- Corridors ---
+    @staticmethod
+    def parse_points(raw, max_points):
+        """[[lat, lon], ...] or [{"lat": .., "lon": ..}, ...] -> list of (lat, lon). Raises ValueError."""
+        if not isinstance(raw, list) or not raw:
+            raise ValueError("expected a non-empty list of points")
+        if len(raw) > max_points:
+            raise ValueError(f"at most {max_points} points per request")
+        points = []
+        for p in raw:
+            lat, lon = (p.get('lat'), p.get('lon')) if isinstance(p, dict) else p
+            lat, lon = float(lat), float(lon)
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"point out of range: {lat},{lon}")
+            points.append((lat, lon))
+        return points
+
+    @staticmethod
+    def sample_polyline(points, spacing_m, max_points):
+        """Points every spacing_m along the polyline (both ends included), widened to fit max_points."""
+        if len(points) < 2:
+            return list(points)
+        lats = np.array([p[0] for p in points])
+        lons = np.array([p[1] for p in points])
+        legs = haversine_np(lats[:-1], lons[:-1], lats[1:], lons[1:]) * 1000 # elementwise over the legs
+        along = np.concatenate([[0.0], np.cumsum(legs)])
+        total = along[-1]
+        count = min(max_points, int(total // max(spacing_m, 1)) + 1)
+        marks = np.linspace(0, total, max(count, 2))
+        return list(zip(np.interp(marks, along, lats).tolist(), np.interp(marks, along, lons).tolist()))
+
+    @classmethod
+    def fetch_corridor(cls, points, api_key):
+        """
+        Flow for every point of a corridor. Points already covered by a cached segment are
+        answered locally; the rest are fetched from TomTom in concurrent waves of at most
+        FANOUT_WORKERS points spread along the corridor. After each wave the remaining
+        points are re-checked against the cache, so points on a segment another point in
+        the wave resolved to are not fetched again.
+
+        Returns (results, fresh) where results[i] is (payload or None, cached, error) for
+        points[i] and fresh lists (lat, lon, payload) for readings that came from TomTom.
+        """
+        results = [None] * len(points)
+        pending = []
+        for i, (lat, lon) in enumerate(points):
+            payload = cls.CACHE.lookup(lat, lon)
+            if payload is not None:
+                results[i] = (payload, True, None)
+            else:
+                pending.append(i)
+
+        fresh = []
+        while pending:
+            stride = math.ceil(len(pending) / cls.FANOUT_WORKERS)
+            wave = pending[::stride]
+            futures = {i: cls._executor.submit(cls.request_flow, *points[i], api_key) for i in wave}
+            for i, future in futures.items():
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    results[i] = (None, False, str(e))
+                else:
+                    results[i] = (payload, False, None)
+                    fresh.append((points[i][0], points[i][1], payload))
+
+            waiting = []
+            for i in pending:
+                if results[i] is not None:
+                    continue
+                payload = cls.CACHE.lookup(*points[i])
+                if payload is not None:
+                    results[i] = (payload, True, None)
+                else:
+                    waiting.append(i)
+            pending = waiting
+        return results, fresh
+
+    @staticmethod
+    def corridor_response(points, results):
+        """Per-point profile plus the distinct segments and corridor averages."""
+        segments, segment_of, profile = [], {}, []
+        for (lat, lon), (payload, cached, error) in zip(points, results):
+            entry = {"latitude": lat, "longitude": lon, "cached": cached, "segment": None}
+            if error is not None:
+                entry["error"] = error
+            if payload is not None:
+                if "typical" in payload:
+                    entry["typical"] = True # historical fallback, not a live segment
+                else:
+                    key = id(payload) # one payload object per cached segment
+                    if key not in segment_of:
+                        segment_of[key] = len(segments)
+                        segments.append(payload)
+                    entry["segment"] = segment_of[key]
+                t = payload["traffic"]
+                entry.update(congestionScore=t["congestionScore"], currentSpeed=t["currentSpeed"])
+            profile.append(entry)
+
+        answered = [p for p in profile if "congestionScore" in p]
+        return {
+            "status": "success" if answered else "error",
+            "points": profile,
+            "segments": segments,
+            "summary": {
+                "points": len(profile),
+                "answered": len(answered),
+                "segments": len(segments),
+                "cacheHits": sum(1 for p in answered if p["cached"]),
+                "typical": sum(1 for p in answered if p.get("typical")),
+                "upstreamCalls": sum(1 for p in profile if not p["cached"]),
+                "avgCongestion": round(sum(p["congestionScore"] for p in answered) / len(answered), 2) if answered else None,
+                "avgSpeed": round(sum(p["currentSpeed"] for p in answered) / len(answered), 2) if answered else None,
+            },
+        }
+
+    @staticmethod
+    def traffic_row(lat, lon, payload):
+        """Unsaved RealTimeTraffic row for a fresh (non-cached) reading."""
+        from core.models import RealTimeTraffic
+
+        t = payload["traffic"]
+        return RealTimeTraffic(
+            latitude=lat,
+            longitude=lon,
+            current_speed=t["currentSpeed"],
+            free_flow_speed=t["freeFlowSpeed"],
+            current_travel_time=t["currentTravelTime"],
+            free_flow_travel_time=t["freeFlowTravelTime"],
+            congestion_score=t["congestionScore"],
+            confidence=t["confidence"],
+            road_class=t["roadClass"],
+            road_closure=t["roadClosure"],
+        )
@@ -0,0 +1,269 @@
+"""
+Shared outbound HTTP client for upstream APIs (CPCB, Open-Meteo, TomTom, Overpass).
+
+Each host gets its own pooled keep-alive `requests.Session`, so repeat calls reuse the
+TLS connection. Every request has a (connect, read) timeout, and idempotent requests are
+retried on connection errors, 429 and 5xx with jittered exponential backoff. A per-host
+retry budget caps the extra load retries can add during an outage. A per-host circuit
+breaker fails fast while an upstream is down instead of tying up workers on it. Latency
+and error counts are kept per host; see `upstream.stats()`.
+"""
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+LATENCY_SAMPLES = 256 # recent latencies kept per host for percentiles
+
+
+class UpstreamError(requests.RequestException):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open once
+    `cooldown` seconds have passed, letting a single probe through; the probe's
+    outcome closes the circuit again or re-opens it for another cooldown.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self._probing or time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if self._probing or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self._probing = True
+        return True
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self):
+        """Frees a probe that never reached the host (malformed request); the next call may probe."""
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all calls to a host: every request deposits `ratio` tokens
+    and every retry spends one, so during an outage retries stay around `ratio` of
+    traffic however many callers are failing at once. Holds at most `capacity` tokens.
+    """
+
+    def __init__(self, ratio, capacity):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = float(capacity)
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self):
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class HostState:
+    def __init__(self, host, session, breaker, budget):
+        self.host = host
+        self.session = session
+        self.breaker = breaker
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.errors = {} # kind -> count
+        self.last_error = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES) # seconds, successful responses and failures alike
+
+    def record(self, elapsed, error=None):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(elapsed)
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                self.last_error = error
+
+    def summary(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            errors = dict(self.errors)
+
+        def pct(q):
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1) if latencies else None
+
+        return {
+            'requests': self.requests,
+            'errors': sum(errors.values()),
+            'errors_by_kind': errors,
+            'last_error': self.last_error,
+            'retries': self.retries,
+            'short_circuited': self.short_circuited,
+            'circuit': self.breaker.state,
+            'latency_ms': {'p50': pct(0.5), 'p95': pct(0.95), 'max': pct(1.0)},
+        }
+
+
+class UpstreamClient:
+    CONNECT_TIMEOUT = getattr(settings, 'UPSTREAM_CONNECT_TIMEOUT', 3.05) # seconds
+    READ_TIMEOUT = getattr(settings, 'UPSTREAM_READ_TIMEOUT', 10)
+    MAX_RETRIES = getattr(settings, 'UPSTREAM_MAX_RETRIES', 2) # per call, on top of the first attempt
+    RETRY_RATIO = getattr(settings, 'UPSTREAM_RETRY_RATIO', 0.2) # retries allowed per request, per host
+    BACKOFF_BASE = getattr(settings, 'UPSTREAM_BACKOFF_BASE', 0.25) # seconds, doubles each retry
+    BACKOFF_MAX = getattr(settings, 'UPSTREAM_BACKOFF_MAX', 4)
+    BREAKER_THRESHOLD = getattr(settings, 'UPSTREAM_BREAKER_THRESHOLD', 5) # consecutive failures
+    BREAKER_COOLDOWN = getattr(settings, 'UPSTREAM_BREAKER_COOLDOWN', 30) # seconds
+    POOL_SIZE = getattr(settings, 'UPSTREAM_POOL_SIZE', 10) # keep-alive connections per host
+    RETRY_CAPACITY = getattr(settings, 'UPSTREAM_RETRY_CAPACITY', 10) # retry tokens a host can bank
+    USER_AGENT = 'FreshCorridor/1.0'
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc.lower()
+        state = self._hosts.get(host)
+        if state is None:
+            with self._lock:
+                state = self._hosts.get(host)
+                if state is None:
+                    session = requests.Session()
+                    # Retries are handled here (with the budget and breaker), not by urllib3
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['User-Agent'] = self.USER_AGENT
+                    state = HostState(
+                        host, session,
+                        CircuitBreaker(self.BREAKER_THRESHOLD, self.BREAKER_COOLDOWN),
+                        RetryBudget(self.RETRY_RATIO, self.RETRY_CAPACITY),
+                    )
+                    self._hosts[host] = state
+        return state
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.BACKOFF_MAX, int(retry_after))
+        # Full jitter keeps retrying callers from synchronising
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** attempt))
+
+    def request(self, method, url, timeout=None, retries=None, **kwargs):
+        """
+        Same arguments as `requests.request`. `timeout` defaults to (CONNECT_TIMEOUT,
+        READ_TIMEOUT); `retries` defaults to MAX_RETRIES for idempotent methods and 0
+        otherwise. 429/5xx responses that run out of retries are returned, not raised.
+        Raises CircuitOpenError while the host is failing.
+        """
+        method = method.upper()
+        state = self._host(url)
+        if timeout is None:
+            timeout = (self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+        elif not isinstance(timeout, tuple):
+            timeout = (min(self.CONNECT_TIMEOUT, timeout), timeout)
+        if retries is None:
+            retries = self.MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+        with state.lock:
+            state.budget.deposit()
+        attempt = 0
+        while True:
+            with state.lock:
+                allowed = state.breaker.allow()
+                if not allowed:
+                    state.short_circuited += 1
+            if not allowed:
+                raise CircuitOpenError(f"{state.host}: circuit open after repeated failures")
+
+            started = time.perf_counter()
+            response, error, exc = None, None, None
+            try:
+                response = state.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.Timeout as e:
+                error, exc = 'timeout', e
+            except requests.ConnectionError as e:
+                error, exc = 'connection', e
+            except Exception:
+                # Malformed request (bad URL, bad arguments): not the host's fault, never retried.
+                # It says nothing about the host either, so a probe slot it held is handed back.
+                state.record(time.perf_counter() - started, 'request')
+                with state.lock:
+                    state.breaker.release()
+                raise
+            else:
+                if response.status_code >= 500 or response.status_code == 429:
+                    error = f'http_{response.status_code}'
+            state.record(time.perf_counter() - started, error)
+
+            with state.lock:
+                # 4xx means a bad key or bad params, and 429 means the host is up but
+                # throttling us; neither is a sign the host is down
+                if error is None or error == 'http_429':
+                    state.breaker.success()
+                else:
+                    state.breaker.failure()
+                transient = exc is not None or (response is not None and response.status_code in RETRY_STATUSES)
+                retry = transient and attempt < retries and state.budget.withdraw()
+                if retry:
+                    state.retries += 1
+            if not retry:
+                if response is None:
+                    raise exc
+                return response
+
+            delay = self._backoff(attempt, response)
+            if response is not None:
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Per-host request, error, retry and latency counters."""
+        return {host: state.summary() for host, state in sorted(self._hosts.items())}
+
+
+upstream = UpstreamClient()
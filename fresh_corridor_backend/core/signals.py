@@ -0,0 +1,94 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CityZone, Hospital, WeatherLog, TrafficStats, HealthStats, AgriSupply, CitizenReport
+from .services.data_versions import DataVersions
+from .services.pollutant_service import PollutantService
+from .services.spatial_index import HospitalIndex
+from .services.snapshot_service import SnapshotService
+
+
+@receiver([post_save, post_delete], sender=Hospital)
+@receiver([post_save, post_delete], sender=CityZone)
+def invalidate_hospital_index(sender, instance, **kwargs):
+    """Hospitals are located by their zone, so either model moving a hospital invalidates the index."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not {'zone', 'latitude', 'longitude'} & set(update_fields):
+        return
+    HospitalIndex.invalidate()
+
+
+# --- Zone snapshots ---
+SNAPSHOT_RECORDERS = {
+    WeatherLog: SnapshotService.record_weather,
+    TrafficStats: SnapshotService.record_traffic,
+    HealthStats: SnapshotService.record_health,
+}
+
+@receiver(post_save, sender=WeatherLog)
+@receiver(post_save, sender=TrafficStats)
+@receiver(post_save, sender=HealthStats)
+def update_zone_snapshot(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    SNAPSHOT_RECORDERS[sender](instance)
+
+def _deleting_zone(origin):
+    """True inside a CityZone delete's cascade: the zone's snapshot goes with it, so don't recreate it."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, CityZone)
+
+@receiver(post_delete, sender=WeatherLog)
+@receiver(post_delete, sender=TrafficStats)
+@receiver(post_delete, sender=HealthStats)
+def rebuild_zone_snapshot(sender, instance, origin=None, **kwargs):
+    if _deleting_zone(origin):
+        return
+    # The deleted row may have been the zone's latest; fall back to the next newest
+    SnapshotService.rebuild([instance.zone_id])
+
+@receiver(pre_save, sender=Hospital)
+def remember_hospital_zone(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A hospital moving zone changes the totals of the zone it leaves as well
+    instance._previous_zone_id = None
+    if raw or instance.pk is None or (update_fields is not None and 'zone' not in update_fields):
+        return
+    instance._previous_zone_id = sender.objects.filter(pk=instance.pk).values_list('zone_id', flat=True).first()
+
+@receiver([post_save, post_delete], sender=Hospital)
+def refresh_zone_hospital_totals(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _deleting_zone(origin):
+        return
+    zone_ids = {instance.zone_id, instance.__dict__.pop('_previous_zone_id', None)} - {None}
+    SnapshotService.refresh_hospitals(sorted(zone_ids))
+
+@receiver(post_save, sender=CityZone)
+def bump_zone_data_version(sender, instance, created, raw=False, **kwargs):
+    # Zone attributes (latitude, income tier) feed the simulations too
+    if raw or created:
+        return
+    SnapshotService.touch([instance.pk])
+
+
+# --- Structured pollutants ---
+@receiver(post_save, sender=WeatherLog)
+def sync_pollutant_readings(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Bulk writers (fetch_real_aqi, simulate_health) call PollutantService.write themselves
+    if raw or (update_fields is not None and 'pollutant_details' not in update_fields):
+        return
+    PollutantService.write({instance.pk: PollutantService.parse(instance.pollutant_details)})
+
+
+# --- Conditional GET versions ---
+@receiver([post_save, post_delete], sender=CityZone)
+@receiver([post_save, post_delete], sender=Hospital)
+@receiver([post_save, post_delete], sender=WeatherLog)
+@receiver([post_save, post_delete], sender=TrafficStats)
+@receiver([post_save, post_delete], sender=HealthStats)
+@receiver([post_save, post_delete], sender=AgriSupply)
+@receiver([post_save, post_delete], sender=CitizenReport)
+def bump_data_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    DataVersions.bump(sender)
@@ -80,6 +80,7 @@ async function fetchZonesForMap() {
 
                 // Fetch standard metrics
                 fetchResilienceMetrics(selectedZoneId);
+                loadSimulationSurface(selectedZoneId);
 
                 // Feedback
                 if (window.showToast) window.showToast(`Selected Zone: ${entity.name}`, 'info');
@@ -112,6 +113,77 @@ async function fetchResilienceMetrics(id) {
     } catch (e) { console.error(e); }
 }
 
+// What-If response surface: fetched once per zone, sliders interpolate locally
+let simSurface = null;
+
+async function loadSimulationSurface(id) {
+    simSurface = null;
+    try {
+        const res = await fetch(`${API_BASE}/planner/${id}/sweep/`);
+        const data = await res.json();
+        if (data.status === 'success') simSurface = { zoneId: id, ...data };
+    } catch (e) { console.error(e); }
+
+    ['sim-rain', 'sim-traffic'].forEach(inputId => {
+        const el = document.getElementById(inputId);
+        if (el && !el.dataset.surfaceBound) {
+            el.addEventListener('input', previewSimulation);
+            el.dataset.surfaceBound = '1';
+        }
+    });
+}
+
+// Bilinear interpolation on grid[i][j] sampled at xs[i], ys[j] (both ascending)
+function interpolateSurface(xs, ys, grid, x, y) {
+    const locate = (axis, v) => {
+        v = Math.min(Math.max(v, axis[0]), axis[axis.length - 1]);
+        let i = 0;
+        while (i < axis.length - 2 && axis[i + 1] < v) i++;
+        const span = axis[i + 1] - axis[i];
+        return [i, span > 0 ? (v - axis[i]) / span : 0];
+    };
+    const [i, tx] = locate(xs, x);
+    const [j, ty] = locate(ys, y);
+    const top = grid[i][j] * (1 - ty) + grid[i][j + 1] * ty;
+    const bottom = grid[i + 1][j] * (1 - ty) + grid[i + 1][j + 1] * ty;
+    return top * (1 - tx) + bottom * tx;
+}
+
+function simulateFromSurface(rain, traffic) {
+    const s = simSurface;
+    const at = metric => interpolateSurface(s.rain_intensity, s.traffic_load, s.surfaces[metric], rain, traffic);
+    const congestion = at('traffic_congestion_level');
+    const responseTime = at('ambulance_response_time_min');
+    const floodRisk = at('flood_risk_probability');
+    return {
+        status: 'success',
+        scenarios: {
+            traffic_congestion_level: Math.round(congestion * 100) / 100,
+            traffic_congestion_display: `${Math.floor(congestion * 100)}%`,
+            ambulance_response_time_min: Math.round(responseTime * 10) / 10,
+            flood_risk_probability: Math.round(floodRisk * 10) / 10
+        },
+        alerts: [
+            floodRisk > s.thresholds.flood_risk_probability ? "⚠️ High Flood Risk Detected" : null,
+            responseTime > s.thresholds.ambulance_response_time_min ? "🚑 Ambulance Delays Likely" : null
+        ]
+    };
+}
+
+function renderSimulationResult(data) {
+    document.getElementById('sim-results').style.display = 'block';
+    document.getElementById('res-traffic').innerText = data.scenarios.traffic_congestion_display;
+    document.getElementById('res-ambulance').innerText = "+" + data.scenarios.ambulance_response_time_min + " mins";
+    document.getElementById('res-flood').innerText = data.scenarios.flood_risk_probability + "% Risk";
+}
+
+function previewSimulation() {
+    if (!simSurface || simSurface.zoneId !== selectedZoneId) return;
+    const rain = parseFloat(document.getElementById('sim-rain').value) || 0;
+    const traffic = parseFloat(document.getElementById('sim-traffic').value) || 0;
+    renderSimulationResult(simulateFromSurface(rain, traffic));
+}
+
 async function runSimulation() {
     if (!selectedZoneId) { alert("Select a zone first!"); return; }
 
@@ -123,21 +195,23 @@ async function runSimulation() {
     btn.disabled = true;
 
     try {
-        const res = await fetch(`${API_BASE}/planner/${selectedZoneId}/simulate/`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') },
-            body: JSON.stringify({
-                rain_intensity: rain,
-                traffic_load: traffic
-            })
-        });
-        const data = await res.json();
+        let data;
+        if (simSurface && simSurface.zoneId === selectedZoneId) {
+            data = simulateFromSurface(parseFloat(rain) || 0, parseFloat(traffic) || 0);
+        } else {
+            const res = await fetch(`${API_BASE}/planner/${selectedZoneId}/simulate/`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') },
+                body: JSON.stringify({
+                    rain_intensity: rain,
+                    traffic_load: traffic
+                })
+            });
+            data = await res.json();
+        }
 
         if (data.status === 'success') {
-            document.getElementById('sim-results').style.display = 'block';
-            document.getElementById('res-traffic').innerText = data.scenarios.traffic_congestion_display;
-            document.getElementById('res-ambulance').innerText = "+" + data.scenarios.ambulance_response_time_min + " mins";
-            document.getElementById('res-flood').innerText = data.scenarios.flood_risk_probability + "% Risk";
+            renderSimulationResult(data);
 
             if (data.alerts && data.alerts.some(x => x)) {
                 alert(data.alerts.filter(x => x).join("\n"));
@@ -169,6 +243,7 @@ function getCookie(name) {
 
 // 2. TAB LOGIC
 let healthInterval = null;
+let healthStream = null;
 
 function switchTab(tabId, el) {
     document.querySelectorAll('.nav-tab').forEach(el => el.classList.remove('active'));
@@ -189,6 +264,7 @@ function switchTab(tabId, el) {
         clearInterval(healthInterval);
         healthInterval = null;
     }
+    stopHealthStream();
 
     if (tabId === 'urban') {
         setTimeout(initCesium, 100);
@@ -206,8 +282,7 @@ function switchTab(tabId, el) {
     }
 
     if (tabId === 'health') {
-        loadHealthData();
-        healthInterval = setInterval(loadHealthData, 3000);
+        startHealthStream(); // loads the full payload once the stream is connected
     }
 
     if (tabId === 'agri') loadAgriData();
@@ -379,14 +454,115 @@ function toggleMapLayer(layer) {
 }
 
 
+// Latest full health payload; stream events patch it in place
+let healthState = null;
+let healthRenderTimer = null;
+let healthHelloTimer = null;
+let healthLoads = 0; // full loads in flight
+let healthQueue = []; // stream events received while a load is in flight, replayed onto its result
+const HEALTH_POLL_INTERVAL = 3000; // fallback when the event stream is unavailable
+const HEALTH_RENDER_DELAY = 250; // coalesces bursts of stream events into one render
+const HEALTH_HELLO_TIMEOUT = 3000; // load anyway if the stream hasn't connected by then
+
 async function loadHealthData() {
+    healthLoads++;
     try {
         const [hosp, epi, deserts, stations] = await Promise.all([
             fetch(`${API_BASE}/health/`).then(r => r.json()),
             fetch(`${API_BASE}/health/epidemiology/`).then(r => r.json()),
             fetch(`${API_BASE}/health/health_deserts/`).then(r => r.json()),
-            fetch(`${API_BASE}/get_stations`).then(r => r.json())
+            // 503 while the server's first CPCB fetch is in flight: use simulated data until then
+            fetch(`${API_BASE}/get_stations`).then(r => r.ok ? r.json() : [])
         ]);
+        healthState = { hosp, epi, deserts, stations };
+        // The snapshot may predate events already received; they carry absolute values, so replaying is safe
+        healthQueue.forEach(([kind, items]) => patchHealthState(kind, items));
+        renderHealthData();
+    } catch (e) { console.error("Health Data Error", e); }
+    finally {
+        if (--healthLoads === 0) healthQueue = [];
+    }
+}
+
+// Push channel: the server sends only the hospitals and zones that changed
+function startHealthStream() {
+    if (!window.EventSource) {
+        loadHealthData();
+        healthInterval = setInterval(loadHealthData, HEALTH_POLL_INTERVAL);
+        return;
+    }
+    healthStream = new EventSource(`${API_BASE}/health/stream/`);
+    // 'hello' comes once the server has fixed this stream's cursor: a snapshot loaded after it
+    // misses nothing, as every later change arrives as an event (queued while the load runs)
+    let loaded = false;
+    const loadOnce = () => {
+        clearTimeout(healthHelloTimer);
+        if (!loaded) { loaded = true; loadHealthData(); }
+    };
+    healthHelloTimer = setTimeout(loadOnce, HEALTH_HELLO_TIMEOUT);
+    healthStream.addEventListener('hello', loadOnce);
+    healthStream.addEventListener('hospitals', e => applyHealthChanges('hospitals', JSON.parse(e.data)));
+    healthStream.addEventListener('zones', e => applyHealthChanges('zones', JSON.parse(e.data)));
+    // Too far behind to resume: reload everything once
+    healthStream.addEventListener('reset', () => loadHealthData());
+    healthStream.onerror = () => {
+        // EventSource retries network errors itself; CLOSED means the endpoint refused the stream
+        if (healthStream && healthStream.readyState === EventSource.CLOSED) {
+            console.warn("Health stream unavailable, polling instead");
+            stopHealthStream();
+            loadHealthData();
+            healthInterval = setInterval(loadHealthData, HEALTH_POLL_INTERVAL);
+        }
+    };
+}
+
+function stopHealthStream() {
+    clearTimeout(healthHelloTimer);
+    if (healthStream) {
+        healthStream.close();
+        healthStream = null;
+    }
+    if (healthRenderTimer) {
+        clearTimeout(healthRenderTimer);
+        healthRenderTimer = null;
+    }
+}
+
+function applyHealthChanges(kind, items) {
+    if (healthLoads > 0) healthQueue.push([kind, items]);
+    if (!healthState) return; // the load in flight replays it
+    patchHealthState(kind, items);
+    if (!healthRenderTimer) {
+        healthRenderTimer = setTimeout(() => {
+            healthRenderTimer = null;
+            renderHealthData();
+        }, HEALTH_RENDER_DELAY);
+    }
+}
+
+function patchHealthState(kind, items) {
+    if (kind === 'hospitals') {
+        const byId = new Map(items.map(h => [h.id, h]));
+        healthState.hosp.forEach(h => { if (byId.has(h.id)) Object.assign(h, byId.get(h.id)); });
+    } else if (kind === 'zones') {
+        const byZone = new Map(items.map(z => [z.zone_id, z]));
+        healthState.epi.forEach(e => {
+            const z = byZone.get(e.zone_id);
+            if (!z) return;
+            e.aqi = z.aqi;
+            if (z.cases !== undefined && z.cases !== null) e.resp_cases = z.cases;
+        });
+        // Ingested CPCB readings carry the station name
+        const byName = new Map(items.filter(z => z.name).map(z => [z.name, z]));
+        if (byName.size) {
+            healthState.stations.forEach(s => { if (byName.has(s.name)) s.aqi = byName.get(s.name).aqi; });
+        }
+    }
+}
+
+function renderHealthData() {
+    try {
+        const { hosp, epi, stations } = healthState;
 
         // Init Map if needed
         initHealthMap();
@@ -447,7 +623,7 @@ async function loadHealthData() {
         // Render AQI Heatmap
         renderAQIHeatmap(aqiList);
 
-    } catch (e) { console.error("Health Data Error", e); }
+    } catch (e) { console.error("Health Render Error", e); }
 }
 
 function renderAQIHeatmap(data) {
@@ -642,7 +818,7 @@ async function loadAQIHotspots(containerId = 'aqi-hotspots-list') {
     try {
         // 1. Try fetching Real Stations first
         const res = await fetch(`${API_BASE}/get_stations`);
-        let stations = await res.json();
+        let stations = res.ok ? await res.json() : []; // 503 while station data is still loading
         let useSimulated = false;
 
         // 2. Fallback to Simulated Epidemiology Data if no stations
@@ -747,6 +923,7 @@ let trafficAutoRefreshInterval = null;
 let isTrafficAutoRefreshEnabled = false;
 let previousTrafficData = null;
 const TRAFFIC_POLL_INTERVAL = 10000; // 10 seconds
+const ROUTE_SAMPLE_SPACING_M = 1000; // corridor sample spacing for route analysis
 
 // Initialize traffic monitoring event listeners
 // Initialize traffic monitoring event listeners
@@ -914,9 +1091,10 @@ function displayTrafficData(data, isAutoUpdate = false) {
     const roadClosureEl = document.getElementById('traffic-road-closure');
     const confidenceEl = document.getElementById('traffic-confidence');
 
-    if (roadClassEl) roadClassEl.textContent = traffic.roadClass;
+    if (roadClassEl) roadClassEl.textContent = traffic.roadClass || '--';
     if (roadClosureEl) roadClosureEl.textContent = traffic.roadClosure ? '⚠️ Yes' : '✅ No';
-    if (confidenceEl) confidenceEl.textContent = traffic.confidence + '%';
+    // Historical fallback (TomTom unavailable) has no live confidence
+    if (confidenceEl) confidenceEl.textContent = traffic.confidence != null ? traffic.confidence + '%' : 'Typical';
 
     // Location
     const locLatEl = document.getElementById('traffic-loc-lat');
@@ -1304,35 +1482,10 @@ async function analyzeRouteTraffic() {
     if (analyzeBtn) analyzeBtn.disabled = true;
 
     try {
-        // Calculate intermediate points along the route (every ~2km)
-        const checkpoints = generateRouteCheckpoints(routePoints[0], routePoints[1], 5);
-
-        // Fetch traffic data for all checkpoints
-        const trafficPromises = checkpoints.map(point =>
-            fetch(`${API_BASE}/traffic/?lat=${point.lat}&lon=${point.lon}`)
-                .then(res => res.json())
-                .catch(err => ({ error: true }))
-        );
-
-        const trafficDataArray = await Promise.all(trafficPromises);
-
-        // Filter out errors and extract valid traffic data
-        const validData = trafficDataArray.filter(data =>
-            data.status === 'success' && data.traffic && data.traffic.currentSpeed
-        );
-
-        if (validData.length === 0) {
-            throw new Error('No traffic data available for this route');
-        }
-
-        // Calculate aggregated metrics
-        const totalCongestion = validData.reduce((sum, data) => {
-            return sum + data.traffic.congestionScore;
-        }, 0);
-        const avgCongestion = totalCongestion / validData.length;
-
-        const totalSpeed = validData.reduce((sum, data) => sum + data.traffic.currentSpeed, 0);
-        const avgSpeed = totalSpeed / validData.length;
+        // Whole corridor in one request (the server samples the route and dedupes by road segment)
+        const summary = await fetchCorridorTraffic(routePoints[0], routePoints[1]);
+        const avgCongestion = summary.avgCongestion;
+        const avgSpeed = summary.avgSpeed;
 
         const distance = calculateDistance(routePoints[0], routePoints[1]);
         const estimatedTime = (distance / avgSpeed) * 60; // minutes
@@ -1343,7 +1496,7 @@ async function analyzeRouteTraffic() {
             avgSpeed,
             distance,
             estimatedTime,
-            checkpoints: validData.length
+            checkpoints: summary.answered
         });
 
     } catch (error) {
@@ -1358,19 +1511,21 @@ async function analyzeRouteTraffic() {
     }
 }
 
-function generateRouteCheckpoints(start, end, numPoints) {
-    const checkpoints = [start];
-
-    for (let i = 1; i < numPoints - 1; i++) {
-        const ratio = i / (numPoints - 1);
-        checkpoints.push({
-            lat: start.lat + (end.lat - start.lat) * ratio,
-            lon: start.lon + (end.lon - start.lon) * ratio
-        });
+// Congestion summary for the straight corridor between two points (one POST instead of one GET per checkpoint)
+async function fetchCorridorTraffic(start, end) {
+    const res = await fetch(`${API_BASE}/traffic/corridor/`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') },
+        body: JSON.stringify({
+            polyline: [[start.lat, start.lon], [end.lat, end.lon]],
+            spacing_m: ROUTE_SAMPLE_SPACING_M
+        })
+    });
+    const data = await res.json();
+    if (!res.ok || data.status !== 'success') {
+        throw new Error(data.message || 'No traffic data available for this route');
     }
-
-    checkpoints.push(end);
-    return checkpoints;
+    return data.summary;
 }
 
 function calculateDistance(point1, point2) {
@@ -1749,6 +1904,12 @@ function runUrbanSimulation(type) {
     resEl.style.display = 'block';
     resEl.innerHTML = '<span style="color:#666;">Calculating impact...</span>';
 
+    // Epidemic surge is projected server-side (SEIR across zones vs ICU capacity)
+    if (type === 'health' && document.getElementById('sim-health-event').value === 'surge') {
+        runSurgeProjection(resEl);
+        return;
+    }
+
     setTimeout(() => {
         let html = '';
         if (type === 'weather') {
@@ -1783,6 +1944,24 @@ function runUrbanSimulation(type) {
     }, 1500);
 }
 
+async function runSurgeProjection(resEl) {
+    try {
+        const res = await fetch(`${API_BASE}/health/surge_projection/?days=120`);
+        const data = await res.json();
+        if (data.status !== 'success') throw new Error(data.message);
+
+        const s = data.summary;
+        const load = s.icu_free_beds > 0 ? Math.round(s.peak_icu_demand / s.icu_free_beds * 100) : null;
+        resEl.innerHTML = `<strong>⚠️ Epidemic Surge (120-day projection):</strong><br>` +
+            `• Peak ICU Demand: ${Math.round(s.peak_icu_demand)} beds on day ${s.peak_day}<br>` +
+            `• Free ICU Beds Today: ${s.icu_free_beds}${load !== null ? ` (${load}% of free capacity at peak)` : ''}<br>` +
+            `• Zones Over Capacity: ${s.zones_over_capacity} / ${data.zone_count}`;
+    } catch (e) {
+        console.error("Surge projection error", e);
+        resEl.innerHTML = '<span style="color:red;">Surge projection unavailable.</span>';
+    }
+}
+
 // ======================================
 // CITIZEN TRAFFIC MONITORING
 // ======================================
@@ -1925,23 +2104,9 @@ async function analyzeCitizenRouteTraffic() {
     resultsEl.style.display = 'none';
 
     try {
-        const checkpoints = generateRouteCheckpoints(citRoutePoints[0], citRoutePoints[1], 5);
-        const trafficPromises = checkpoints.map(point =>
-            fetch(`${API_BASE}/traffic/?lat=${point.lat}&lon=${point.lon}`)
-                .then(res => res.json())
-                .catch(err => ({ error: true }))
-        );
-        const trafficDataArray = await Promise.all(trafficPromises);
-        const validData = trafficDataArray.filter(data =>
-            data.status === 'success' && data.traffic && data.traffic.currentSpeed
-        );
-
-        if (validData.length === 0) throw new Error('No traffic data');
-
-        const totalCongestion = validData.reduce((sum, data) => sum + data.traffic.congestionScore, 0);
-        const avgCongestion = totalCongestion / validData.length;
-        const totalSpeed = validData.reduce((sum, data) => sum + data.traffic.currentSpeed, 0);
-        const avgSpeed = totalSpeed / validData.length;
+        const summary = await fetchCorridorTraffic(citRoutePoints[0], citRoutePoints[1]);
+        const avgCongestion = summary.avgCongestion;
+        const avgSpeed = summary.avgSpeed;
         const distance = calculateDistance(citRoutePoints[0], citRoutePoints[1]);
         const estimatedTime = (distance / avgSpeed) * 60;
 
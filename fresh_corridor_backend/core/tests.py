@@ -1,3 +1,163 @@
-from django.test import TestCase
+import json
+from contextlib import contextmanager
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from core.management.commands.fetch_real_aqi import Command as FetchRealAQI
+from core.models import CityZone, HealthStats, Hospital, TrafficStats, WeatherLog, ZoneSnapshot
+from core.services.cpcb_feed import iter_raw_stations, iter_stations
+from core.services.upstream import CircuitOpenError, UpstreamClient
+
+
+def _chunks(payload, size):
+    data = json.dumps(payload).encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _station(name, pm25='120'):
+    return {
+        'stationName': name, 'latitude': '28.61', 'longitude': '77.21', 'lastUpdate': '18-10-2026 10:00:00',
+        'pollutants': [{'indexId': 'PM2.5', 'avg': pm25, 'min': '80', 'max': '150'}],
+    }
+
+
+class CPCBFeedTests(SimpleTestCase):
+    CHUNK_SIZES = (1, 7, 64 * 1024)
+
+    def test_context_after_station_list(self):
+        feed = [{
+            'citiesInState': [
+                {'stationsInCity': [_station('A'), _station('B')], 'cityId': 'Delhi'},
+                {'cityId': 'Noida', 'stationsInCity': [_station('C')]},
+            ],
+            'stateId': 'Delhi NCR',
+        }]
+        for size in self.CHUNK_SIZES:
+            with self.subTest(chunk_size=size):
+                self.assertEqual(
+                    [(s['stationName'], c) for s, c in iter_raw_stations(_chunks(feed, size))],
+                    [('A', {'city': 'Delhi', 'state': 'Delhi NCR'}),
+                     ('B', {'city': 'Delhi', 'state': 'Delhi NCR'}),
+                     ('C', {'city': 'Noida', 'state': 'Delhi NCR'})],
+                )
+
+    def test_stand_alone_station_keeps_nested_fields(self):
+        feed = {'data': [{'stateId': 'UP', 'cityId': 'Agra', 'site': _station('D', pm25='210')}]}
+        for size in self.CHUNK_SIZES:
+            with self.subTest(chunk_size=size):
+                records = list(iter_stations(_chunks(feed, size)))
+                self.assertEqual(len(records), 1)
+                self.assertEqual((records[0]['name'], records[0]['city'], records[0]['state']), ('D', 'Agra', 'UP'))
+                self.assertEqual(records[0]['pollutants'], _station('D', pm25='210')['pollutants'])
+                # No AQI field: ingestion falls back to the PM2.5 average
+                self.assertEqual(FetchRealAQI.parse_station(records[0])['air_quality_index'], 210)
+
+
+class FetchRealAQITests(TestCase):
+    @contextmanager
+    def _response(self, chunks):
+        response = mock.Mock()
+        response.iter_content.return_value = chunks
+        yield response
+
+    def _run(self, chunks):
+        with mock.patch('core.management.commands.fetch_real_aqi.upstream.get', return_value=self._response(chunks)):
+            FetchRealAQI(stdout=StringIO()).handle(verbosity=0)
+
+    def test_ingests_whole_feed(self):
+        self._run(_chunks([{'stateId': 'Delhi', 'citiesInState': [
+            {'cityId': 'Delhi', 'stationsInCity': [_station('A'), _station('B')]},
+        ]}], 16))
+        self.assertEqual(WeatherLog.objects.count(), 2)
+
+    def test_feed_broken_mid_download_ingests_nothing(self):
+        def broken():
+            yield json.dumps([{'stateId': 'Delhi', 'citiesInState': [
+                {'cityId': 'Delhi', 'stationsInCity': [_station('A')]},
+            ]}]).encode()[:-20]
+            raise ConnectionError('connection reset')
+
+        self._run(broken())
+        self.assertFalse(CityZone.objects.exists())
+        self.assertFalse(WeatherLog.objects.exists())
+
+
+class ZoneSnapshotSignalTests(TestCase):
+    def setUp(self):
+        self.zone = CityZone.objects.create(name='Zone A', latitude=28.61, longitude=77.21)
+        self.other = CityZone.objects.create(name='Zone B', latitude=28.70, longitude=77.10)
+        self.hospital = Hospital.objects.create(name='City General', zone=self.zone, total_beds_icu=40, occupied_beds_icu=10)
+        WeatherLog.objects.create(zone=self.zone, temperature_c=30, precipitation_mm=0, wind_speed_kmh=5,
+                                  visibility_km=4, air_quality_index=180)
+        TrafficStats.objects.create(zone=self.zone, congestion_level=0.4)
+        HealthStats.objects.create(zone=self.zone, respiratory_cases_active=12)
+
+    def test_deleting_a_zone_with_hospitals_and_readings(self):
+        self.zone.delete()
+        self.assertFalse(CityZone.objects.filter(pk=self.zone.pk).exists())
+        self.assertFalse(ZoneSnapshot.objects.filter(zone_id=self.zone.pk).exists())
+        self.assertFalse(Hospital.objects.exists())
+
+    def test_hospital_move_refreshes_both_zones(self):
+        self.hospital.zone = self.other
+        self.hospital.save()
+        totals = dict(ZoneSnapshot.objects.values_list('zone_id', 'total_beds_icu'))
+        self.assertEqual(totals, {self.zone.pk: 0, self.other.pk: 40})
+
+    def test_deleting_a_hospital_refreshes_its_zone(self):
+        self.hospital.delete()
+        self.assertEqual(ZoneSnapshot.objects.get(zone=self.zone).hospital_count, 0)
+
+
+class TypicalTrafficTests(TestCase):
+    def test_non_finite_coordinates_are_rejected(self):
+        client = APIClient()
+        for lat, lon in (('inf', '77.2'), ('nan', '77.2'), ('28.6', '-inf'), ('95', '77.2')):
+            with self.subTest(lat=lat, lon=lon):
+                response = client.get('/api/traffic/typical/', {'lat': lat, 'lon': lon})
+                self.assertEqual(response.status_code, 400)
+
+    def test_valid_coordinates_without_history(self):
+        response = APIClient().get('/api/traffic/typical/', {'lat': '28.6139', 'lon': '77.2090'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['location'], {'latitude': 28.6139, 'longitude': 77.209})
+
+
+class UpstreamClientTests(SimpleTestCase):
+    URL = 'https://upstream.test/data'
+
+    def setUp(self):
+        self.client = UpstreamClient()
+        self.client.BREAKER_THRESHOLD, self.client.BREAKER_COOLDOWN = 1, 0
+        self.state = self.client._host(self.URL)
+        self.request = mock.patch.object(self.state.session, 'request').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_malformed_probe_releases_the_half_open_slot(self):
+        self.request.side_effect = requests.ConnectionError('down')
+        with self.assertRaises(requests.ConnectionError):
+            self.client.get(self.URL, retries=0)
+        self.assertEqual(self.state.breaker.state, 'half-open')
+
+        # The probe fails before reaching the host
+        self.request.side_effect = requests.exceptions.InvalidURL('bad url')
+        with self.assertRaises(requests.exceptions.InvalidURL):
+            self.client.get(self.URL, retries=0)
+
+        self.request.side_effect = None
+        self.request.return_value = mock.Mock(status_code=200)
+        self.assertEqual(self.client.get(self.URL, retries=0).status_code, 200)
+        self.assertEqual(self.state.breaker.state, 'closed')
+
+    def test_open_circuit_short_circuits(self):
+        self.client.BREAKER_COOLDOWN = 60
+        self.state = self.client._host('https://other.test/')
+        with mock.patch.object(self.state.session, 'request', side_effect=requests.ConnectionError('down')):
+            with self.assertRaises(requests.ConnectionError):
+                self.client.get('https://other.test/', retries=0)
+            with self.assertRaises(CircuitOpenError):
+                self.client.get('https://other.test/', retries=0)
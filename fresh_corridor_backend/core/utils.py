@@ -15,3 +15,31 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * math.asin(math.sqrt(a)) 
     r = 6371 # Radius of earth in kilometers. Use 3956 for miles.
     return c * r
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_np(lat, lon, lats, lons):
+    """
+    Vectorized haversine: distance in km from one point to arrays of points.
+    """
+    import numpy as np
+
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Returns (min_lat, max_lat, min_lon, max_lon) enclosing a circle of radius_km.
+    Used as a cheap, index-friendly prefilter before exact haversine checks.
+    """
+    ang = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(ang)
+    ratio = math.sin(ang) / max(math.cos(math.radians(lat)), 1e-12)
+    if lat + dlat >= 90 or lat - dlat <= -90 or ratio >= 1:
+        dlon = 180.0 # Circle covers a pole (or is huge): every longitude qualifies
+    else:
+        dlon = math.degrees(math.asin(ratio))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
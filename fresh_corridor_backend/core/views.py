@@ -1,12 +1,22 @@
 from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import CityZone, WeatherLog, Hospital, TrafficStats, AgriSupply, CitizenReport, HealthStats, RealTimeTraffic
+from .services.change_feed import ChangeFeed
+from .services.data_versions import DataVersions
+from .services.pollutant_service import PollutantService
 from .services.simulation_service import SimulationService
+from .services.snapshot_service import SnapshotService
+from .services.timeseries import TimeSeriesService
+from .services.traffic_profiles import TrafficProfileService
+from .services.traffic_service import TrafficService
+from .services.upstream import upstream
 from .serializers import (
-    CityZoneSerializer, WeatherLogSerializer, HospitalSerializer, 
+    CityZoneSerializer, WeatherLogSerializer, HospitalSerializer, HospitalDistanceSerializer,
     TrafficStatsSerializer, AgriSupplySerializer, CitizenReportSerializer, HealthStatsSerializer,
+    SnapshotWeatherSerializer, SnapshotTrafficSerializer,
     LoginSerializer, SignupSerializer, UserSerializer
 )
 from django.contrib.auth import authenticate, login
@@ -15,8 +25,10 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from rest_framework.permissions import AllowAny
 from rest_framework.authentication import SessionAuthentication
 from django.views.decorators.csrf import csrf_exempt
-import requests
+import math
 import os
+import time
+import requests
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -112,23 +124,60 @@ def auth_signup(request):
         }, status=201)
     return Response(serializer.errors, status=400)
 
+# --- Conditional GET ---
+class NotModified(Exception):
+    """Raised by ConditionalGetMixin to answer a GET with 304."""
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags on a viewset's GETs, derived from the DataVersions of `etag_models`
+    (everything any of its read actions depends on). A matching If-None-Match gets 304
+    right after authentication, before any queryset or serializer runs.
+    Actions whose answer also moves with the clock (a sliding `now - hours` window) set
+    `etag_bucket` through @action, and their tags then change every that many seconds.
+    """
+    etag_models = ()
+    etag_bucket = None # seconds
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ('GET', 'HEAD'):
+            extra = (int(time.time() // self.etag_bucket),) if self.etag_bucket else ()
+            self.etag = DataVersions.etag(request, self.etag_models, *extra)
+            if DataVersions.matches(request, self.etag):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=304)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            response['Cache-Control'] = 'no-cache' # browsers keep the body but revalidate every poll
+        return response
+
 # --- Tab 1: Planner View ---
-class PlannerViewSet(viewsets.ModelViewSet):
+class PlannerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CityZone.objects.all()
+    etag_models = (CityZone, WeatherLog, TrafficStats, HealthStats, Hospital)
     serializer_class = CityZoneSerializer
 
     @action(detail=True, methods=['get'])
     def full_status(self, request, pk=None):
         """Returns consolidated status for a zone (Weather, Traffic, Hospitals)"""
         zone = self.get_object()
-        weather = WeatherLog.objects.filter(zone=zone).last()
-        traffic = TrafficStats.objects.filter(zone=zone).last()
-        hospitals = Hospital.objects.filter(zone=zone)
+        snapshot = SnapshotService.for_zone(zone.pk)
+        hospitals = Hospital.objects.filter(zone=zone).select_related('zone')
         
         return Response({
             'zone': CityZoneSerializer(zone).data,
-            'weather': WeatherLogSerializer(weather).data if weather else None,
-            'traffic': TrafficStatsSerializer(traffic).data if traffic else None,
+            'weather': SnapshotWeatherSerializer(snapshot).data if snapshot and snapshot.weather_timestamp else None,
+            'traffic': SnapshotTrafficSerializer(snapshot).data if snapshot and snapshot.traffic_timestamp else None,
             'hospitals': HospitalSerializer(hospitals, many=True).data
         })
 
@@ -147,6 +196,24 @@ class PlannerViewSet(viewsets.ModelViewSet):
         result = SimulationService.run_what_if_simulation(pk, modifiers)
         return Response(result)
 
+    @action(detail=True, methods=['get'])
+    def sweep(self, request, pk=None):
+        """What-If response surface over a rain x traffic grid (interpolated client-side)"""
+        result = SimulationService.run_parameter_sweep(pk, request.query_params)
+        return Response(result)
+
+    @action(detail=True, methods=['post'])
+    def simulate_ensemble(self, request, pk=None):
+        """What-If Simulation as a Monte Carlo ensemble (P10/P50/P90 bands)"""
+        result = SimulationService.run_ensemble_simulation(pk, request.data)
+        return Response(result)
+
+    @action(detail=False, methods=['post'])
+    def simulate_city(self, request):
+        """What-If Simulation for every zone at once (columnar response)"""
+        result = SimulationService.run_city_simulation(request.data)
+        return Response(result, status=200 if result['status'] == 'success' else 400)
+
 @api_view(['GET'])
 @permission_classes([AllowAny]) 
 def get_user_profile(request):
@@ -174,34 +241,58 @@ def get_user_profile(request):
         })
 
 # --- Tab 2: Health View ---
-class HealthViewSet(viewsets.ModelViewSet):
-    queryset = Hospital.objects.all()
+class HealthViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Hospital.objects.select_related('zone')
+    etag_models = (Hospital, CityZone, WeatherLog, HealthStats, AgriSupply)
     serializer_class = HospitalSerializer
+    HOTSPOT_MAX_HOURS = 24 * 30 # readings older than the default raw retention are gone anyway
 
     def list(self, request, *args, **kwargs):
-        """Standard list, but with optional location filtering"""
+        """Standard list, but with optional location filtering (?lat=&long=&radius=[&k=])"""
         lat = request.query_params.get('lat')
         long = request.query_params.get('long')
-        radius = float(request.query_params.get('radius', 50)) # Default 50km
-
-        hospitals = list(self.get_queryset())
+        k = request.query_params.get('k')
 
         if lat and long:
-            from .utils import haversine
-            u_lat, u_long = float(lat), float(long)
-            
-            # Annotate with distance
+            from .utils import haversine, bounding_box
+            from .services.spatial_index import HospitalIndex
+            try:
+                u_lat, u_long = _finite_float(lat), _finite_float(long)
+                radius = _finite_float(request.query_params.get('radius', 50)) # Default 50km
+                k = int(k) if k else None
+                if not (-90 <= u_lat <= 90 and -180 <= u_long <= 180) or radius <= 0 or (k is not None and k < 1):
+                    raise ValueError
+            except ValueError:
+                return Response(
+                    {'error': 'lat/long must be finite coordinates, radius a positive number and k a positive integer'},
+                    status=400,
+                )
+
+            # 1. Candidates from the in-memory grid (sublinear in the number of hospitals)
+            index = HospitalIndex.get()
+            if k:
+                ids, _ = index.nearest(u_lat, u_long, k, max_km=radius)
+            else:
+                ids, _ = index.within_radius(u_lat, u_long, radius)
+
+            # 2. Fetch only those rows; the indexed bounding box drops anything whose zone
+            #    moved since the index was built (possibly by another process).
+            min_lat, max_lat, min_lon, max_lon = bounding_box(u_lat, u_long, radius)
+            hospitals = list(self.get_queryset().filter(
+                pk__in=ids.tolist(),
+                zone__latitude__range=(min_lat, max_lat),
+                zone__longitude__range=(min_lon, max_lon),
+            ))
+
+            # 3. Exact distances on the (small) result set
             for h in hospitals:
                 h.distance_km = haversine(u_lat, u_long, h.zone.latitude, h.zone.longitude)
-            
-            # Filter and Sort
             hospitals = [h for h in hospitals if h.distance_km <= radius]
             hospitals.sort(key=lambda x: x.distance_km)
-            
-            # Serialize (we need to pass many=True manually since we converted to list)
-            serializer = self.get_serializer(hospitals, many=True)
-            # Add distance to response if needed, but serializer fields are fixed. 
-            # ideally we'd add a custom field, but for now just returning sorted list is good.
+            for h in hospitals:
+                h.distance_km = round(h.distance_km, 2)
+
+            serializer = HospitalDistanceSerializer(hospitals, many=True, context=self.get_serializer_context())
             return Response(serializer.data)
 
         return super().list(request, *args, **kwargs)
@@ -209,83 +300,207 @@ class HealthViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def epidemiology(self, request):
         """Feature A: Epidemiological Heatmap (Resp Cases vs Pollution)"""
-        data = []
-        zones = CityZone.objects.all()
-        
+        from .services.readings_service import ReadingsService
+
         lat = request.query_params.get('lat')
         long = request.query_params.get('long')
-        
-        for zone in zones:
-            health_stats = HealthStats.objects.filter(zone=zone).last()
-            weather = WeatherLog.objects.filter(zone=zone).last()
-            
-            dist = 0
-            if lat and long:
-                 from .utils import haversine
-                 dist = haversine(float(lat), float(long), zone.latitude, zone.longitude)
-
-            if health_stats and weather:
-                data.append({
-                    'zone_name': zone.name,
-                    'latitude': zone.latitude,
-                    'longitude': zone.longitude,
-                    'resp_cases': health_stats.respiratory_cases_active,
-                    'aqi': weather.air_quality_index,
-                    'pollutant_details': weather.pollutant_details,
-                    'temperature': weather.temperature_c,
-                    'distance_km': round(dist, 2)
-                })
-        
-        # Sort by distance if location provided
-        if lat and long:
-            data.sort(key=lambda x: x['distance_km'])
-            
+
+        # One query for every zone's latest health + weather reading
+        zones = list(
+            ReadingsService.zones_with_latest(
+                weather=['id', 'air_quality_index', 'pollutant_details', 'temperature_c'],
+                health=['respiratory_cases_active'],
+            )
+            .filter(health_respiratory_cases_active__isnull=False, weather_air_quality_index__isnull=False)
+            .values(
+                'id', 'name', 'latitude', 'longitude',
+                'health_respiratory_cases_active', 'weather_air_quality_index',
+                'weather_id', 'weather_pollutant_details', 'weather_temperature_c',
+            )
+        )
+        pollutants = PollutantService.by_log(z['weather_id'] for z in zones)
+
+        dists = [0.0] * len(zones)
+        order = range(len(zones))
+        if lat and long and zones:
+            import numpy as np
+            from .utils import haversine_np
+            dists = haversine_np(
+                float(lat), float(long),
+                [z['latitude'] for z in zones], [z['longitude'] for z in zones],
+            )
+            order = np.argsort(dists, kind='stable')
+
+        data = []
+        for i in order:
+            zone = zones[i]
+            data.append({
+                'zone_id': zone['id'],
+                'zone_name': zone['name'],
+                'latitude': zone['latitude'],
+                'longitude': zone['longitude'],
+                'resp_cases': zone['health_respiratory_cases_active'],
+                'aqi': zone['weather_air_quality_index'],
+                'pollutant_details': zone['weather_pollutant_details'],
+                'pollutants': pollutants.get(zone['weather_id'], {}),
+                'temperature': zone['weather_temperature_c'],
+                'distance_km': round(float(dists[i]), 2)
+            })
+
         return Response(data)
 
+    @action(detail=False, methods=['get'], etag_bucket=60) # readings age out of the window without a write
+    def pollutant_hotspots(self, request):
+        """Zones whose pollutant average exceeded a threshold recently (?pollutant=PM2.5&above=250&hours=1)"""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        try:
+            pollutant = request.query_params.get('pollutant', 'PM2.5')
+            above = _finite_float(request.query_params.get('above', 250))
+            hours = _finite_float(request.query_params.get('hours', 1))
+            if not 0 < hours <= self.HOTSPOT_MAX_HOURS:
+                raise ValueError
+            since = timezone.now() - timedelta(hours=hours)
+        except ValueError:
+            return Response(
+                {'error': f'above must be a finite number and hours a number in (0, {self.HOTSPOT_MAX_HOURS}]'}, status=400
+            )
+
+        data = [{
+            'zone_id': row['zone_id'],
+            'zone_name': row['zone__name'],
+            'latitude': row['zone__latitude'],
+            'longitude': row['zone__longitude'],
+            'peak': row['peak'],
+            'readings': row['readings'],
+            'last_seen': row['last_seen'],
+        } for row in PollutantService.hotspots(pollutant, above, since)]
+        return Response({'pollutant': pollutant.strip().upper(), 'above': above, 'since': since, 'zones': data})
+
+    @action(detail=False, methods=['get'])
+    def surge_projection(self, request):
+        """SEIR respiratory surge across zones vs ICU capacity (?days=&r0=&aqi_sensitivity=)"""
+        result = SimulationService.run_surge_projection(request.query_params)
+        return Response(result, status=200 if result['status'] == 'success' else 400)
+
     @action(detail=False, methods=['get'])
     def health_deserts(self, request):
         """Feature B: Health Desert Identifier (Low Income + Poor AQI + No Fresh Food)"""
-        deserts = []
-        zones = CityZone.objects.filter(average_income_tier='Low')
+        from django.db.models import Exists, OuterRef
+
+        # Logic: Low Income + AQI > 100 (Poor, from the zone snapshot) + No Supply
+        # Note: Real logic finds supply DESTINED for zone, but we lack 'destination' in AgriSupply.
+        # Assuming for MVP 'origin_zone' implies local availability or we check simple supply chain gap.
+        # Let's assume we flag if NO farmer is logging from this zone (zero production/market activity)
+        has_supply = AgriSupply.objects.filter(origin_zone=OuterRef('pk'))
+        zones = (
+            CityZone.objects.filter(average_income_tier='Low', snapshot__air_quality_index__gt=100)
+            .exclude(Exists(has_supply))
+        )
         
-        for zone in zones:
-            weather = WeatherLog.objects.filter(zone=zone).last()
-            # Simple check: If no supply in last X days (mocked as count=0 for MVP)
-            has_supply = AgriSupply.objects.filter(origin_zone=zone).exists() # Note: Origin isn't destination, but simplified for MVP or assumes local market
-            
-            # Logic: Low Income (Filtered) + AQI > 150 (Poor) + No Supply
-            if weather and weather.air_quality_index > 100: # Threshold for 'Poor'
-                 # Note: Real logic finds supply DESTINED for zone, but we lack 'destination' in AgriSupply.
-                 # Assuming for MVP 'origin_zone' implies local availability or we check simple supply chain gap.
-                 # Let's assume we flag if NO farmer is logging from this zone (zero production/market activity)
-                 if not has_supply: 
-                     deserts.append(CityZoneSerializer(zone).data)
-        
-        return Response(deserts)
+        return Response(CityZoneSerializer(zones, many=True).data)
+
+def health_stream(request):
+    """
+    Server-Sent Events for the health dashboard: 'hospitals' and 'zones' events carry only
+    the hospitals (occupancy, oxygen) and zones (AQI, active cases) that changed. Resumes
+    from the Last-Event-ID header (or ?last_event_id=); 'reset' asks for a full reload.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    response = StreamingHttpResponse(ChangeFeed.stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # don't let a proxy buffer the stream
+    return response
 
 # --- Tab 3: Farmer View ---
-class FarmerViewSet(viewsets.ModelViewSet):
+class FarmerViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = AgriSupply.objects.all()
+    etag_models = (AgriSupply, CityZone)
     serializer_class = AgriSupplySerializer
 
 # --- Tab 4: Citizen View ---
-class CitizenViewSet(viewsets.ModelViewSet):
+class CitizenViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CitizenReport.objects.all()
+    etag_models = (CitizenReport, CityZone)
     serializer_class = CitizenReportSerializer
 
 # --- Shared: AQI Stations ---
 from rest_framework.decorators import api_view
+from datetime import datetime, timezone as dt_timezone
 from .services.aqi_service import AQIService
 
+def _finite_float(value):
+    """float(value), rejecting inf and nan (ValueError) so they never reach index math."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'{value!r} is not a finite number')
+    return number
+
+def _coordinates(lat, lon):
+    """(lat, lon) as finite, in-range floats. Raises ValueError."""
+    lat, lon = _finite_float(lat), _finite_float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f'lat/lon out of range: {lat},{lon}')
+    return lat, lon
+
 @api_view(['GET'])
 def get_stations_api(request):
-    """Proxy CPCB data from AQIService"""
-    # Optional: trigger refresh
+    """Proxy CPCB data from AQIService (last good snapshot; age reported in headers)"""
+    # Optional: trigger refresh (runs in the background, collapsed with any fetch in flight)
     if 'refresh' in request.query_params:
-        AQIService.fetch_live_data()
+        AQIService.refresh_async()
     
-    stations = AQIService.get_stations()
-    return Response(stations)
+    store = AQIService.get_store()
+    params = request.query_params
+    if store.fetched_at is None:
+        # Nothing fetched yet: not the same as CPCB reporting no stations
+        return Response(
+            {'error': 'Station data is still loading', 'warming': True}, status=503,
+            headers={'Retry-After': '10', 'X-Data-Age': 'none'},
+        )
+
+    # The store is rebuilt on every refresh, so its fetch time versions the body
+    etag = DataVersions.etag(request, (), store.fetched_at)
+    if DataVersions.matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    # Optional spatial modes: ?lat=&lon=[&k=5][&radius=] nearest first, or ?bbox=min_lon,min_lat,max_lon,max_lat
+    try:
+        if params.get('lat') and params.get('lon'):
+            k = min(int(params.get('k', 5)), AQIService.MAX_NEAREST)
+            radius = _finite_float(params['radius']) if params.get('radius') else None
+            positions, dists = store.nearest(_finite_float(params['lat']), _finite_float(params['lon']), k, max_km=radius)
+            body = store.json_for(positions, dists)
+        elif params.get('bbox'):
+            min_lon, min_lat, max_lon, max_lat = (_finite_float(v) for v in params['bbox'].split(','))
+            body = store.json_for(store.within_bbox(min_lat, max_lat, min_lon, max_lon))
+        else:
+            # Body is pre-rendered once per refresh
+            body = store.json_bytes
+    except ValueError:
+        return Response({'error': 'Expected finite numeric lat, lon, k, radius or bbox=min_lon,min_lat,max_lon,max_lat'}, status=400)
+
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    response['X-Data-Age'] = str(int(AQIService.snapshot_age()))
+    response['X-Data-Fetched-At'] = datetime.fromtimestamp(store.fetched_at, tz=dt_timezone.utc).isoformat()
+    return response
+
+def _conditional_response(request, data):
+    """Response with an ETag over the data itself; 304 when the client already has it."""
+    import json
+    etag = DataVersions.etag(request, (), json.dumps(data, sort_keys=True, default=str))
+    if DataVersions.matches(request, etag):
+        return Response(status=304, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
 
 @api_view(['GET'])
 def get_simulated_weather(request):
@@ -301,7 +516,7 @@ def get_simulated_weather(request):
     if cached_data:
         # Add a flag to indicate cached data for debugging
         cached_data['_source'] = 'cache'
-        return Response(cached_data)
+        return _conditional_response(request, cached_data)
 
     try:
         # Open-Meteo API for New Delhi (28.61, 77.20)
@@ -313,7 +528,7 @@ def get_simulated_weather(request):
             "timezone": "auto"
         }
         
-        r = requests.get(url, params=params, timeout=5)
+        r = upstream.get(url, params=params, timeout=5)
         r.raise_for_status()
         data = r.json().get('current', {})
         
@@ -339,12 +554,12 @@ def get_simulated_weather(request):
         # Cache for 10 minutes (600 seconds)
         cache.set(CACHE_KEY, weather_response, 600)
         
-        return Response(weather_response)
+        return _conditional_response(request, weather_response)
 
     except Exception as e:
         print(f"Weather API Error: {e}")
         # Fallback to a basic safe state if API fails
-        return Response({
+        return _conditional_response(request, {
             "temp": 22.0,
             "humidity": 45,
             "windSpeed": 10,
@@ -356,6 +571,80 @@ def get_simulated_weather(request):
             "precipitation": "0.0 mm"
         })
 
+@api_view(['GET'])
+def get_upstream_stats(request):
+    """Per-host request, error, retry and latency counters for the upstream APIs."""
+    return Response(upstream.stats())
+
+@api_view(['GET'])
+def get_timeseries(request):
+    """
+    History of one metric, downsampled with LTTB:
+    ?source=weather|health|traffic|realtime_traffic&metric=&zone=<id> (or &lat=&lon= for
+    realtime_traffic) [&start=&end=<ISO datetimes, default the last 24 h>][&points=500].
+    """
+    from datetime import timedelta
+    from django.utils.dateparse import parse_datetime
+    from django.utils import timezone
+
+    params = request.query_params
+    source = params.get('source')
+    if source not in TimeSeriesService.SOURCES:
+        return Response({'error': f"source must be one of {', '.join(TimeSeriesService.SOURCES)}"}, status=400)
+    metrics = TimeSeriesService.metrics(source)
+    metric = params.get('metric', metrics[0])
+    if metric not in metrics:
+        return Response({'error': f"metric for {source} must be one of {', '.join(metrics)}"}, status=400)
+
+    try:
+        now = timezone.now()
+        end, start = now, None
+        for name in ('start', 'end'):
+            if params.get(name):
+                value = parse_datetime(params[name])
+                if value is None:
+                    raise ValueError(f'{name} must be an ISO datetime')
+                value = value if timezone.is_aware(value) else timezone.make_aware(value)
+                if name == 'start':
+                    start = value
+                else:
+                    end = value
+        start = start or end - timedelta(hours=24)
+        if start >= end:
+            raise ValueError('start must be before end')
+        points = min(int(params.get('points', 500)), TimeSeriesService.MAX_POINTS)
+        if points < 2:
+            raise ValueError('points must be at least 2')
+
+        if source == 'realtime_traffic':
+            try:
+                lat, lon = _finite_float(params['lat']), _finite_float(params['lon'])
+            except ValueError:
+                raise ValueError('lat and lon must be finite numbers') from None
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f'lat/lon out of range: {lat},{lon}')
+            location = {'latitude': lat, 'longitude': lon}
+            result = TimeSeriesService.series(source, metric, start, end, points, cell=TimeSeriesService.cell(lat, lon), now=now)
+        else:
+            zone_id = int(params['zone'])
+            location = {'zone': zone_id}
+            result = TimeSeriesService.series(source, metric, start, end, points, zone_id=zone_id, now=now)
+    except KeyError as e:
+        return Response({'error': f'{e.args[0]} is required'}, status=400)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+    return Response({
+        'source': source,
+        'metric': metric,
+        'location': location,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'resolution': result['resolution'],
+        'samples': result['samples'],
+        'points': [[ts.isoformat(), value] for ts, value in result['points']],
+    })
+
 # --- Traffic Monitoring ---
 def traffic_monitor(request):
     """Render the traffic monitoring page"""
@@ -365,7 +654,21 @@ def traffic_monitor(request):
 def get_traffic_data(request):
     """API endpoint to fetch real-time traffic data from TomTom"""
     API_KEY = os.getenv('TOMTOM_API_KEY')
-    
+
+    # Get coordinates from query parameters or use default (Connaught Place, New Delhi)
+    lat = request.GET.get('lat', '28.6139')
+    lon = request.GET.get('lon', '77.2090')
+
+    # Points on a road segment TomTom already answered for are served from cache
+    # and cost no credits, so they skip the rate limit
+    try:
+        lat_f, lon_f = _coordinates(lat, lon)
+    except ValueError:
+        return Response({'status': 'error', 'message': 'lat and lon must be finite, in-range coordinates'}, status=400)
+    cached = TrafficService.CACHE.lookup(lat_f, lon_f)
+    if cached is not None:
+        return Response(dict(cached, status="success", cached=True, location={"latitude": lat, "longitude": lon}))
+
     # --- RATE LIMITING (Protect Credits) ---
     from django.core.cache import cache
     
@@ -394,113 +697,125 @@ def get_traffic_data(request):
         }, status=500)
     
     try:
-        # Get coordinates from query parameters or use default (Connaught Place, New Delhi)
-        lat = request.GET.get('lat', '28.6139')
-        lon = request.GET.get('lon', '77.2090')
-        point = f"{lat},{lon}"
+        try:
+            payload, from_cache = TrafficService.fetch_flow(lat_f, lon_f, API_KEY)
+        except requests.HTTPError as e:
+            payload, status_code = None, e.response.status_code
+
+        if payload is not None:
+            # Store in database (only fresh readings; a cache hit is the same observation)
+            if not from_cache:
+                try:
+                    TrafficService.traffic_row(lat_f, lon_f, payload).save()
+                except Exception as db_error:
+                    print(f"Database save error: {db_error}")
+
+            return Response(dict(
+                payload, status="success", cached=from_cache,
+                location={"latitude": lat, "longitude": lon},
+            ))
+        else:
+            print(f"TomTom API failed with {status_code}. Using typical conditions.")
+            return _typical_traffic_response(lat, lon, "Live API failed, showing typical conditions for this hour")
 
-        url = "https://api.tomtom.com/traffic/services/4/flowSegmentData/absolute/10/json"
+    except Exception as e:
+        print(f"Traffic API Error: {e}")
+        return _typical_traffic_response(lat, lon, "Live traffic unavailable, showing typical conditions for this hour")
 
-        params = {
-            "point": point,
-            "unit": "KMPH",
-            "key": API_KEY
-        }
 
-        r = requests.get(url, params=params)
+def _typical_traffic_response(lat, lon, message):
+    """Fallback when TomTom can't answer: this location's hour-of-week profile from past readings."""
+    try:
+        TrafficProfileService.refresh_if_stale()
+        payload = TrafficProfileService.fallback_payload(float(lat), float(lon))
+    except Exception as e:
+        print(f"Traffic profile error: {e}")
+        payload = None
+    if payload is None:
+        return Response({
+            "status": "error",
+            "message": "Live traffic unavailable and no history for this location yet",
+            "location": {"latitude": lat, "longitude": lon},
+        }, status=503)
+    return Response(dict(payload, status="success", message=message, cached=False,
+                         location={"latitude": lat, "longitude": lon}))
 
-        if r.status_code == 200:
-            data = r.json()["flowSegmentData"]
 
-            current_speed = data["currentSpeed"]
-            free_flow_speed = data["freeFlowSpeed"]
+@api_view(['GET'])
+def get_typical_traffic(request):
+    """
+    Typical traffic at ?lat=&lon= from the hour-of-week profiles: the current hour (or
+    ?at=<ISO datetime>) plus every hour of the week that has samples.
+    """
+    from django.utils.dateparse import parse_datetime
+    try:
+        lat, lon = _coordinates(request.GET['lat'], request.GET['lon'])
+        at = None
+        if 'at' in request.GET:
+            at = parse_datetime(request.GET['at'])
+            if at is None:
+                raise ValueError('at must be an ISO datetime')
+    except (KeyError, ValueError) as e:
+        return Response({'error': f'lat and lon are required finite coordinates ({e})'}, status=400)
+
+    TrafficProfileService.refresh_if_stale()
+    return Response({
+        "location": {"latitude": lat, "longitude": lon},
+        "typical": TrafficProfileService.typical(lat, lon, at),
+        "week": TrafficProfileService.week(lat, lon),
+    })
 
-            congestion_score = round(
-                (1 - current_speed / free_flow_speed) * 100, 2
-            )
 
-            # Store in database
-            try:
-                RealTimeTraffic.objects.create(
-                    latitude=float(lat),
-                    longitude=float(lon),
-                    current_speed=current_speed,
-                    free_flow_speed=free_flow_speed,
-                    current_travel_time=data["currentTravelTime"],
-                    free_flow_travel_time=data["freeFlowTravelTime"],
-                    congestion_score=congestion_score,
-                    confidence=round(data["confidence"] * 100, 2),
-                    road_class=data["frc"],
-                    road_closure=data["roadClosure"]
-                )
-            except Exception as db_error:
-                print(f"Database save error: {db_error}")
-
-            response_data = {
-                "status": "success",
-                "location": {
-                    "latitude": lat,
-                    "longitude": lon
-                },
-                "traffic": {
-                    "currentSpeed": current_speed,
-                    "freeFlowSpeed": free_flow_speed,
-                    "currentTravelTime": data["currentTravelTime"],
-                    "freeFlowTravelTime": data["freeFlowTravelTime"],
-                    "confidence": round(data["confidence"] * 100, 2),
-                    "roadClosure": data["roadClosure"],
-                    "roadClass": data["frc"],
-                    "congestionScore": congestion_score
-                },
-                "coordinates": data["coordinates"]["coordinate"]
-            }
-
-            return Response(response_data)
+@api_view(['POST'])
+def get_corridor_traffic(request):
+    """
+    Congestion profile along a whole route in one call.
+    Body: {"points": [[lat, lon], ...]} or {"polyline": [[lat, lon], ...], "spacing_m": 500}.
+    Points on an already-known road segment come from the segment cache; the rest are
+    fetched from TomTom concurrently and saved in one bulk insert.
+    """
+    API_KEY = os.getenv('TOMTOM_API_KEY')
+    if not API_KEY:
+        return Response({
+            'status': 'error',
+            'message': 'TomTom API key not configured. Please set TOMTOM_API_KEY in .env file'
+        }, status=500)
+
+    if not isinstance(request.data, dict):
+        return Response({'status': 'error', 'message': 'expected a JSON object with "points" or "polyline"'}, status=400)
+    limit = TrafficService.MAX_CORRIDOR_POINTS
+    try:
+        if 'polyline' in request.data:
+            spacing = _finite_float(request.data.get('spacing_m', 500))
+            points = TrafficService.sample_polyline(TrafficService.parse_points(request.data['polyline'], limit), spacing, limit)
         else:
-            # Fallback for Demo/Presentation if API Key fails (e.g. 403)
-            print(f"TomTom API failed with {r.status_code}. Using MOCK data.")
-            import random
-            
-            # Mock Traffic Data
-            mock_current = random.randint(10, 50)
-            mock_free = 60
-            mock_congestion = round((1 - mock_current / mock_free) * 100, 2)
-            
-            return Response({
-                "status": "success",
-                "message": "Live API failed, showing simulation data",
-                "location": {"latitude": lat, "longitude": lon},
-                "traffic": {
-                    "currentSpeed": mock_current,
-                    "freeFlowSpeed": mock_free,
-                    "currentTravelTime": 300,
-                    "freeFlowTravelTime": 150,
-                    "confidence": 100,
-                    "roadClosure": False,
-                    "roadClass": "FRC2",
-                    "congestionScore": mock_congestion
-                },
-                "coordinates": [] # No line segment for mock
-            })
+            points = TrafficService.parse_points(request.data.get('points'), limit)
+    except (TypeError, ValueError) as e:
+        return Response({'status': 'error', 'message': str(e)}, status=400)
 
-    except Exception as e:
-        print(f"Traffic API Error: {e}")
-        # Graceful fallback on exception too
-        import random
-        mock_current = random.randint(10, 40)
-        return Response({
-            "status": "success",
-            "message": "System Error, showing simulation data",
-            "location": {"latitude": lat, "longitude": lon},
-            "traffic": {
-                "currentSpeed": mock_current,
-                "freeFlowSpeed": 60,
-                "currentTravelTime": 400,
-                "freeFlowTravelTime": 150,
-                "confidence": 90,
-                "roadClosure": False,
-                "roadClass": "FRC2",
-                "congestionScore": round((1 - mock_current/60)*100, 2)
-            },
-            "coordinates": []
-        })
+    # One corridor counts as one call against the per-IP limit
+    from django.core.cache import cache
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    ip = x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+    cache_key = f"traffic_corridor_limit_{ip}"
+    if cache.get(cache_key):
+        return Response({'status': 'error', 'message': 'Rate limit exceeded. Please wait 2 seconds.'}, status=429)
+    cache.set(cache_key, True, 2)
+
+    results, fresh = TrafficService.fetch_corridor(points, API_KEY)
+    if fresh:
+        try:
+            RealTimeTraffic.objects.bulk_create([TrafficService.traffic_row(lat, lon, payload) for lat, lon, payload in fresh])
+        except Exception as db_error:
+            print(f"Database save error: {db_error}")
+
+    if any(payload is None for payload, cached, error in results):
+        # Points TomTom couldn't answer fall back to their hour-of-week history
+        TrafficProfileService.refresh_if_stale()
+        results = [
+            (TrafficProfileService.fallback_payload(*point), cached, error) if payload is None else (payload, cached, error)
+            for point, (payload, cached, error) in zip(points, results)
+        ]
+
+    body = TrafficService.corridor_response(points, results)
+    return Response(body, status=200 if body['status'] == 'success' else 502)
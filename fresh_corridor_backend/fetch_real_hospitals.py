@@ -1,7 +1,5 @@
 import os
 import django
-import json
-import urllib.request
 import random
 from math import radians, cos, sin, asin, sqrt
 
@@ -9,6 +7,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fresh_corridor_backend.settings
 django.setup()
 
 from core.models import Hospital, CityZone
+from core.services.upstream import upstream
 
 def haversine(lon1, lat1, lon2, lat2):
     lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
@@ -34,9 +33,11 @@ def fetch_real_data():
     """
     
     try:
-        req = urllib.request.Request(overpass_url, data=overpass_query.encode('utf-8'))
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode())
+        # Overpass queries are read-only, so the POST is safe to retry; the read timeout
+        # leaves room for the query's own 25 s server-side limit
+        response = upstream.post(overpass_url, data=overpass_query.encode('utf-8'), timeout=(5, 35), retries=2)
+        response.raise_for_status()
+        data = response.json()
             
         elements = data.get('elements', [])
         print(f"Found {len(elements)} hospitals in OSM.")
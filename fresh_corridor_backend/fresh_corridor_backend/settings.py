@@ -127,3 +127,50 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# CPCB AQI background refresh (core.services.aqi_service.AQIService)
+AQI_REFRESH_INTERVAL = int(os.getenv('AQI_REFRESH_INTERVAL', 600)) # seconds between refreshes
+AQI_REFRESH_JITTER = float(os.getenv('AQI_REFRESH_JITTER', 0.1)) # +/- fraction of the interval
+AQI_RETRY_BASE = int(os.getenv('AQI_RETRY_BASE', 15)) # first retry after a failed fetch, doubles each time
+AQI_MAX_BACKOFF = int(os.getenv('AQI_MAX_BACKOFF', 1800))
+
+# Shared outbound HTTP client (core.services.upstream)
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 3.05)) # seconds
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', 10)) # default when a call doesn't set one
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', 2)) # per idempotent call
+UPSTREAM_RETRY_RATIO = float(os.getenv('UPSTREAM_RETRY_RATIO', 0.2)) # retry budget per request, per host
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', 5)) # consecutive failures that open the circuit
+UPSTREAM_BREAKER_COOLDOWN = int(os.getenv('UPSTREAM_BREAKER_COOLDOWN', 30)) # seconds before a probe is let through
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 10)) # keep-alive connections per host
+
+# TomTom flow segment cache (core.services.traffic_service)
+TRAFFIC_SEGMENT_TTL = int(os.getenv('TRAFFIC_SEGMENT_TTL', 60)) # seconds a cached segment answers for
+TRAFFIC_SNAP_TOLERANCE_M = float(os.getenv('TRAFFIC_SNAP_TOLERANCE_M', 15)) # max distance from a cached polyline
+TRAFFIC_FANOUT_WORKERS = int(os.getenv('TRAFFIC_FANOUT_WORKERS', 6)) # concurrent TomTom calls per process for corridors
+TRAFFIC_PROFILE_TZ = os.getenv('TRAFFIC_PROFILE_TZ', 'Asia/Kolkata') # hour-of-week profiles are in local time
+TRAFFIC_PROFILE_REFRESH = int(os.getenv('TRAFFIC_PROFILE_REFRESH', 300)) # seconds between lazy profile refreshes
+
+# Raw reading rollups and retention (core.services.rollup_service, `manage.py rollup_readings`); 0 keeps forever
+WEATHERLOG_RETENTION_DAYS = int(os.getenv('WEATHERLOG_RETENTION_DAYS', 30)) # raw rows, once rolled up
+REALTIMETRAFFIC_RETENTION_DAYS = int(os.getenv('REALTIMETRAFFIC_RETENTION_DAYS', 14))
+ROLLUP_5M_RETENTION_DAYS = int(os.getenv('ROLLUP_5M_RETENTION_DAYS', 14))
+ROLLUP_1H_RETENTION_DAYS = int(os.getenv('ROLLUP_1H_RETENTION_DAYS', 400)) # daily rollups are kept forever
+ROLLUP_SETTLE_SECONDS = int(os.getenv('ROLLUP_SETTLE_SECONDS', 600)) # rows this new wait for the next run; edits after that aren't re-applied
+
+# Downsampled history endpoint (core.services.timeseries)
+TIMESERIES_RAW_LIMIT = int(os.getenv('TIMESERIES_RAW_LIMIT', 10000)) # raw rows read before switching to aggregates
+TIMESERIES_MAX_POINTS = int(os.getenv('TIMESERIES_MAX_POINTS', 2000)) # cap on ?points=
+
+# Live health dashboard stream (core.services.change_feed). Each open stream holds a worker
+# thread, so run gunicorn with threads (e.g. -k gthread --threads 32) when serving it.
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv('CHANGE_FEED_POLL_INTERVAL', 1.0)) # seconds between feed polls, per process
+CHANGE_FEED_RETENTION = int(os.getenv('CHANGE_FEED_RETENTION', 600)) # seconds events stay in the table
+HEALTH_STREAM_MAX_SECONDS = int(os.getenv('HEALTH_STREAM_MAX_SECONDS', 300)) # stream length before the client reconnects
+
+# Conditional GETs (core.services.data_versions)
+DATA_VERSION_CACHE_TTL = int(os.getenv('DATA_VERSION_CACHE_TTL', 1)) # seconds a process trusts its cached versions
+
+# Monte Carlo ensembles (core.services.scenario_model). Each server process starts its own
+# pool on the first large ensemble, so the total is SCENARIO_POOL_WORKERS x server processes.
+SCENARIO_POOL_WORKERS = int(os.getenv('SCENARIO_POOL_WORKERS', 2)) # 0 or 1 runs ensembles in the request thread
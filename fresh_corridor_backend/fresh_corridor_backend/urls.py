@@ -5,7 +5,8 @@ from core.views import (
     PlannerViewSet, HealthViewSet, FarmerViewSet, CitizenViewSet, 
     dashboard, get_stations_api, traffic_monitor, get_traffic_data,
     auth_login, auth_signup, login_index, login_role, get_user_profile,
-    get_simulated_weather
+    get_simulated_weather, get_upstream_stats, get_corridor_traffic,
+    get_typical_traffic, get_timeseries, health_stream
 )
 
 router = DefaultRouter()
@@ -16,10 +17,15 @@ router.register(r'citizen', CitizenViewSet, basename='citizen')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/health/stream/', health_stream, name='health_stream'), # ahead of the router's health/<pk>/
     path('api/', include(router.urls)),
     path('api/get_stations', get_stations_api, name='get_stations'),
     path('api/traffic/', get_traffic_data, name='get_traffic_data'),
+    path('api/traffic/corridor/', get_corridor_traffic, name='get_corridor_traffic'),
+    path('api/traffic/typical/', get_typical_traffic, name='get_typical_traffic'),
     path('api/weather/', get_simulated_weather, name='get_simulated_weather'),
+    path('api/timeseries/', get_timeseries, name='get_timeseries'),
+    path('api/upstream/stats/', get_upstream_stats, name='upstream_stats'),
     path('api/auth/login/', auth_login, name='auth_login'),
     path('api/auth/signup/', auth_signup, name='auth_signup'),
     path('api/auth/me/', get_user_profile, name='user_profile'),